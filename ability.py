@@ -0,0 +1,52 @@
+from bisect import bisect_right
+
+# 技能定义：伤害为攻击力乘以multiplier，使用时消耗qi_cost点内力，effects为额外效果（与招式的effects格式相同）
+ABILITIES = {
+    "基本打击": {"multiplier": 1.0, "qi_cost": 0, "effects": {}},
+    "气力拳": {"multiplier": 1.5, "qi_cost": 10, "effects": {}},
+    "旋风斩": {"multiplier": 1.2, "qi_cost": 15, "effects": {}},
+    "飞剑术": {"multiplier": 2.0, "qi_cost": 20, "effects": {}},
+    "龙拳": {"multiplier": 2.5, "qi_cost": 30, "effects": {}}
+}
+# 不消耗内力的普通攻击，内力不足以使用其他技能时使用
+BASIC_ABILITY = "基本打击"
+
+
+def ability_damage(name, attack):
+    """技能的伤害和内力消耗，未知技能为 (0, 0)"""
+    definition = ABILITIES.get(name)
+    if definition is None:
+        return 0, 0
+    return int(attack * definition["multiplier"]), definition["qi_cost"]
+
+
+class AbilityLadder:
+    """
+    按内力消耗从低到高排列、伤害倍率逐级提高的技能阶梯
+
+    比更便宜的技能还弱的技能不会被选中，不进入阶梯，
+    因此内力足够的技能中最强的一个就是消耗不超过当前内力的最后一级，用二分查找得到。
+    """
+    def __init__(self, names=()):
+        self.names = []  # 阶梯中的技能名称
+        self.costs = []  # 对应的内力消耗，递增
+        self.rebuild(names)
+
+    def rebuild(self, names):
+        """按技能列表重建阶梯，普通攻击总会加入，保证第一级不消耗内力"""
+        entries = sorted({BASIC_ABILITY, *(name for name in names if name in ABILITIES)},
+                         key=lambda name: (ABILITIES[name]["qi_cost"], -ABILITIES[name]["multiplier"]))
+        self.names = []
+        self.costs = []
+        best = 0
+        for name in entries:
+            definition = ABILITIES[name]
+            # 同样消耗的技能中排在前面的更强，后面的不会超过best
+            if definition["multiplier"] > best:
+                self.names.append(name)
+                self.costs.append(definition["qi_cost"])
+                best = definition["multiplier"]
+
+    def best(self, qi):
+        """内力qi足够使用的最强技能"""
+        return self.names[max(0, bisect_right(self.costs, qi) - 1)]
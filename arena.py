@@ -0,0 +1,188 @@
+"""
+群战擂台：按波次向擂台放入成百上千只怪物，既是一种游戏模式，也是怪物AI、碰撞、渲染和战斗的压力测试。
+每放入新的一波之前，记录当前怪物数量下的世界更新耗时、渲染耗时和内存占用。
+
+游戏中: python main.py --arena[=200,500,1000]
+压力测试: python arena.py [各波怪物数量，逗号分隔] [每波更新次数]
+"""
+
+import os
+import sys
+import time
+import pygame
+from world import World, ARENA_START, VIEW_WIDTH, VIEW_HEIGHT, TILE_SIZE
+from util import get_font
+
+try:
+    import resource
+except ImportError:  # Windows没有resource模块，不统计内存
+    resource = None
+
+# 默认的各波怪物数量，怪物逐波累积
+DEFAULT_WAVES = [200, 500, 1000, 2000]
+# 擂台中出现的怪物类型
+ARENA_ARCHETYPES = ["wolf", "bandit", "tiger", "imp"]
+# 自动放入下一波的间隔（秒）
+WAVE_INTERVAL = 30
+# 耗时滑动平均的权重
+SMOOTHING = 0.1
+
+
+def parse_waves(text):
+    """解析逗号分隔的各波怪物数量，为空时使用默认波次"""
+    if not text:
+        return list(DEFAULT_WAVES)
+    return [int(part) for part in text.split(",") if part.strip()]
+
+def get_peak_memory_mb():
+    """进程的峰值内存占用（MB），无法获取时返回None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux以KB为单位，macOS以字节为单位
+    return peak / (1024 * 1024 if sys.platform == "darwin" else 1024)
+
+
+class ArenaStats:
+    """
+    世界更新和渲染耗时的统计，保存滑动平均值和最大值（毫秒）
+    """
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        """清空统计，每放入一波怪物后重新开始"""
+        self.tick_ms = None
+        self.render_ms = None
+        self.tick_max = 0.0
+        self.render_max = 0.0
+
+    def record_tick(self, seconds):
+        """记录一次世界更新的耗时"""
+        ms = seconds * 1000
+        self.tick_ms = ms if self.tick_ms is None else self.tick_ms + (ms - self.tick_ms) * SMOOTHING
+        self.tick_max = max(self.tick_max, ms)
+
+    def record_render(self, seconds):
+        """记录一次渲染的耗时"""
+        ms = seconds * 1000
+        self.render_ms = ms if self.render_ms is None else self.render_ms + (ms - self.render_ms) * SMOOTHING
+        self.render_max = max(self.render_max, ms)
+
+
+def format_metrics(row):
+    """把一条性能记录中的耗时和内存格式化为文字列表"""
+    tick = "--" if row["tick_ms"] is None else f"{row['tick_ms']:.2f}ms(最大{row['tick_max']:.1f})"
+    render = "--" if row["render_ms"] is None else f"{row['render_ms']:.2f}ms(最大{row['render_max']:.1f})"
+    memory = "--" if row["memory_mb"] is None else f"{row['memory_mb']:.0f}MB"
+    return [f"更新{tick}", f"渲染{render}", f"峰值内存{memory}"]
+
+def format_report(row):
+    """把一条性能记录格式化为一行文字"""
+    return " ".join([f"第{row['wave']}波", f"怪物{row['monsters']}只"] + format_metrics(row))
+
+
+class ArenaMode:
+    """
+    群战擂台模式，按波次放入怪物并记录每一波的性能数据
+    """
+    def __init__(self, world, waves=DEFAULT_WAVES, archetypes=ARENA_ARCHETYPES, wave_interval=WAVE_INTERVAL):
+        """初始化擂台模式
+
+        Args:
+            world: 世界对象，当前区域应为擂台
+            waves: 各波怪物数量
+            archetypes: 怪物类型名称列表
+            wave_interval: 自动放入下一波的间隔（秒）
+        """
+        self.world = world
+        self.waves = list(waves)
+        self.archetypes = archetypes
+        self.wave_interval = wave_interval
+        self.wave = 0  # 已放入的波数
+        self.last_wave_time = 0
+        self.stats = ArenaStats()
+        self.reports = []  # 每一波的性能记录
+
+    def is_active(self):
+        """玩家是否仍在擂台中"""
+        return self.world.current_area == "arena"
+
+    def has_next_wave(self):
+        """是否还有未放入的波次"""
+        return self.wave < len(self.waves)
+
+    def snapshot(self):
+        """记录当前怪物数量下的性能数据"""
+        stats = self.stats
+        return {"wave": self.wave, "monsters": len(self.world.monsters),
+                "tick_ms": stats.tick_ms, "tick_max": stats.tick_max,
+                "render_ms": stats.render_ms, "render_max": stats.render_max,
+                "memory_mb": get_peak_memory_mb()}
+
+    def next_wave(self, player_x, player_y, now=None):
+        """放入下一波怪物，放入前先保存上一波的性能记录
+
+        Returns:
+            list: 需要显示的日志文字
+        """
+        if not self.has_next_wave():
+            return []
+        messages = []
+        if self.wave > 0:
+            row = self.snapshot()
+            self.reports.append(row)
+            messages.append(format_report(row))
+        count = self.world.spawn_wave(self.waves[self.wave], self.archetypes, avoid=(player_x, player_y))
+        self.wave += 1
+        self.stats.reset()
+        self.last_wave_time = time.time() if now is None else now
+        messages.append(f"第{self.wave}波来袭！新增{count}只怪物，共{len(self.world.monsters)}只")
+        return messages
+
+    def update(self, now, player_x, player_y):
+        """距上一波超过间隔时自动放入下一波"""
+        if self.is_active() and self.has_next_wave() and now - self.last_wave_time >= self.wave_interval:
+            return self.next_wave(player_x, player_y, now)
+        return []
+
+    def render(self, screen, font):
+        """在屏幕右上角绘制当前的性能数据"""
+        row = self.snapshot()
+        lines = [f"擂台 第{row['wave']}/{len(self.waves)}波 怪物{row['monsters']}只 (N键下一波)"]
+        lines.extend(format_metrics(row))
+        width = VIEW_WIDTH * TILE_SIZE
+        for i, line in enumerate(lines):
+            text = font.render(line, True, (255, 200, 0))
+            screen.blit(text, (width - text.get_width() - 10, 10 + i * 22))
+
+
+def run_stress(waves, ticks=50, seed=0):
+    """不打开窗口运行擂台：每放入一波怪物，玩家原地不动，更新和渲染ticks次并打印性能数据"""
+    world = World(40, 25, seed=seed, initial_area="arena")
+    arena = ArenaMode(world, waves)
+    player_x, player_y = ARENA_START
+    screen = pygame.Surface((VIEW_WIDTH * TILE_SIZE, VIEW_HEIGHT * TILE_SIZE))
+    font = get_font(is_ascii=False, size=20)
+    reports = []
+    while arena.has_next_wave():
+        arena.next_wave(player_x, player_y)
+        for _ in range(ticks):
+            start = time.perf_counter()
+            world.update(player_x, player_y)
+            arena.stats.record_tick(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            view_x, view_y = world.get_view_origin(player_x, player_y)
+            world.render(screen, font, view_x, view_y, player_x, player_y)
+            arena.stats.record_render(time.perf_counter() - start)
+        reports.append(arena.snapshot())
+        print(format_report(reports[-1]))
+    return reports
+
+if __name__ == "__main__":
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    pygame.init()
+    waves = parse_waves(sys.argv[1] if len(sys.argv) > 1 else "")
+    ticks = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    run_stress(waves, ticks)
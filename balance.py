@@ -0,0 +1,210 @@
+"""
+平衡性扫描：在 (境界, 先天心法, 装备品级, 怪物类型) 的网格上批量模拟战斗
+
+每个网格单元由simulation模块模拟若干场自动战斗，单元分发到多个进程并行计算。
+每算完一个单元就追加到检查点文件，中断后重新运行会跳过已完成的单元。
+全部完成后输出结果表（CSV）和摘要（JSON），摘要中列出难度曲线断裂的位置：
+相邻境界之间胜率骤变的地方，以及境界更高胜率反而更低的地方。
+
+用法: python balance.py [输出目录] [每个单元的战斗场数] [进程数]
+"""
+
+import csv
+import json
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import numpy as np
+from heart_method import HeartMethodSystem
+from item import generate_random_weapon, generate_random_armor
+from rng import derive_seed
+from simulation import PlayerBuild, make_realm_player, simulate_fights
+from spawner import MONSTER_ARCHETYPES
+
+# 扫描的境界，从九品到洞玄
+REALMS = list(range(9, -1, -1))
+# 装备品级，与generate_random_weapon/armor中的稀有度相同；"初始"为不更换初始装备
+EQUIPMENT_TIERS = ["初始", "普通", "优秀", "稀有", "传说"]
+# 生成指定稀有度装备时使用的稀有度掷骰值，取各稀有度区间的中点
+TIER_ROLLS = {"普通": 0.35, "优秀": 0.8, "稀有": 0.94, "传说": 0.99}
+# 相邻境界之间胜率变化超过该值视为难度断崖
+CLIFF_THRESHOLD = 0.5
+# 摘要中判断"能够战胜"使用的胜率
+WIN_THRESHOLD = 0.9
+
+DEFAULT_OUTPUT_DIR = "balance_results"
+DEFAULT_FIGHTS = 20000
+RESULT_FIELDS = ["realm", "heart_method", "tier", "monster", "seed", "fights", "win_rate", "unfinished",
+                 "rounds_mean", "rounds_p50", "hp_left_ratio"]
+
+
+def make_equipment(generate, level, tier, seed):
+    """生成指定稀有度的装备
+
+    装备生成函数按 rng.random() + quality_modifier 决定稀有度，这里先读出随机数流的下一个值，
+    再选取修饰值使掷骰结果正好落在该稀有度的区间内，名称等其余随机内容仍由随机数流决定。
+    """
+    rng = random.Random(seed)
+    probe = random.Random()
+    probe.setstate(rng.getstate())
+    return generate(level, TIER_ROLLS[tier] - probe.random(), rng)
+
+def make_build(realm, heart_method, tier, seed=0):
+    """按境界、先天心法和装备品级创建玩家属性，生命和内力全满"""
+    player = make_realm_player(realm)
+    player.learn_heart_method(HeartMethodSystem().get_inborn_heart_method(heart_method))
+    if tier != "初始":
+        # 装备的等级与怪物掉落相同，取玩家当前的境界
+        make_equipment(generate_random_weapon, realm, tier, derive_seed(seed, "weapon", tier)).equip(player)
+        make_equipment(generate_random_armor, realm, tier, derive_seed(seed, "armor", tier)).equip(player)
+    player.health = player.max_health
+    player.qi = player.max_qi
+    return PlayerBuild.from_player(player)
+
+def cell_key(realm, heart_method, tier, monster):
+    """网格单元的键，用于检查点去重"""
+    return f"{realm}|{heart_method}|{tier}|{monster}"
+
+def enumerate_cells():
+    """网格中的所有单元 [(境界, 心法, 装备品级, 怪物类型)]"""
+    heart_methods = list(HeartMethodSystem().inborn_heart_methods)
+    return [(realm, heart_method, tier, monster)
+            for realm in REALMS for heart_method in heart_methods
+            for tier in EQUIPMENT_TIERS for monster in MONSTER_ARCHETYPES]
+
+def run_cell(cell, fights, seed):
+    """模拟一个网格单元，在工作进程中调用
+
+    Returns:
+        dict: 结果表中的一行
+    """
+    realm, heart_method, tier, monster = cell
+    build = make_build(realm, heart_method, tier, seed)
+    rng = np.random.default_rng(derive_seed(seed, *cell))
+    summary = simulate_fights(build, monster, fights, rng).summary()
+    rounds = summary["rounds_to_kill"]
+    hp_left = summary["player_hp_left"]
+    return {
+        "realm": realm, "heart_method": heart_method, "tier": tier, "monster": monster,
+        "seed": seed, "fights": fights,
+        "win_rate": round(summary["win_rate"], 4),
+        "unfinished": summary["unfinished"],
+        "rounds_mean": round(rounds["mean"], 2) if rounds else None,
+        "rounds_p50": rounds["percentiles"][50] if rounds else None,
+        "hp_left_ratio": round(hp_left["mean"] / build.max_health, 4) if hp_left else None
+    }
+
+def load_checkpoint(path, fights, seed):
+    """读取检查点中已完成的单元，战斗场数或随机种子不同的记录不会被复用
+
+    Returns:
+        dict: 单元键 -> 结果行
+    """
+    rows = {}
+    if not os.path.exists(path):
+        return rows
+    with open(path, "rb+") as f:
+        data = f.read()
+        # 中断时写了一半的最后一行会被截掉，之后追加的记录从新的一行开始
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+    for line in data[:end].decode("utf-8").splitlines():
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError:
+            continue
+        if row.get("fights") == fights and row.get("seed") == seed:
+            rows[cell_key(row["realm"], row["heart_method"], row["tier"], row["monster"])] = row
+    return rows
+
+def summarize(rows):
+    """找出难度曲线断裂的位置
+
+    Returns:
+        dict: 每种心法和装备品级下各怪物能以WIN_THRESHOLD胜率战胜的最低境界，
+              以及胜率骤变（cliffs）和境界更高胜率反而更低（inversions）的位置
+    """
+    curves = {}
+    for row in rows:
+        curves.setdefault((row["heart_method"], row["tier"], row["monster"]), {})[row["realm"]] = row["win_rate"]
+
+    first_wins = {}
+    cliffs = []
+    inversions = []
+    for (heart_method, tier, monster), curve in sorted(curves.items()):
+        realms = [realm for realm in REALMS if realm in curve]
+        winning = [realm for realm in realms if curve[realm] >= WIN_THRESHOLD]
+        first_wins.setdefault(f"{heart_method}/{tier}", {})[monster] = winning[0] if winning else None
+        for lower, higher in zip(realms, realms[1:]):
+            change = curve[higher] - curve[lower]
+            entry = {"heart_method": heart_method, "tier": tier, "monster": monster,
+                     "from_realm": lower, "to_realm": higher,
+                     "win_rate": [curve[lower], curve[higher]]}
+            if abs(change) >= CLIFF_THRESHOLD:
+                cliffs.append(entry)
+            if change < 0:
+                inversions.append(entry)
+    return {"cells": len(rows), "win_threshold": WIN_THRESHOLD, "first_winning_realm": first_wins,
+            "cliffs": cliffs, "inversions": inversions}
+
+def write_results(rows, output_dir):
+    """写出按网格顺序排列的结果表和摘要，返回摘要"""
+    order = {cell_key(*cell): i for i, cell in enumerate(enumerate_cells())}
+    rows = sorted(rows, key=lambda row: order.get(
+        cell_key(row["realm"], row["heart_method"], row["tier"], row["monster"]), len(order)))
+    with open(os.path.join(output_dir, "results.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    summary = summarize(rows)
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+def run_sweep(output_dir=DEFAULT_OUTPUT_DIR, fights=DEFAULT_FIGHTS, workers=None, seed=0):
+    """运行平衡性扫描，已在检查点中的单元直接复用
+
+    Args:
+        output_dir: 输出目录，保存检查点、结果表和摘要
+        fights: 每个单元的战斗场数
+        workers: 进程数，默认使用全部CPU核心
+        seed: 随机种子，相同的种子得到相同的结果
+
+    Returns:
+        dict: 摘要
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    checkpoint_path = os.path.join(output_dir, "checkpoint.jsonl")
+    done = load_checkpoint(checkpoint_path, fights, seed)
+    cells = [cell for cell in enumerate_cells() if cell_key(*cell) not in done]
+    print(f"共{len(cells) + len(done)}个单元，已完成{len(done)}个，剩余{len(cells)}个")
+
+    start = time.perf_counter()
+    with open(checkpoint_path, "a", encoding="utf-8") as checkpoint, \
+         ProcessPoolExecutor(max_workers=workers or os.cpu_count()) as executor:
+        futures = [executor.submit(run_cell, cell, fights, seed) for cell in cells]
+        try:
+            for i, future in enumerate(as_completed(futures), 1):
+                row = future.result()
+                done[cell_key(row["realm"], row["heart_method"], row["tier"], row["monster"])] = row
+                checkpoint.write(json.dumps(row, ensure_ascii=False) + "\n")
+                checkpoint.flush()
+                if i % 50 == 0 or i == len(futures):
+                    print(f"{i}/{len(futures)}  {time.perf_counter() - start:.1f}秒")
+        except KeyboardInterrupt:
+            executor.shutdown(wait=False, cancel_futures=True)
+            print("已中断，重新运行即可从检查点继续")
+            raise
+
+    summary = write_results(list(done.values()), output_dir)
+    print(f"难度断崖{len(summary['cliffs'])}处，境界倒挂{len(summary['inversions'])}处，结果保存在{output_dir}")
+    return summary
+
+if __name__ == "__main__":
+    output_dir = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_OUTPUT_DIR
+    fights = int(sys.argv[2]) if len(sys.argv) > 2 else DEFAULT_FIGHTS
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else None
+    run_sweep(output_dir, fights, workers)
@@ -0,0 +1,131 @@
+"""
+性能对比：
+  1. 地形生成：逐格生成（legacy）与NumPy向量化生成（numpy），只计地形，不含连通性修补、怪物放置和缓存
+  2. 怪物游荡：逐只调用update_monster_ai与World.update中的批量移动
+  3. 连通性检查：各区域生成时重新生成的次数、打通的格子数量，以及label_components标记连通区域的耗时
+
+用法: python benchmark.py [重复次数]
+"""
+
+import random
+import sys
+import time
+import numpy as np
+import worldgen
+from connectivity import label_components
+from terrain import WALKABLE_TABLE, grid_to_ids
+from world import World
+
+AREAS = ["forest", "mountain", "village", "cave"]
+SIZES = [(40, 25), (400, 250)]
+BACKENDS = ["legacy", "numpy"]
+MONSTER_COUNTS = [1000, 10000]
+# 逐格生成的initialize_*方法最后放置怪物和NPC，计时地形生成时跳过
+POPULATE_METHODS = ["add_forest_monsters", "add_mountain_monsters", "add_cave_monsters", "add_village_npcs"]
+
+def terrain_generator(area_name, width, height, backend):
+    """返回只生成地形的函数 generate(i)，i为随机种子"""
+    if backend == "numpy":
+        generate = getattr(worldgen, f"generate_{area_name}")
+        return lambda i: generate(width, height, np.random.default_rng(i))
+    builder = World(width, height, seed=0, initial_area=None, generator_backend=backend)
+    for name in POPULATE_METHODS:
+        setattr(builder, name, lambda: None)
+    initialize = builder.get_procedural_generators()[area_name]
+    def generate(i):
+        builder.rng.seed(i)
+        initialize()
+    return generate
+
+def time_build(area_name, width, height, backend, repeat):
+    """多次生成同一区域的地形，返回平均耗时（毫秒）"""
+    generate = terrain_generator(area_name, width, height, backend)
+    # 预热一次，排除首次调用的导入和初始化开销
+    generate(repeat)
+    start = time.perf_counter()
+    for i in range(repeat):
+        generate(i)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def run(repeat=5):
+    """运行所有区域、尺寸和后端的组合并打印结果表"""
+    print(f"{'区域':<10}{'尺寸':>10}{'legacy(ms)':>14}{'numpy(ms)':>14}{'加速比':>10}")
+    for width, height in SIZES:
+        for area_name in AREAS:
+            times = {backend: time_build(area_name, width, height, backend, repeat)
+                     for backend in BACKENDS}
+            speedup = times["legacy"] / times["numpy"]
+            print(f"{area_name:<10}{f'{width}x{height}':>10}"
+                  f"{times['legacy']:>14.2f}{times['numpy']:>14.2f}{speedup:>9.1f}x")
+
+def make_crowd(count):
+    """在400x250的森林中随机放置count只游荡的怪物"""
+    world = World(400, 250, seed=0, initial_area="forest")
+    world.monsters.clear()
+    world.rebuild_monster_index()
+    rng = random.Random(0)
+    while len(world.monsters) < count:
+        x, y = rng.randrange(world.width), rng.randrange(world.height)
+        if world.is_position_valid(x, y)[0]:
+            world.add_monster({"name": "灰狼", "char": "w", "x": x, "y": y, "hp": 30, "max_hp": 30,
+                               "attack": 10, "defense": 3, "experience": 20, "behavior": "wander"})
+    return world
+
+def time_monster_moves(count, repeat):
+    """返回逐只更新与批量更新count只怪物的平均耗时（毫秒）"""
+    world = make_crowd(count)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for monster in list(world.monsters):
+            world.update_monster_ai(monster)
+    scalar = (time.perf_counter() - start) * 1000 / repeat
+
+    world.update()
+    start = time.perf_counter()
+    for _ in range(repeat):
+        world.update()
+    batched = (time.perf_counter() - start) * 1000 / repeat
+    return scalar, batched
+
+def run_monsters(repeat=5):
+    """运行怪物游荡对比并打印结果表"""
+    print(f"{'怪物数量':<10}{'逐只(ms)':>14}{'批量(ms)':>14}{'加速比':>10}")
+    for count in MONSTER_COUNTS:
+        scalar, batched = time_monster_moves(count, repeat)
+        print(f"{count:<10}{scalar:>14.2f}{batched:>14.2f}{scalar / batched:>9.1f}x")
+
+def time_labels(area, repeat):
+    """在区域的地形上重复标记连通区域，返回平均耗时（毫秒）"""
+    walkable = WALKABLE_TABLE[grid_to_ids(area.grid)]
+    start = time.perf_counter()
+    for _ in range(repeat):
+        label_components(walkable)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+def run_connectivity(repeat=5):
+    """按游戏中的入口生成各区域，打印连通性检查的结果和标记连通区域的耗时"""
+    print(f"{'区域':<10}{'后端':>8}{'重新生成':>10}{'打通格子':>10}"
+          f"{'标记40x25(ms)':>16}{'标记400x250(ms)':>18}")
+    for backend in BACKENDS:
+        world = World(40, 25, seed=0, generator_backend=backend)
+        big_world = World(400, 250, seed=0, initial_area=None, generator_backend=backend)
+        # 依次进入各区域，记录每个区域的入口
+        for area_name in AREAS + ["xiaoyao"]:
+            world.change_area(area_name)
+        for area_name in AREAS + ["xiaoyao"]:
+            rerolls = carved = 0
+            for i in range(repeat * 20):
+                area = world.build_area(area_name, world.area_seed(area_name, i))
+                rerolls += area.rerolls
+                carved += area.carved
+            small = time_labels(area, repeat * 20)
+            large = time_labels(big_world.build_area(area_name, big_world.area_seed(area_name, 0)), repeat)
+            print(f"{area_name:<10}{backend:>8}{rerolls:>10}{carved:>10}{small:>16.3f}{large:>18.3f}")
+
+if __name__ == "__main__":
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    run(repeat)
+    print()
+    run_monsters(repeat)
+    print()
+    run_connectivity(repeat)
@@ -0,0 +1,250 @@
+import numpy as np
+from rng import derive_seed
+from terrain import TERRAIN_IDS, TERRAIN_CHAR_TABLE, WALKABLE_TABLE
+from spawner import MONSTER_ARCHETYPES, make_monster
+
+# 区块边长（格）
+CHUNK_SIZE = 32
+
+
+class Chunk:
+    """
+    区块，大地图中一块固定大小的方形区域
+    """
+    def __init__(self, cx, cy, terrain):
+        self.cx = cx  # 区块坐标
+        self.cy = cy
+        self.terrain = terrain  # 地形ID数组，形状为 (CHUNK_SIZE, CHUNK_SIZE)，使用区块内坐标
+
+
+class ChunkMap:
+    """
+    分块流式加载的大地图
+
+    只有玩家附近的区块保存在内存中：进入load_radius范围的区块按需生成或载入，
+    离开keep_radius范围的区块被卸载。地形由区块源按种子确定性地重新生成，
+    卸载时只保留区块内怪物的状态，再次载入时恢复。
+    """
+    def __init__(self, width, height, source, load_radius=1, keep_radius=2):
+        """初始化分块地图
+
+        Args:
+            width: 地图宽度（格）
+            height: 地图高度（格）
+            source: 区块源，提供 generate(cx, cy) -> (地形ID数组, 怪物列表)
+            load_radius: 以玩家所在区块为中心，需要载入的区块半径
+            keep_radius: 超出该半径的区块会被卸载，大于load_radius以避免在边界来回载入
+        """
+        self.width = width
+        self.height = height
+        self.source = source
+        self.load_radius = load_radius
+        self.keep_radius = keep_radius
+        self.chunks = {}  # (cx, cy) -> Chunk，已载入的区块
+        self.saved_monsters = {}  # (cx, cy) -> 怪物列表，已卸载区块中的怪物
+        self.monsters = []  # 已载入区块中的怪物，由World直接使用
+        self.center = None  # 上一次流式加载时玩家所在的区块
+
+    def chunk_coords(self, x, y):
+        """世界坐标所在的区块坐标"""
+        return x // CHUNK_SIZE, y // CHUNK_SIZE
+
+    def chunk_count(self):
+        """地图在横向和纵向上的区块数量"""
+        return -(-self.width // CHUNK_SIZE), -(-self.height // CHUNK_SIZE)
+
+    def is_loaded(self, x, y):
+        """世界坐标所在的区块是否已载入"""
+        return self.chunk_coords(x, y) in self.chunks
+
+    def get_chunk(self, cx, cy):
+        """获取已载入的区块，未载入时返回None
+
+        区块只由stream载入，查询地形不会载入区块，否则新区块中的怪物不会进入World的索引。
+        """
+        return self.chunks.get((cx, cy))
+
+    def load_chunk(self, cx, cy):
+        """生成区块地形，并放入新生成或之前保存的怪物"""
+        terrain, monsters = self.source.generate(cx, cy)
+        if (cx, cy) in self.saved_monsters:
+            monsters = self.saved_monsters.pop((cx, cy))
+        chunk = Chunk(cx, cy, terrain)
+        self.chunks[(cx, cy)] = chunk
+        self.monsters.extend(monsters)
+        return chunk
+
+    def unload_chunk(self, cx, cy):
+        """卸载区块，将位于其中的怪物保存起来"""
+        self.chunks.pop((cx, cy))
+        staying = []
+        leaving = []
+        for monster in self.monsters:
+            if self.chunk_coords(monster["x"], monster["y"]) == (cx, cy):
+                leaving.append(monster)
+            else:
+                staying.append(monster)
+        # 原地修改列表，World持有的是同一个列表
+        self.monsters[:] = staying
+        self.saved_monsters[(cx, cy)] = leaving
+
+    def stream(self, x, y):
+        """以世界坐标(x, y)为中心载入附近的区块并卸载远处的区块
+
+        Returns:
+            bool: 是否有区块被载入或卸载
+        """
+        center = self.chunk_coords(x, y)
+        if center == self.center:
+            return False
+        self.center = center
+
+        cx, cy = center
+        count_x, count_y = self.chunk_count()
+        changed = False
+        for key in list(self.chunks):
+            if max(abs(key[0] - cx), abs(key[1] - cy)) > self.keep_radius:
+                self.unload_chunk(*key)
+                changed = True
+
+        radius = self.load_radius
+        for ny in range(max(0, cy - radius), min(count_y, cy + radius + 1)):
+            for nx in range(max(0, cx - radius), min(count_x, cx + radius + 1)):
+                if (nx, ny) not in self.chunks:
+                    self.load_chunk(nx, ny)
+                    changed = True
+        return changed
+
+    def get_terrain_id(self, x, y):
+        """获取世界坐标处的地形ID，未载入的区块视为墙壁"""
+        chunk = self.get_chunk(x // CHUNK_SIZE, y // CHUNK_SIZE)
+        if chunk is None:
+            return TERRAIN_IDS["wall"]
+        return chunk.terrain[y % CHUNK_SIZE, x % CHUNK_SIZE]
+
+    def get_char(self, x, y):
+        """获取世界坐标处的地形字符"""
+        return TERRAIN_CHAR_TABLE[self.get_terrain_id(x, y)]
+
+    def get_view(self, start_x, start_y, width, height):
+        """拼接出视口范围内的地形ID数组，形状为 (height, width)，未载入的区块以墙壁填充"""
+        view = np.full((height, width), TERRAIN_IDS["wall"], dtype=np.uint8)
+        end_x, end_y = start_x + width, start_y + height
+        for cy in range(start_y // CHUNK_SIZE, (end_y - 1) // CHUNK_SIZE + 1):
+            for cx in range(start_x // CHUNK_SIZE, (end_x - 1) // CHUNK_SIZE + 1):
+                chunk = self.get_chunk(cx, cy)
+                if chunk is None:
+                    continue
+                # 区块与视口的重叠部分，分别换算为区块内坐标和视口内坐标
+                x0 = max(start_x, cx * CHUNK_SIZE)
+                x1 = min(end_x, (cx + 1) * CHUNK_SIZE)
+                y0 = max(start_y, cy * CHUNK_SIZE)
+                y1 = min(end_y, (cy + 1) * CHUNK_SIZE)
+                view[y0 - start_y:y1 - start_y, x0 - start_x:x1 - start_x] = \
+                    chunk.terrain[y0 % CHUNK_SIZE:y0 % CHUNK_SIZE + (y1 - y0),
+                                  x0 % CHUNK_SIZE:x0 % CHUNK_SIZE + (x1 - x0)]
+        return view
+
+    def get_loaded_view(self):
+        """拼接出所有已载入区块的地形ID数组，不会载入新的区块
+
+        Returns:
+            tuple: (左上角世界坐标 (x, y), 形状为 (高, 宽) 的地形ID数组)，
+                   范围内未载入的区块以墙壁填充；没有载入任何区块时返回 ((0, 0), 空数组)
+        """
+        if not self.chunks:
+            return (0, 0), np.zeros((0, 0), dtype=np.uint8)
+        min_cx = min(cx for cx, _ in self.chunks)
+        min_cy = min(cy for _, cy in self.chunks)
+        max_cx = max(cx for cx, _ in self.chunks)
+        max_cy = max(cy for _, cy in self.chunks)
+        size = CHUNK_SIZE
+        view = np.full(((max_cy - min_cy + 1) * size, (max_cx - min_cx + 1) * size),
+                       TERRAIN_IDS["wall"], dtype=np.uint8)
+        for (cx, cy), chunk in self.chunks.items():
+            x0, y0 = (cx - min_cx) * size, (cy - min_cy) * size
+            view[y0:y0 + size, x0:x0 + size] = chunk.terrain
+        return (min_cx * size, min_cy * size), view
+
+
+class WildernessSource:
+    """
+    荒野区块源，按区域种子和区块坐标确定性地生成地形和怪物
+    """
+    MONSTER_TYPES = [MONSTER_ARCHETYPES["wolf"], MONSTER_ARCHETYPES["bandit"], MONSTER_ARCHETYPES["boar"]]
+
+    def __init__(self, seed, width, height, portals, safe_zone=None, monsters_per_chunk=3):
+        """初始化区块源
+
+        Args:
+            seed: 区域种子
+            width: 地图宽度
+            height: 地图高度
+            portals: 传送门表 {(x, y): 目标区域}，传送门会被盖到对应区块的地形上
+            safe_zone: 不生成障碍和怪物的矩形 (x0, y0, x1, y1)，通常是玩家进入的位置
+            monsters_per_chunk: 每个区块生成的怪物数量上限
+        """
+        self.seed = seed
+        self.width = width
+        self.height = height
+        self.portals = portals
+        self.safe_zone = safe_zone
+        self.monsters_per_chunk = monsters_per_chunk
+
+    def generate(self, cx, cy):
+        """生成一个区块
+
+        Returns:
+            tuple: (地形ID数组, 怪物列表)，怪物使用世界坐标
+        """
+        rng = np.random.default_rng(derive_seed(self.seed, "chunk", cx, cy))
+        size = CHUNK_SIZE
+        origin_x, origin_y = cx * size, cy * size
+
+        # 基础地形：草地、树木、山石
+        roll = rng.random((size, size))
+        terrain = np.full((size, size), TERRAIN_IDS["floor"], dtype=np.uint8)
+        terrain[roll < 0.35] = TERRAIN_IDS["grass"]
+        terrain[roll < 0.12] = TERRAIN_IDS["tree"]
+        terrain[roll < 0.03] = TERRAIN_IDS["rock"]
+
+        # 每个区块可能有一片水塘
+        if rng.random() < 0.4:
+            px, py = rng.integers(4, size - 4, 2)
+            radius = rng.integers(2, 5)
+            ys, xs = np.ogrid[:size, :size]
+            pond = (xs - px) ** 2 + (ys - py) ** 2 <= radius ** 2
+            terrain[pond] = TERRAIN_IDS["water"]
+
+        # 区块中央的十字小路，保证相邻区块之间总能走通
+        terrain[size // 2, :] = TERRAIN_IDS["path"]
+        terrain[:, size // 2] = TERRAIN_IDS["path"]
+
+        # 地图边界为墙，转换为区块内坐标
+        ys = np.arange(origin_y, origin_y + size)[:, None]
+        xs = np.arange(origin_x, origin_x + size)[None, :]
+        outside = (xs >= self.width) | (ys >= self.height)
+        border = (xs == 0) | (ys == 0) | (xs == self.width - 1) | (ys == self.height - 1)
+        terrain[border | outside] = TERRAIN_IDS["wall"]
+
+        safe = np.zeros((size, size), dtype=bool)
+        if self.safe_zone:
+            x0, y0, x1, y1 = self.safe_zone
+            safe = (xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1) & ~border
+            terrain[safe] = TERRAIN_IDS["floor"]
+
+        for (x, y) in self.portals:
+            if origin_x <= x < origin_x + size and origin_y <= y < origin_y + size:
+                terrain[y - origin_y, x - origin_x] = TERRAIN_IDS["portal"]
+
+        # 怪物只生成在可通行且不在安全区内的草地和地面上
+        spawnable = WALKABLE_TABLE[terrain] & ~safe & (
+            (terrain == TERRAIN_IDS["floor"]) | (terrain == TERRAIN_IDS["grass"]))
+        cells_y, cells_x = np.nonzero(spawnable)
+        count = min(len(cells_x), int(rng.integers(0, self.monsters_per_chunk + 1)))
+        picks = rng.choice(len(cells_x), count, replace=False) if count else []
+        monsters = []
+        for i in picks:
+            monster_type = self.MONSTER_TYPES[rng.integers(len(self.MONSTER_TYPES))]
+            monsters.append(make_monster(monster_type, origin_x + int(cells_x[i]), origin_y + int(cells_y[i])))
+        return terrain, monsters
@@ -0,0 +1,30 @@
+import time
+
+
+class RealClock:
+    """
+    真实时钟，读取系统时间（秒）
+    """
+    def now(self):
+        """当前时刻（秒）"""
+        return time.time()
+
+
+class VirtualClock:
+    """
+    虚拟时钟，只在调用advance时前进
+
+    战斗和世界更新中的延迟都以时钟读数判断，换用虚拟时钟后，
+    无窗口的模拟和测试可以直接把时间快进到下一个动作，不必等待真实时间。
+    """
+    def __init__(self, start=0.0):
+        self.time = start
+
+    def now(self):
+        """当前时刻（秒）"""
+        return self.time
+
+    def advance(self, seconds):
+        """时钟前进seconds秒，返回前进后的时刻"""
+        self.time += seconds
+        return self.time
@@ -1,50 +1,106 @@
 import pygame
 import random
-import time
 from item import generate_monster_drop
+from scheduler import EnergyScheduler
+from clock import RealClock
+from combat_events import CombatEventBuffer, event_log_type, ROUND_START, ATTACK, DAMAGE, \
+    BLOCK, QI_CHANGE, NOTICE, MISS, CRITICAL, PLAYER
+from damage import scale_hit, MISS as HIT_MISS, CRIT as HIT_CRIT
+
+# 自动战斗的策略：内力不足AUTO_MIN_QI时只用普通攻击；怪物生命低于AUTO_FINISH_HP_RATIO时用特殊攻击收尾；
+# 玩家生命低于AUTO_DEFEND_HP_RATIO时有AUTO_DEFEND_CHANCE的概率防御；其余情况以AUTO_BASIC_CHANCE的概率普通攻击
+AUTO_MIN_QI = 10
+AUTO_FINISH_HP_RATIO = 0.5
+AUTO_DEFEND_HP_RATIO = 0.5
+AUTO_DEFEND_CHANCE = 0.3
+AUTO_BASIC_CHANCE = 0.6
+# 防御姿态：格挡怪物攻击的概率（未格挡时伤害减半），以及恢复的内力（最大内力的比例，至少DEFEND_MIN_QI点）
+BLOCK_CHANCE = 0.5
+DEFEND_QI_RATIO = 0.1
+DEFEND_MIN_QI = 5
 
 class Combat:
-    def __init__(self):
-        self.combat_log = []
+    def __init__(self, clock=None):
+        """初始化战斗系统
+        
+        Args:
+            clock: 判断动作间隔使用的时钟，默认为真实时钟；传入虚拟时钟时战斗可以不受真实时间限制地快进
+        """
+        self.clock = clock or RealClock()
+        self.events = CombatEventBuffer()  # 战斗事件流，战斗日志的文字在显示时才格式化
         self.max_log_entries = 5
         self.player_defending = False
         # 添加战斗节奏控制
         self.last_action_time = 0
         self.action_delay = 0.7  # 每个战斗动作之间的延迟(秒)
+        # 出手顺序：玩家和怪物按速度积累能量，速度快的一方出手更频繁
+        self.turn_order = EnergyScheduler()
         self.log_system = None  # 引用游戏中的日志系统
         
         # 自动战斗相关
         self.auto_combat = False  # 是否开启自动战斗
         self.combat_round = 0    # 战斗回合数
+        self.rounds_played = 0  # 玩家累计出手的回合数，不随战斗重置，状态效果在战斗中按它结算
         self.auto_combat_delay = 0.8  # 自动战斗每回合延迟(秒)
         self.last_auto_combat_time = 0  # 上次自动战斗时间
     
+    @property
+    def combat_log(self):
+        """最近max_log_entries条战斗日志的文字"""
+        return self.events.recent_texts(self.max_log_entries)
+    
     def set_log_system(self, log_system):
-        """设置日志系统引用"""
+        """设置日志系统引用，日志系统订阅战斗事件"""
+        if self.log_system:
+            self.events.unsubscribe(self._send_to_log)
         self.log_system = log_system
+        if log_system:
+            self.events.subscribe(self._send_to_log)
+    
+    def _send_to_log(self, kind, actor, target, detail, amount, cost):
+        """把战斗事件发送到游戏日志系统，格式化的文字缓存在事件流中，战斗日志显示时不再重复格式化"""
+        self.log_system.add(self.events.text(self.events.seq - 1), event_log_type(kind, target))
     
     def add_log(self, message, log_type="combat"):
-        """添加战斗日志并同时发送到游戏日志系统"""
-        # 添加到本地战斗日志
-        self.combat_log.append(message)
-        self._trim_combat_log()
-        
-        # 如果设置了日志系统，也发送到那里
-        if self.log_system:
-            self.log_system.add(message, log_type)
+        """添加一条文字消息到战斗日志，同时发送到游戏日志系统"""
+        self.events.record(NOTICE, target=log_type, detail=message)
     
     def start_combat(self, player, monster):
-        message = f"开始与{monster.name}战斗！"
-        self.combat_log = [message]
+        self.events.clear()
+        self.add_log(f"开始与{monster.name}战斗！")
         if self.log_system:
-            self.log_system.add(message, "combat")
             self.log_system.add("自动战斗按A键开启/关闭", "system")
         self.player_defending = False
-        self.last_action_time = time.time()
-        self.last_auto_combat_time = time.time()
+        self.turn_order = EnergyScheduler()
+        self.turn_order.add("player", player.speed)
+        self.turn_order.add("monster", monster.speed)
+        self.last_action_time = self.clock.now()
+        self.last_auto_combat_time = self.clock.now()
         self.combat_round = 0
         self.auto_combat = False  # 重置自动战斗状态
     
+    def is_turn(self, actor):
+        """是否轮到某一方出手
+
+        Args:
+            actor: "player"或"monster"
+        """
+        head = self.turn_order.peek()
+        return head is not None and head[1] == actor
+    
+    def end_turn(self, actor=None):
+        """结束当前一方的回合，战斗时间直接快进到下一方就绪的时刻
+
+        Args:
+            actor: 行动的玩家或怪物，有招式冷却的推进一回合
+        """
+        if self.is_turn("player"):
+            self.rounds_played += 1
+        self.turn_order.next_actor()
+        cooldowns = getattr(actor, "cooldowns", None)
+        if cooldowns is not None:
+            cooldowns.advance()
+    
     def toggle_auto_combat(self):
         """切换自动战斗状态"""
         self.auto_combat = not self.auto_combat
@@ -54,85 +110,118 @@ class Combat:
             self.add_log("已关闭自动战斗", "system")
         
         # 避免自动战斗开启后立即执行动作
-        self.last_auto_combat_time = time.time()
+        self.last_auto_combat_time = self.clock.now()
     
     def update_auto_combat(self, player, monster):
         """更新自动战斗状态，如果启用了自动战斗则自动执行战斗动作"""
         if not self.auto_combat or not monster or not player.is_alive() or not monster.is_alive():
             return False
         
-        current_time = time.time()
+        current_time = self.clock.now()
         
         # 检查是否可以执行自动战斗动作
         if current_time - self.last_auto_combat_time < self.auto_combat_delay:
             return False  # 等待延迟
         
-        # 增加战斗回合
-        self.combat_round += 1
-        self.add_log(f"-------- 第{self.combat_round}回合 --------", "system")
-        
-        # 执行自动战斗逻辑
-        # 如果玩家内力不足，使用普通攻击
-        if player.qi < 10:
-            self.player_attack(player, monster)
-        # 如果怪物血量低于一半，使用特殊攻击
-        elif monster.health < monster.max_health * 0.5:
-            self.player_special_attack(player, monster)
-        # 如果玩家血量低于一半，有30%几率防御
-        elif player.health < player.max_health * 0.5 and random.random() < 0.3:
-            self.player_defend(player)
-        # 否则，60%几率普通攻击，40%几率特殊攻击
-        else:
-            if random.random() < 0.6:
-                self.player_attack(player, monster)
-            else:
-                self.player_special_attack(player, monster)
-        
-        # 如果怪物还活着，怪物进行反击
-        if monster.is_alive():
-            self.monster_attack(monster, player)
+        self.auto_combat_round(player, monster)
         
         # 更新自动战斗时间
         self.last_auto_combat_time = current_time
         
         return True  # 表示执行了战斗动作
     
+    def auto_combat_round(self, player, monster):
+        """执行一回合自动战斗，不检查自动战斗的延迟"""
+        # 按出手顺序行动，直到再次轮到玩家：每回合玩家出手一次，速度快的怪物可能在其间出手多次
+        player_acted = False
+        while monster.is_alive() and player.is_alive() and self.turn_order.peek():
+            if not self.is_turn("player"):
+                self.monster_attack(monster, player)
+                continue
+            if player_acted:
+                break
+            player_acted = True
+            
+            # 增加战斗回合
+            self.combat_round += 1
+            self.events.record(ROUND_START, amount=self.combat_round)
+            
+            # 执行自动战斗逻辑
+            # 如果玩家内力不足，使用普通攻击
+            if player.qi < AUTO_MIN_QI:
+                self.player_attack(player, monster)
+            # 如果怪物血量低于一半，使用特殊攻击
+            elif monster.health < monster.max_health * AUTO_FINISH_HP_RATIO:
+                self.player_special_attack(player, monster)
+            # 如果玩家血量低于一半，有30%几率防御
+            elif player.health < player.max_health * AUTO_DEFEND_HP_RATIO and random.random() < AUTO_DEFEND_CHANCE:
+                self.player_defend(player)
+            # 否则，60%几率普通攻击，40%几率特殊攻击
+            else:
+                if random.random() < AUTO_BASIC_CHANCE:
+                    self.player_attack(player, monster)
+                else:
+                    self.player_special_attack(player, monster)
+    
+    def resolve_auto_combat(self, player, monster, max_steps=10000):
+        """把自动战斗一直进行到一方倒下
+        
+        每回合直接执行auto_combat_round，不经过自动战斗延迟的判断，也不等待真实时间，
+        无窗口的模拟中每秒可以完成上千场战斗。注入的时钟可以快进时（如虚拟时钟），
+        每回合把它快进一个自动战斗延迟，战斗结束时的时刻与逐帧进行的自动战斗一致。
+        
+        Args:
+            player: 玩家
+            monster: 怪物
+            max_steps: 最多快进的步数
+        
+        Returns:
+            bool: 玩家是否获胜
+        """
+        self.auto_combat = True
+        advance = getattr(self.clock, "advance", None)
+        for _ in range(max_steps):
+            if not player.is_alive() or not monster.is_alive():
+                break
+            if advance is not None:
+                advance(self.auto_combat_delay)
+            self.auto_combat_round(player, monster)
+            self.last_auto_combat_time = self.clock.now()
+        return player.is_alive() and not monster.is_alive()
+    
     def player_attack(self, player, monster):
         # 检查是否可以执行动作
-        current_time = time.time()
-        if not self.auto_combat and current_time - self.last_action_time < self.action_delay:
-            return  # 如果时间间隔不够，不执行动作
+        current_time = self.clock.now()
+        if not self.auto_combat and (current_time - self.last_action_time < self.action_delay
+                                     or not self.is_turn("player")):
+            return  # 如果时间间隔不够或还没轮到玩家，不执行动作
             
         if not monster or not player.is_alive():
             return
         
         damage, _ = player.use_ability("基本打击")
-        actual_damage = monster.take_damage(damage)
-        
-        message = f"你攻击{monster.name}，造成{actual_damage}点伤害！"
-        self.add_log(message)
+        damage = self._scale_hit(damage, player, monster, PLAYER, monster.name)
+        if damage is not None:
+            actual_damage = monster.take_damage(damage)
+            self.events.record(ATTACK, PLAYER, monster.name, None, actual_damage)
         
         # Reset defending status
         self.player_defending = False
         self.last_action_time = current_time
+        self.end_turn(player)
     
     def player_special_attack(self, player, monster):
         # 检查是否可以执行动作
-        current_time = time.time()
-        if not self.auto_combat and current_time - self.last_action_time < self.action_delay:
-            return  # 如果时间间隔不够，不执行动作
+        current_time = self.clock.now()
+        if not self.auto_combat and (current_time - self.last_action_time < self.action_delay
+                                     or not self.is_turn("player")):
+            return  # 如果时间间隔不够或还没轮到玩家，不执行动作
             
         if not monster or not player.is_alive():
             return
         
         # Choose player's highest ability they have qi for
-        ability = "基本打击"  # Default
-        for possible_ability in reversed(player.abilities):
-            _, qi_cost = player.use_ability(possible_ability)
-            if player.qi >= qi_cost:
-                ability = possible_ability
-                break
-        
+        ability = player.best_ability()
         damage, qi_cost = player.use_ability(ability)
         
         # Check if player has enough qi
@@ -148,58 +237,77 @@ class Combat:
         
         # Use qi and deal damage
         player.qi -= qi_cost
-        actual_damage = monster.take_damage(damage)
-        
-        message = f"你使用{ability}，消耗{qi_cost}点内力，造成{actual_damage}点伤害！"
-        self.add_log(message)
+        damage = self._scale_hit(damage, player, monster, PLAYER, monster.name)
+        if damage is not None:
+            actual_damage = monster.take_damage(damage)
+            self.events.record(ATTACK, PLAYER, monster.name, ability, actual_damage, qi_cost)
         
         # Reset defending status
         self.player_defending = False
         self.last_action_time = current_time
+        self.end_turn(player)
     
     def player_defend(self, player):
         # 检查是否可以执行动作
-        current_time = time.time()
-        if not self.auto_combat and current_time - self.last_action_time < self.action_delay:
-            return  # 如果时间间隔不够，不执行动作
+        current_time = self.clock.now()
+        if not self.auto_combat and (current_time - self.last_action_time < self.action_delay
+                                     or not self.is_turn("player")):
+            return  # 如果时间间隔不够或还没轮到玩家，不执行动作
             
         self.player_defending = True
         # Restore some qi when defending
-        qi_restore = max(5, player.max_qi * 0.1)
+        qi_restore = max(DEFEND_MIN_QI, player.max_qi * DEFEND_QI_RATIO)
         player.restore_qi(qi_restore)
-        
-        message = f"你进入防御姿态，恢复{int(qi_restore)}点内力！"
-        self.add_log(message)
+        self.events.record(QI_CHANGE, PLAYER, None, "进入防御姿态", qi_restore)
         self.last_action_time = current_time
+        self.end_turn(player)
     
     def monster_attack(self, monster, player):
         # 检查是否可以执行动作
-        current_time = time.time()
-        if not self.auto_combat and current_time - self.last_action_time < self.action_delay:
-            return  # 如果时间间隔不够，不执行动作
+        current_time = self.clock.now()
+        if not self.auto_combat and (current_time - self.last_action_time < self.action_delay
+                                     or not self.is_turn("monster")):
+            return  # 如果时间间隔不够或还没轮到怪物，不执行动作
             
         if not monster.is_alive() or not player.is_alive():
             return
         
         # 50% chance for monster to attack if player is defending
-        if self.player_defending and random.random() < 0.5:
-            message = f"{monster.name}的攻击被你格挡了！"
-            self.add_log(message)
+        if self.player_defending and random.random() < BLOCK_CHANCE:
+            self.events.record(BLOCK, monster.name, PLAYER)
             self.last_action_time = current_time
+            self.end_turn(monster)
             return
         
         # Calculate damage
-        base_damage = monster.get_attack_damage()
+        base_damage = self._scale_hit(monster.get_attack_damage(), monster, player, monster.name, PLAYER)
+        if base_damage is None:
+            self.last_action_time = current_time
+            self.end_turn(monster)
+            return
         
         # Reduce damage by 50% if player is defending
         if self.player_defending:
             base_damage = base_damage // 2
         
         actual_damage = player.take_damage(base_damage)
-        
-        message = f"{monster.name}攻击你，造成{actual_damage}点伤害！"
-        self.add_log(message)
+        self.events.record(DAMAGE, monster.name, PLAYER, None, actual_damage)
         self.last_action_time = current_time
+        self.end_turn(monster)
+    
+    def _scale_hit(self, amount, attacker, target, attacker_name, target_name):
+        """按伤害流程处理一次击中，记录闪避和暴击事件
+        
+        Returns:
+            int: 防御减免前的伤害，未命中时返回None
+        """
+        damage, outcome = scale_hit(amount, attacker, target)
+        if outcome == HIT_MISS:
+            self.events.record(MISS, attacker_name, target_name)
+            return None
+        if outcome == HIT_CRIT:
+            self.events.record(CRITICAL, attacker_name, target_name)
+        return damage
     
     def render(self, screen, font, player, monster):
         # Draw a combat background
@@ -227,13 +335,9 @@ class Combat:
         auto_combat_text = font.render(f"自动战斗: {'开启' if self.auto_combat else '关闭'}", True, (200, 200, 0))
         screen.blit(auto_combat_text, (600, 400))
     
-    def _trim_combat_log(self):
-        if len(self.combat_log) > self.max_log_entries:
-            self.combat_log = self.combat_log[-self.max_log_entries:] 
-    
-    def end_combat(self, player, monster, victory=False):
-        """结束战斗"""
-        self.combat_log = []
+    def end_combat(self, player, monster, victory=False, rng=None):
+        """结束战斗，rng为战利品掷骰使用的随机数流"""
+        self.events.clear()
         self.in_combat = False
         self.auto_combat = False
         
@@ -245,7 +349,7 @@ class Combat:
             self.add_log(message, "success")
             
             # 处理物品掉落
-            drops = generate_monster_drop(monster, player.level)
+            drops = generate_monster_drop(monster, player.level, rng)
             for item in drops:
                 result = player.add_to_inventory(item)
                 self.add_log(result, "item")
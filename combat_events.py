@@ -0,0 +1,125 @@
+"""
+战斗事件流：有类型的战斗事件保存在固定容量的环形缓冲区中
+
+每个事件由 (类型, 行动方, 目标, 详情, 数值, 消耗) 六个字段组成，分别写入预先分配好的六个槽位列表，
+记录事件时不创建新的对象。显示用的文字在第一次读取时才格式化并缓存在槽位中。
+日志面板、任务、统计和回放等使用方通过subscribe订阅，事件直接以参数传给回调，不复制。
+"""
+
+# 事件类型
+ROUND_START = 0  # 新的回合开始，数值为回合数
+ATTACK = 1  # 玩家攻击：目标为怪物，详情为招式（普通攻击为None），数值为造成的伤害，消耗为内力
+DAMAGE = 2  # 玩家受到攻击：行动方为怪物，数值为受到的伤害
+BLOCK = 3  # 玩家格挡了行动方的攻击
+QI_CHANGE = 4  # 玩家的内力变化：详情为原因，数值为变化量
+NOTICE = 5  # 其他文字消息：详情为文字，目标为日志类型
+MISS = 6  # 行动方的攻击被目标闪开
+CRITICAL = 7  # 行动方的攻击暴击
+
+# 各类事件在游戏日志中的类型
+EVENT_LOG_TYPES = {ROUND_START: "system", ATTACK: "combat", DAMAGE: "combat", BLOCK: "combat",
+                   QI_CHANGE: "combat", MISS: "combat", CRITICAL: "combat"}
+
+# 事件中代表玩家的名称
+PLAYER = "你"
+DEFAULT_CAPACITY = 256
+
+
+def format_event(kind, actor, target, detail, amount, cost):
+    """把一个事件格式化为战斗日志中的文字"""
+    if kind == ROUND_START:
+        return f"-------- 第{amount}回合 --------"
+    if kind == ATTACK:
+        if detail is not None:
+            return f"你使用{detail}，消耗{cost}点内力，造成{amount}点伤害！"
+        return f"你攻击{target}，造成{amount}点伤害！"
+    if kind == DAMAGE:
+        return f"{actor}攻击你，造成{amount}点伤害！"
+    if kind == BLOCK:
+        return f"{actor}的攻击被你格挡了！"
+    if kind == QI_CHANGE:
+        return f"你{detail}，恢复{int(amount)}点内力！"
+    if kind == MISS:
+        return f"{actor}的攻击被{target}闪开了！"
+    if kind == CRITICAL:
+        return f"{actor}打出了暴击！"
+    return detail
+
+def event_log_type(kind, target):
+    """事件在游戏日志中的类型"""
+    return target if kind == NOTICE else EVENT_LOG_TYPES[kind]
+
+
+class CombatEventBuffer:
+    """
+    固定容量的战斗事件环形缓冲区，写满后覆盖最早的事件
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY):
+        self.capacity = capacity
+        self.kinds = [None] * capacity
+        self.actors = [None] * capacity
+        self.targets = [None] * capacity
+        self.details = [None] * capacity
+        self.amounts = [0] * capacity
+        self.costs = [0] * capacity
+        self.texts = [None] * capacity  # 已格式化的文字，写入事件时清空
+        self.seq = 0  # 已记录的事件总数，也是下一个事件的序号
+        self.start = 0  # 仍保留的最早事件的序号
+        self.subscribers = []
+
+    def __len__(self):
+        return self.seq - self.start
+
+    def subscribe(self, callback):
+        """订阅事件，之后每记录一个事件都调用 callback(类型, 行动方, 目标, 详情, 数值, 消耗)"""
+        self.subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        """取消订阅"""
+        if callback in self.subscribers:
+            self.subscribers.remove(callback)
+
+    def record(self, kind, actor=None, target=None, detail=None, amount=0, cost=0):
+        """记录一个事件并通知订阅者"""
+        i = self.seq % self.capacity
+        self.kinds[i] = kind
+        self.actors[i] = actor
+        self.targets[i] = target
+        self.details[i] = detail
+        self.amounts[i] = amount
+        self.costs[i] = cost
+        self.texts[i] = None
+        self.seq += 1
+        if self.seq - self.start > self.capacity:
+            self.start = self.seq - self.capacity
+        for callback in self.subscribers:
+            callback(kind, actor, target, detail, amount, cost)
+
+    def clear(self):
+        """丢弃所有事件，序号继续累加，订阅者保留"""
+        self.start = self.seq
+
+    def get(self, seq):
+        """按序号获取事件 (类型, 行动方, 目标, 详情, 数值, 消耗)，已被覆盖时返回None"""
+        if not self.start <= seq < self.seq:
+            return None
+        i = seq % self.capacity
+        return (self.kinds[i], self.actors[i], self.targets[i], self.details[i], self.amounts[i], self.costs[i])
+
+    def text(self, seq):
+        """按序号获取事件的文字，第一次读取时格式化"""
+        i = seq % self.capacity
+        text = self.texts[i]
+        if text is None:
+            text = format_event(self.kinds[i], self.actors[i], self.targets[i], self.details[i],
+                                self.amounts[i], self.costs[i])
+            self.texts[i] = text
+        return text
+
+    def since(self, seq):
+        """从序号seq开始的所有仍保留的事件的序号，供轮询的使用方读取新事件"""
+        return range(max(seq, self.start), self.seq)
+
+    def recent_texts(self, count):
+        """最近count个事件的文字，从早到晚排列"""
+        return [self.text(seq) for seq in range(max(self.start, self.seq - count), self.seq)]
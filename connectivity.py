@@ -0,0 +1,162 @@
+from collections import deque
+import numpy as np
+from pathfinding import DIRECTIONS
+
+
+def label_components(walkable):
+    """标记可通行格子的四连通区域
+
+    先把每一行中连续的可通行格子向量化地切分为横向片段，再用向量化的并查集合并上下相邻的片段，
+    每一轮都同时处理所有相邻关系，只需少量几轮就能收敛，不需要逐格的Python循环。
+
+    Args:
+        walkable: bool数组，形状为 (高, 宽)
+
+    Returns:
+        numpy.ndarray: int32标签数组，同一连通区域的格子标签相同，不可通行的格子为-1
+    """
+    height, width = walkable.shape
+    # 横向片段：可通行且左侧不可通行（或在行首）的格子是片段的起点
+    starts = walkable.copy()
+    starts[:, 1:] &= ~walkable[:, :-1]
+    runs = np.cumsum(starts.ravel()).reshape(height, width) - 1
+    run_count = int(starts.sum())
+
+    # 上下相邻的可通行格子把两个片段连在一起
+    vertical = walkable[:-1, :] & walkable[1:, :]
+    pairs = np.unique(runs[:-1, :][vertical].astype(np.int64) * run_count + runs[1:, :][vertical])
+    upper, lower = pairs // run_count, pairs % run_count
+
+    # 向量化的并查集：每轮把每条相邻关系两端的根挂到较小的根上，再压缩路径，直到不再变化
+    parent = np.arange(run_count)
+    while True:
+        root_upper, root_lower = parent[upper], parent[lower]
+        if np.array_equal(root_upper, root_lower):
+            break
+        np.minimum.at(parent, root_upper, root_lower)
+        np.minimum.at(parent, root_lower, root_upper)
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    labels = np.full((height, width), -1, dtype=np.int32)
+    labels[walkable] = parent[runs[walkable]]
+    return labels
+
+def reachable_mask(walkable, anchors):
+    """与任一锚点连通的可通行格子
+
+    Args:
+        walkable: bool数组，形状为 (高, 宽)
+        anchors: 锚点坐标列表 [(x, y), ...]，通常是区域的关键点
+
+    Returns:
+        numpy.ndarray: bool数组，没有可通行的锚点时返回全部可通行格子
+    """
+    if not anchors:
+        return walkable.copy()
+    labels = label_components(walkable)
+    height, width = walkable.shape
+    anchor_labels = {int(labels[y, x]) for x, y in anchors if 0 <= x < width and 0 <= y < height}
+    anchor_labels.discard(-1)
+    if not anchor_labels:
+        return walkable.copy()
+    return np.isin(labels, list(anchor_labels))
+
+def find_disconnected(walkable, points):
+    """找出没有与第一个关键点连通的关键点
+
+    Args:
+        walkable: bool数组，形状为 (高, 宽)
+        points: 关键点坐标列表，第一个点所在的区域视为主区域
+
+    Returns:
+        list: 不在主区域中的关键点（包括落在不可通行格子上的点）
+    """
+    if not points:
+        return []
+    labels = label_components(walkable)
+    main = labels[points[0][1], points[0][0]]
+    return [(x, y) for x, y in points if labels[y, x] < 0 or labels[y, x] != main]
+
+def carve_path(walkable, carvable, start, goal_mask):
+    """寻找从start到goal_mask区域需要打通的格子最少的路径（0-1广度优先搜索）
+
+    走进可通行格子的代价为0，走进需要打通的格子的代价为1，不可打通的格子（如地图边界）无法经过。
+
+    Args:
+        walkable: bool数组，形状为 (高, 宽)
+        carvable: bool数组，可以被打通的格子
+        start: 起点 (x, y)
+        goal_mask: bool数组，到达其中任一格即可
+
+    Returns:
+        list: 需要打通的格子坐标列表，无法连通时返回None
+    """
+    height, width = walkable.shape
+    start_cost = 0 if walkable[start[1], start[0]] else 1
+    costs = {start: start_cost}
+    previous = {start: None}
+    frontier = deque([(start_cost, start)])
+    while frontier:
+        cost, (x, y) = frontier.popleft()
+        if cost > costs[(x, y)]:
+            continue
+        if goal_mask[y, x]:
+            cells = []
+            cell = (x, y)
+            while cell is not None:
+                if not walkable[cell[1], cell[0]]:
+                    cells.append(cell)
+                cell = previous[cell]
+            return cells
+        for dx, dy in DIRECTIONS:
+            nx, ny = x + dx, y + dy
+            if not (0 <= nx < width and 0 <= ny < height):
+                continue
+            if walkable[ny, nx]:
+                step = 0
+            elif carvable[ny, nx]:
+                step = 1
+            else:
+                continue
+            if cost + step < costs.get((nx, ny), cost + step + 1):
+                costs[(nx, ny)] = cost + step
+                previous[(nx, ny)] = (x, y)
+                if step:
+                    frontier.append((cost + step, (nx, ny)))
+                else:
+                    frontier.appendleft((cost, (nx, ny)))
+    return None
+
+def connect_points(walkable, points):
+    """打通最少的格子，使所有关键点与第一个关键点连通
+
+    地图最外一圈是边界，不会被打通；落在不可通行格子上的关键点本身会被打通。
+
+    Args:
+        walkable: bool数组，形状为 (高, 宽)，会被原地修改
+        points: 关键点坐标列表
+
+    Returns:
+        list: 被打通的格子坐标列表，无法连通时返回None
+    """
+    carvable = np.zeros_like(walkable)
+    carvable[1:-1, 1:-1] = True
+    carved = [(x, y) for x, y in points if not walkable[y, x]]
+    for x, y in carved:
+        walkable[y, x] = True
+    for point in find_disconnected(walkable, points):
+        labels = label_components(walkable)
+        main = labels[points[0][1], points[0][0]]
+        if labels[point[1], point[0]] == main:
+            continue  # 之前打通的路径已经连通了这个点
+        cells = carve_path(walkable, carvable, point, labels == main)
+        if cells is None:
+            return None
+        for x, y in cells:
+            walkable[y, x] = True
+        carved.extend(cells)
+    return carved
@@ -0,0 +1,69 @@
+WHEEL_SLOTS = 16  # 时间轮的槽数，不小于常见招式的冷却回合数
+
+
+class CooldownManager:
+    """
+    单个角色的招式冷却，用以回合为刻度的时间轮管理
+
+    每个冷却按结束的回合放入时间轮的一个槽中，推进一回合只检查当前槽里的条目；
+    冷却超过一圈的条目留在槽中，转到结束的那一圈时才移除。
+    是否可用只查ready_at字典，不遍历招式。
+    """
+    def __init__(self, slots=WHEEL_SLOTS):
+        self.round = 0  # 角色已经过的回合数
+        self.wheel = [[] for _ in range(slots)]  # 每个槽中为 (结束回合, 招式名称)
+        self.ready_at = {}  # 冷却中的招式名称 -> 冷却结束的回合
+
+    def start(self, name, rounds):
+        """招式进入冷却，rounds回合后可以再次使用"""
+        if rounds <= 0:
+            self.ready_at.pop(name, None)
+            return
+        when = self.round + rounds
+        self.ready_at[name] = when
+        self.wheel[when % len(self.wheel)].append((when, name))
+
+    def is_ready(self, name):
+        """招式是否已冷却完毕"""
+        return name not in self.ready_at
+
+    def remaining(self, name):
+        """招式剩余的冷却回合数，可用时为0"""
+        when = self.ready_at.get(name)
+        return 0 if when is None else when - self.round
+
+    def advance(self, rounds=1):
+        """推进rounds回合
+
+        Returns:
+            list: 本次冷却完毕的招式名称
+        """
+        ready = []
+        for _ in range(rounds):
+            self.round += 1
+            slot = self.wheel[self.round % len(self.wheel)]
+            if not slot:
+                continue
+            pending = []
+            for when, name in slot:
+                if when > self.round:
+                    pending.append((when, name))  # 还要再转几圈
+                elif self.ready_at.get(name) == when:
+                    del self.ready_at[name]
+                    ready.append(name)
+                # 其余为重新进入冷却或已被清除的招式留下的旧条目
+            slot[:] = pending
+        return ready
+
+    def clear(self):
+        """清除所有冷却"""
+        self.ready_at.clear()
+        for slot in self.wheel:
+            slot.clear()
+
+
+def cooldowns_of(actor):
+    """角色的冷却管理器，没有时创建"""
+    if not hasattr(actor, "cooldowns"):
+        actor.cooldowns = CooldownManager()
+    return actor.cooldowns
@@ -0,0 +1,131 @@
+import numpy as np
+
+# 游荡的怪物每次更新移动的概率
+WANDER_MOVE_CHANCE = 0.1
+# 未设置速度的怪物的默认速度
+MONSTER_SPEED = 5
+
+
+class MonsterArrays:
+    """
+    怪物坐标数组
+
+    怪物本身仍是字典，这里按槽位把所有怪物的坐标和速度另存为NumPy数组，
+    批量移动时可以一次性读取和判断全部怪物，而不必逐个访问字典。
+    槽位顺序与World.monsters无关，移除怪物时用最后一个槽位填补空缺，加入和移除都是O(1)。
+    """
+    def __init__(self, capacity=64):
+        self.entries = []  # 槽位 -> 怪物字典
+        self.slots = {}  # id(怪物) -> 槽位
+        self.xs = np.zeros(capacity, dtype=np.int32)
+        self.ys = np.zeros(capacity, dtype=np.int32)
+        self.speeds = np.zeros(capacity, dtype=np.int32)
+        self.speed_counts = {}  # 速度 -> 怪物数量
+
+    def __len__(self):
+        return len(self.entries)
+
+    def clear(self):
+        """清空数组"""
+        self.entries = []
+        self.slots = {}
+        self.speed_counts = {}
+
+    def rebuild(self, monsters):
+        """根据怪物列表重建数组"""
+        self.clear()
+        for monster in monsters:
+            self.add(monster)
+
+    def add(self, monster):
+        """加入一只怪物"""
+        slot = len(self.entries)
+        if slot == len(self.xs):
+            # 容量不足时加倍
+            self.xs = np.resize(self.xs, slot * 2)
+            self.ys = np.resize(self.ys, slot * 2)
+            self.speeds = np.resize(self.speeds, slot * 2)
+        speed = monster.get("speed", MONSTER_SPEED)
+        self.entries.append(monster)
+        self.slots[id(monster)] = slot
+        self.xs[slot] = monster["x"]
+        self.ys[slot] = monster["y"]
+        self.speeds[slot] = speed
+        self.speed_counts[speed] = self.speed_counts.get(speed, 0) + 1
+
+    def remove(self, monster):
+        """移除一只怪物，最后一个槽位上的怪物移到空出的槽位"""
+        slot = self.slots.pop(id(monster), None)
+        if slot is None:
+            return
+        speed = int(self.speeds[slot])
+        self.speed_counts[speed] -= 1
+        if not self.speed_counts[speed]:
+            del self.speed_counts[speed]
+        last = self.entries.pop()
+        if last is not monster:
+            self.entries[slot] = last
+            self.slots[id(last)] = slot
+            self.xs[slot] = self.xs[len(self.entries)]
+            self.ys[slot] = self.ys[len(self.entries)]
+            self.speeds[slot] = self.speeds[len(self.entries)]
+
+    def move(self, monster, x, y):
+        """记录一只怪物的新坐标"""
+        slot = self.slots.get(id(monster))
+        if slot is not None:
+            self.xs[slot] = x
+            self.ys[slot] = y
+
+    def get_slots(self, monsters):
+        """获取一组怪物的槽位数组"""
+        slots = self.slots
+        return np.fromiter((slots[id(monster)] for monster in monsters), dtype=np.intp,
+                           count=len(monsters))
+
+    def get_speed_slots(self, speed):
+        """获取某一速度的所有怪物的槽位数组"""
+        return np.flatnonzero(self.speeds[:len(self.entries)] == speed)
+
+    def positions(self):
+        """所有怪物的坐标数组 (xs, ys)，是内部数组的视图"""
+        count = len(self.entries)
+        return self.xs[:count], self.ys[:count]
+
+
+def wander_step(xs, ys, candidates, blocked, origin, rng, chance=WANDER_MOVE_CHANCE):
+    """批量计算游荡怪物的随机移动
+
+    一次抽取所有候选怪物是否移动以及移动方向，在同一遍向量运算中检查目标格子的地形和占用。
+    多只怪物选中同一格时，候选顺序中靠前的怪物获胜；怪物不会走进本次更新开始时
+    被占用的格子（包括本次才空出的格子），因此结果与处理顺序无关，相同的随机数流总是得到相同的结果。
+
+    Args:
+        xs, ys: 所有怪物的坐标数组
+        candidates: 参与游荡的怪物槽位数组
+        blocked: 不可进入的格子，bool数组，形状为 (高, 宽)，包括不可通行的地形和已被占用的格子
+        origin: blocked中 [0, 0] 对应的世界坐标 (x, y)
+        rng: NumPy随机数生成器
+        chance: 每只怪物移动的概率
+
+    Returns:
+        tuple: (移动的怪物槽位, 新x坐标, 新y坐标)
+    """
+    movers = candidates[rng.random(len(candidates)) < chance]
+    steps = rng.integers(-1, 2, size=(2, len(movers)))
+    moving = (steps[0] != 0) | (steps[1] != 0)
+    movers, steps = movers[moving], steps[:, moving]
+
+    # 换算为blocked中的坐标，超出范围的目标视为不可进入
+    local_x = xs[movers] + steps[0] - origin[0]
+    local_y = ys[movers] + steps[1] - origin[1]
+    height, width = blocked.shape
+    inside = (local_x >= 0) & (local_x < width) & (local_y >= 0) & (local_y < height)
+    movers, local_x, local_y = movers[inside], local_x[inside], local_y[inside]
+    free = ~blocked[local_y, local_x]
+    movers, local_x, local_y = movers[free], local_x[free], local_y[free]
+
+    # 同一目标格子只保留第一只怪物
+    _, first = np.unique(local_y.astype(np.int64) * width + local_x, return_index=True)
+    first.sort()
+    return movers[first], local_x[first] + origin[0], local_y[first] + origin[1]
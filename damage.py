@@ -0,0 +1,140 @@
+"""
+统一的击中伤害流程，按策划案的顺序：命中判定 → 暴击判定 → 五行相生相克 → 境界差 → 防御减免
+
+五行克制和境界差的倍率都预先算成查找表，一次击中只需几次查表。
+标量版本供交互战斗逐次调用，数组版本供批量模拟一次处理整批伤害。
+"""
+
+import random
+import numpy as np
+
+# 伤害的属性，与HeartMethod.qi_attribute相同；neutral为无属性，chaos为混沌，二者不受五行克制影响
+ELEMENTS = ["neutral", "metal", "wood", "water", "fire", "earth", "chaos"]
+ELEMENT_INDEX = {element: i for i, element in enumerate(ELEMENTS)}
+# 中文属性名
+ELEMENT_ALIASES = {"金": "metal", "木": "wood", "水": "water", "火": "fire", "土": "earth",
+                   "混元": "chaos", "混沌": "chaos"}
+# 五行相克：金克木、木克土、土克水、水克火、火克金
+COUNTERS = {"metal": "wood", "wood": "earth", "earth": "water", "water": "fire", "fire": "metal"}
+COUNTER_MULTIPLIER = 1.2  # 克制对方属性时的伤害倍率
+COUNTERED_MULTIPLIER = 0.8  # 被对方属性克制时的伤害倍率
+
+# 境界差：攻击方每高出一个境界伤害增加REALM_STEP，倍率限制在 [MIN_REALM_MULTIPLIER, MAX_REALM_MULTIPLIER]
+REALM_COUNT = 10  # 九品到洞玄，level为9到0
+NO_REALM = REALM_COUNT  # 没有境界的单位（如普通怪物）在查找表中的下标，不受境界差影响
+REALM_STEP = 0.1
+MIN_REALM_MULTIPLIER = 0.5
+MAX_REALM_MULTIPLIER = 2.0
+
+HIT_CHANCE = 1.0  # 对没有闪避的目标的命中率
+CRIT_MULTIPLIER = 1.5  # 暴击伤害倍率
+
+# 一次击中的结果
+MISS = 0
+HIT = 1
+CRIT = 2
+
+
+def _build_element_matrix():
+    """五行倍率表，ELEMENT_MATRIX[攻击方属性, 目标属性]"""
+    matrix = np.ones((len(ELEMENTS), len(ELEMENTS)))
+    for attacker, target in COUNTERS.items():
+        matrix[ELEMENT_INDEX[attacker], ELEMENT_INDEX[target]] = COUNTER_MULTIPLIER
+        matrix[ELEMENT_INDEX[target], ELEMENT_INDEX[attacker]] = COUNTERED_MULTIPLIER
+    return matrix
+
+def _build_realm_matrix():
+    """境界差倍率表，REALM_MATRIX[攻击方境界, 目标境界]，最后一行和一列为没有境界的单位"""
+    levels = np.arange(REALM_COUNT)
+    # level越小境界越高，目标的level减去攻击方的level就是攻击方高出的境界数
+    difference = levels[None, :] - levels[:, None]
+    matrix = np.ones((REALM_COUNT + 1, REALM_COUNT + 1))
+    matrix[:REALM_COUNT, :REALM_COUNT] = np.clip(1 + REALM_STEP * difference,
+                                                 MIN_REALM_MULTIPLIER, MAX_REALM_MULTIPLIER)
+    return matrix
+
+ELEMENT_MATRIX = _build_element_matrix()
+REALM_MATRIX = _build_realm_matrix()
+# 标量版本查表使用的嵌套列表，避免逐次索引NumPy数组的开销
+_ELEMENT_TABLE = ELEMENT_MATRIX.tolist()
+_REALM_TABLE = REALM_MATRIX.tolist()
+
+
+def element_index(element):
+    """属性名（英文或中文）在倍率表中的下标，未知属性视为无属性"""
+    return ELEMENT_INDEX.get(ELEMENT_ALIASES.get(element, element), 0)
+
+def realm_index(level):
+    """境界在倍率表中的下标，没有境界时为NO_REALM"""
+    return NO_REALM if level is None else level
+
+def element_of(entity):
+    """单位的伤害属性：玩家取先天心法的内力属性，怪物取element属性"""
+    heart_method = getattr(entity, "inborn_heart_method", None)
+    if heart_method is not None:
+        return heart_method.qi_attribute
+    return getattr(entity, "element", "neutral")
+
+def realm_of(entity):
+    """单位的境界：玩家取level，怪物取realm属性，没有时为None"""
+    if hasattr(entity, "inborn_heart_method"):
+        return entity.level
+    return getattr(entity, "realm", None)
+
+def multiplier(attacker_element, target_element, attacker_realm=None, target_realm=None):
+    """五行和境界差的综合倍率"""
+    return _ELEMENT_TABLE[element_index(attacker_element)][element_index(target_element)] * \
+        _REALM_TABLE[realm_index(attacker_realm)][realm_index(target_realm)]
+
+def mitigate(amount, defense, defense_ratio=1.0):
+    """防御减免，至少造成1点伤害"""
+    return max(1, int(amount - defense * defense_ratio))
+
+def scale_hit(amount, attacker, target, rng=random):
+    """按命中、暴击、五行和境界差处理一次击中，防御减免由目标的take_damage完成
+
+    没有闪避或暴击率的单位不会掷骰，不消耗随机数。
+
+    Returns:
+        (int, int): 防御减免前的伤害和击中结果（MISS、HIT或CRIT），未命中时伤害为0
+    """
+    hit_chance = HIT_CHANCE - getattr(target, "dodge_chance", 0)
+    if hit_chance < 1 and rng.random() >= hit_chance:
+        return 0, MISS
+    outcome = HIT
+    crit_chance = getattr(attacker, "critical_chance", 0)
+    if crit_chance > 0 and rng.random() < crit_chance:
+        amount *= CRIT_MULTIPLIER
+        outcome = CRIT
+    scale = _ELEMENT_TABLE[element_index(element_of(attacker))][element_index(element_of(target))] * \
+        _REALM_TABLE[realm_index(realm_of(attacker))][realm_index(realm_of(target))]
+    return int(amount * scale), outcome
+
+def scale_hits(amounts, scale, crit_chance=0.0, dodge_chance=0.0, rng=None):
+    """scale_hit的数组版本，一次处理一批击中
+
+    Args:
+        amounts: 基础伤害数组
+        scale: 五行和境界差的倍率，可以是标量或与amounts等长的数组（如 ELEMENT_MATRIX[攻击方, 目标]）
+        crit_chance, dodge_chance: 暴击率和目标的闪避率，可以是标量或数组
+        rng: NumPy随机数生成器，只在暴击率或闪避率大于0时使用
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 防御减免前的伤害（int64）和击中结果
+    """
+    amounts = np.asarray(amounts, dtype=np.float64)
+    outcome = np.full(amounts.shape, HIT, dtype=np.int8)
+    if np.any(np.asarray(crit_chance) > 0):
+        crit = rng.random(amounts.shape) < crit_chance
+        amounts = np.where(crit, amounts * CRIT_MULTIPLIER, amounts)
+        outcome[crit] = CRIT
+    damage = (amounts * scale).astype(np.int64)
+    if np.any(np.asarray(dodge_chance) > 0):
+        miss = rng.random(amounts.shape) >= HIT_CHANCE - np.asarray(dodge_chance)
+        damage[miss] = 0
+        outcome[miss] = MISS
+    return damage, outcome
+
+def mitigate_array(amounts, defense, defense_ratio=1.0):
+    """mitigate的数组版本"""
+    return np.maximum(1, (amounts - np.asarray(defense) * defense_ratio).astype(np.int64))
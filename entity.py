@@ -1,3 +1,8 @@
+from damage import mitigate
+
+# 怪物攻击伤害的随机浮动比例（±20%）
+ATTACK_VARIANCE = 0.2
+
 class Entity:
     def __init__(self, x, y, char):
         self.x = x
@@ -32,7 +37,7 @@ class NPC(Entity):
         return [quest for quest in self.quests if not quest.completed]
 
 class Monster(Entity):
-    def __init__(self, x, y, char, name, health=100, attack=10, defense=5, experience=50):
+    def __init__(self, x, y, char, name, health=100, attack=10, defense=5, experience=50, speed=5):
         super().__init__(x, y, char)
         self.name = name
         self.health = health
@@ -40,10 +45,11 @@ class Monster(Entity):
         self.attack = attack
         self.defense = defense
         self.experience = experience
+        self.speed = speed
         self.loot = []
     
-    def take_damage(self, amount):
-        actual_damage = max(1, amount - self.defense)
+    def take_damage(self, amount, defense_ratio=1.0):
+        actual_damage = mitigate(amount, self.defense, defense_ratio)
         self.health -= actual_damage
         return actual_damage
     
@@ -53,19 +59,20 @@ class Monster(Entity):
     def get_attack_damage(self):
         # Add some randomness to monster attacks
         import random
-        variance = 0.2  # 20% variance
-        multiplier = 1.0 + random.uniform(-variance, variance)
+        multiplier = 1.0 + random.uniform(-ATTACK_VARIANCE, ATTACK_VARIANCE)
         return int(self.attack * multiplier)
     
     def add_loot(self, item, drop_chance=1.0):
         # drop_chance is between 0.0 and 1.0
         self.loot.append((item, drop_chance))
     
-    def get_loot(self):
+    def get_loot(self, rng=None):
+        # rng: independent random stream for this loot roll
         import random
+        rng = rng or random
         dropped_items = []
         for item, chance in self.loot:
-            if random.random() <= chance:
+            if rng.random() <= chance:
                 dropped_items.append(item)
         return dropped_items
 
@@ -0,0 +1,126 @@
+import numpy as np
+from pathfinding import DIRECTIONS
+
+# 距离场的最大半径（格），超出范围的怪物不会察觉玩家
+FIELD_RADIUS = 24
+
+
+class DistanceField:
+    """
+    到玩家的共享距离场（Dijkstra地图）
+
+    以玩家为源点在可通行数组上做一次广度优先搜索，得到附近每个格子到玩家的步数。
+    搜索只在以玩家为中心、边长2*radius+1的窗口内进行，每一步用数组位移同时扩展整圈边界。
+    所有怪物只需读取自身相邻格子的距离就能决定追击、逃跑或保持距离，
+    每次更新的代价与怪物数量无关。玩家只移动了一步、地形不变时沿用上次的距离场，
+    距离最多相差一步。
+    """
+    def __init__(self, radius=FIELD_RADIUS):
+        self.radius = radius
+        self.distances = np.full((0, 0), -1, dtype=np.int32)  # 窗口内到玩家的步数，范围外为-1
+        self.origin = (0, 0)  # 窗口左上角的世界坐标
+        self.source = None  # 上次计算时的玩家坐标
+        self.key = None  # (区域, 区域种子)
+        self.mask = None  # 上次计算使用的可通行数组，World在地形变化时会换成新的数组
+
+    def update(self, world, target):
+        """玩家离开上次的源点超过一步或地形变化后重新计算距离场
+
+        Args:
+            world: 世界对象，提供 get_walkable_mask()
+            target: 玩家坐标 (x, y)
+
+        Returns:
+            bool: 是否重新计算了距离场
+        """
+        key = (world.current_area, world.area_seed_value)
+        mask = world.get_walkable_mask()
+        if key == self.key and mask is self.mask and self.source is not None and \
+                abs(target[0] - self.source[0]) + abs(target[1] - self.source[1]) <= 1:
+            return False
+        self.key = key
+        self.mask = mask
+        self.source = target
+
+        (origin_x, origin_y), walkable = mask
+        height, width = walkable.shape
+        tx, ty = target[0] - origin_x, target[1] - origin_y
+        radius = self.radius
+        x0, y0 = max(0, tx - radius), max(0, ty - radius)
+        x1, y1 = min(width, tx + radius + 1), min(height, ty + radius + 1)
+        self.origin = (origin_x + x0, origin_y + y0)
+        if x0 >= x1 or y0 >= y1:
+            self.distances = np.full((0, 0), -1, dtype=np.int32)
+            return True
+
+        window = walkable[y0:y1, x0:x1]
+        distances = np.full(window.shape, -1, dtype=np.int32)
+        frontier = np.zeros(window.shape, dtype=bool)
+        if x0 <= tx < x1 and y0 <= ty < y1:
+            distances[ty - y0, tx - x0] = 0
+            frontier[ty - y0, tx - x0] = True
+        for distance in range(1, radius + 1):
+            # 边界上每个格子的四个相邻格子
+            grown = np.zeros_like(frontier)
+            grown[1:, :] |= frontier[:-1, :]
+            grown[:-1, :] |= frontier[1:, :]
+            grown[:, 1:] |= frontier[:, :-1]
+            grown[:, :-1] |= frontier[:, 1:]
+            grown &= window & (distances < 0)
+            if not grown.any():
+                break
+            distances[grown] = distance
+            frontier = grown
+        self.distances = distances
+        return True
+
+    def invalidate(self):
+        """地形改变后调用，下次更新时重新计算"""
+        self.key = None
+
+    def get(self, x, y):
+        """获取格子到玩家的步数，不在范围内时返回None"""
+        local_x, local_y = x - self.origin[0], y - self.origin[1]
+        height, width = self.distances.shape
+        if 0 <= local_x < width and 0 <= local_y < height:
+            distance = int(self.distances[local_y, local_x])
+            if distance >= 0:
+                return distance
+        return None
+
+    def best_step(self, x, y, score, can_enter):
+        """在相邻格子中选择得分最低的一格
+
+        Args:
+            x, y: 怪物当前位置
+            score: 根据到玩家的步数打分的函数，越小越好
+            can_enter: 判断怪物能否进入格子的函数
+
+        Returns:
+            tuple: 比当前位置更好的相邻格子，没有时返回None
+        """
+        current = self.get(x, y)
+        if current is None:
+            return None
+        best, best_score = None, score(current)
+        for dx, dy in DIRECTIONS:
+            neighbor = (x + dx, y + dy)
+            distance = self.get(*neighbor)
+            if distance is None or distance == 0:
+                continue  # 范围之外或玩家所在的格子
+            neighbor_score = score(distance)
+            if neighbor_score < best_score and can_enter(*neighbor):
+                best, best_score = neighbor, neighbor_score
+        return best
+
+    def step_toward(self, x, y, can_enter):
+        """追击：向玩家靠近一步"""
+        return self.best_step(x, y, lambda distance: distance, can_enter)
+
+    def step_away(self, x, y, can_enter):
+        """逃跑：远离玩家一步"""
+        return self.best_step(x, y, lambda distance: -distance, can_enter)
+
+    def step_to_range(self, x, y, preferred, can_enter):
+        """保持距离：向与玩家相距preferred步的位置移动一步"""
+        return self.best_step(x, y, lambda distance: abs(distance - preferred), can_enter)
@@ -0,0 +1,130 @@
+from functools import lru_cache
+import numpy as np
+from terrain import TERRAIN_CHARS, CHAR_TO_TERRAIN_ID, WALKABLE_TABLE
+
+
+def terrain_ids_for(names):
+    """把地形名称列表转换为按ID排序的地形ID元组
+
+    地图按字符保存，共用同一字符的地形（例如地面和小路）读回时是同一个ID。
+    同一组地形只转换一次，刷怪点每次刷新时直接取用。
+    """
+    return _terrain_ids(tuple(names))
+
+@lru_cache(maxsize=None)
+def _terrain_ids(names):
+    return tuple(sorted({CHAR_TO_TERRAIN_ID[TERRAIN_CHARS[name]] for name in names}))
+
+
+class FreeCellIndex:
+    """
+    空闲格子索引
+
+    按地形把区域中可以放置怪物的格子分组保存。每组是一个格子编号数组，前count个是空闲的格子，
+    其后是被占用的格子；另有一张表记录每个格子在组内的下标。
+    占用格子时把它与最后一个空闲格子交换，释放时与第一个被占用的格子交换，
+    因此随机抽取、占用和释放都是O(1)，生成N只怪物正好只需N次抽取，不受地图拥挤程度影响。
+    """
+    def __init__(self, terrain, blocked, region=None):
+        """建立索引
+
+        Args:
+            terrain: 地形ID数组，形状为 (高, 宽)
+            blocked: 已被占用的格子，bool数组，形状与terrain相同
+            region: 允许放置的矩形 (x0, y0, x1, y1)，包含边界；为None时为整张地图
+        """
+        self.height, self.width = terrain.shape
+        allowed = WALKABLE_TABLE[terrain]
+        if region is not None:
+            x0, y0, x1, y1 = region
+            inside = np.zeros_like(allowed)
+            inside[max(0, y0):y1 + 1, max(0, x0):x1 + 1] = True
+            allowed &= inside
+
+        flat_terrain = terrain.ravel()
+        flat_allowed = allowed.ravel()
+        flat_blocked = blocked.ravel()
+        # 不属于任何组（不可通行或在区域之外）的格子组号为-1
+        self.group_of = np.where(flat_allowed, flat_terrain.astype(np.int16), -1)
+        self.where = np.full(terrain.size, -1, dtype=np.int64)  # 格子 -> 组内下标
+        self.cells = {}  # 地形ID -> 格子编号数组，空闲的格子在前
+        self.counts = {}  # 地形ID -> 空闲格子数量
+        for terrain_id in np.unique(flat_terrain[flat_allowed]).tolist():
+            in_group = self.group_of == terrain_id
+            free = np.flatnonzero(in_group & ~flat_blocked)
+            taken = np.flatnonzero(in_group & flat_blocked)
+            cells = np.concatenate([free, taken])
+            self.cells[terrain_id] = cells
+            self.counts[terrain_id] = len(free)
+            self.where[cells] = np.arange(len(cells))
+
+    def count(self, terrain_ids):
+        """指定地形中空闲格子的数量"""
+        return sum(self.counts.get(terrain_id, 0) for terrain_id in terrain_ids)
+
+    def sample(self, rng, terrain_ids):
+        """在指定地形的空闲格子中均匀随机选取一格
+
+        Args:
+            rng: random.Random
+            terrain_ids: 地形ID列表
+
+        Returns:
+            tuple: 格子坐标 (x, y)，没有空闲格子时返回None
+        """
+        total = self.count(terrain_ids)
+        if total == 0:
+            return None
+        pick = rng.randrange(total)
+        for terrain_id in terrain_ids:
+            count = self.counts.get(terrain_id, 0)
+            if pick < count:
+                cell = int(self.cells[terrain_id][pick])
+                return cell % self.width, cell // self.width
+            pick -= count
+        return None
+
+    def take(self, rng, terrain_ids):
+        """随机选取一格并标记为占用，没有空闲格子时返回None"""
+        position = self.sample(rng, terrain_ids)
+        if position is not None:
+            self.occupy(*position)
+        return position
+
+    def is_free(self, x, y):
+        """格子是否在索引中且空闲"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return False
+        cell = y * self.width + x
+        terrain_id = int(self.group_of[cell])
+        return terrain_id >= 0 and self.where[cell] < self.counts[terrain_id]
+
+    def _swap(self, cells, i, j):
+        """交换组内两个位置上的格子"""
+        a, b = cells[i], cells[j]
+        cells[i], cells[j] = b, a
+        self.where[a], self.where[b] = j, i
+
+    def occupy(self, x, y):
+        """标记格子被占用，不属于任何组或已被占用时忽略"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        cell = y * self.width + x
+        terrain_id = int(self.group_of[cell])
+        if terrain_id < 0 or self.where[cell] >= self.counts[terrain_id]:
+            return
+        last = self.counts[terrain_id] - 1
+        self._swap(self.cells[terrain_id], self.where[cell], last)
+        self.counts[terrain_id] = last
+
+    def release(self, x, y):
+        """标记格子重新空闲，不属于任何组或已空闲时忽略"""
+        if not (0 <= x < self.width and 0 <= y < self.height):
+            return
+        cell = y * self.width + x
+        terrain_id = int(self.group_of[cell])
+        if terrain_id < 0 or self.where[cell] < self.counts[terrain_id]:
+            return
+        count = self.counts[terrain_id]
+        self._swap(self.cells[terrain_id], self.where[cell], count)
+        self.counts[terrain_id] = count + 1
@@ -16,9 +16,26 @@ import random
 import sys
 from npc import NPC
 from item import generate_monster_drop  # 导入物品掉落函数
+from prefetch import AreaPrefetcher
+from layout_cache import LayoutCache
+from world import LAYOUT_CACHE_FILE, VIEW_WIDTH, VIEW_HEIGHT, TILE_SIZE, TICKS_PER_TURN, ARENA_START
+from pathfinding import PathCache, find_path
+from travel import AreaGraph
+from arena import ArenaMode
+from clock import RealClock
+from odds import monster_odds, format_odds
+from status import StatusEffectSystem, TICKS_PER_ROUND
 
 class Game:
-    def __init__(self):
+    def __init__(self, seed=None, arena_waves=None, clock=None):
+        """初始化游戏
+        
+        Args:
+            seed: 世界种子，相同的种子生成相同的区域布局、怪物和战利品；默认随机
+            arena_waves: 各波怪物数量，指定时直接进入群战擂台模式
+            clock: 游戏节奏使用的时钟，默认为真实时钟；无窗口运行时可以传入虚拟时钟
+        """
+        self.clock = clock or RealClock()
         self.width, self.height = 900, 530
         # 设置窗口为可调整大小
         self.screen = pygame.display.set_mode((self.width, self.height), pygame.RESIZABLE)
@@ -39,10 +56,16 @@ class Game:
         self.log_system = LogSystem(max_logs=8)  # 最多显示8条日志
         
         # Set up game systems
-        self.world = World(40, 25)  # 40x25 grid for the game world
+        self.world = World(40, 25, seed=seed)  # 40x25 grid for the game world
+        # 载入预生成的区域布局（如果有），相同种子的区域无需重新生成
+        self.world.set_layout_cache(LayoutCache.load(LAYOUT_CACHE_FILE))
+        # 在后台预生成相邻区域，避免进入区域时卡顿
+        self.world.set_prefetcher(AreaPrefetcher())
+        # 由各区域传送门构成的区域图，用于跨区域的自动前往
+        self.area_graph = AreaGraph.from_world(self.world)
         self.player = Player(20, 12)  # Start player in the middle
         self.ui = UI(self.screen, self.chinese_font)
-        self.combat = Combat()
+        self.combat = Combat(self.clock)
         self.combat.set_log_system(self.log_system)  # 将日志系统传递给战斗系统
         self.quest_system = QuestSystem()
         self.quest_system.set_log_system(self.log_system)  # 将日志系统传递给任务系统
@@ -65,10 +88,13 @@ class Game:
         self.state = "EXPLORATION"  # EXPLORATION, DIALOG, COMBAT, BREAKTHROUGH, HEART_METHOD_SELECTION
         self.current_npc = None
         self.current_monster = None
+        self.combat_odds = None  # 战斗开始时计算的胜率提示
         
-        # 控制游戏更新速度
-        self.last_monster_move_time = time.time()
-        self.monster_move_delay = 0.5  # 怪物AI行动间隔(秒)
+        # 控制游戏更新速度：世界时间按时间单位推进，怪物按速度积累能量行动
+        self.last_world_tick_time = self.clock.now()
+        self.world_tick_delay = 0.025  # 每个时间单位对应的秒数，速度5的怪物每0.5秒行动一次
+        # 玩家和怪物身上的状态效果，按同样的时间单位结算，战斗中也继续计时
+        self.status_system = StatusEffectSystem(self.get_status_time())
         
         # 系统启动日志
         self.log_system.add("欢迎来到Novelive - 让小说活过来", "system")
@@ -82,6 +108,24 @@ class Game:
         self.clicked_position = None
         self.click_indicator_timer = 0
         
+        # 点击移动：规划好的路径会在之后的帧中逐格走完
+        self.path_cache = PathCache()
+        self.move_path = []  # 剩余路径 [(x, y), ...]
+        self.move_goal = None  # 路径终点
+        self.last_path_step_time = self.clock.now()
+        self.path_step_delay = 0.1  # 沿路径行走的间隔(秒)
+        # 跨区域自动前往的目的地 (区域, 坐标)，坐标为None时到达区域即可
+        self.travel_goal = None
+        
+        # 群战擂台模式
+        self.arena = None
+        if arena_waves:
+            self.start_arena(arena_waves)
+        
+    def shutdown(self):
+        """退出游戏前关闭后台的区域预生成线程"""
+        self.world.close_prefetcher()
+        
     def handle_input(self, event):
         # 处理窗口调整事件
         if event.type == pygame.QUIT:
@@ -89,6 +133,11 @@ class Game:
         
         if self.state == "EXPLORATION":
             if event.type == pygame.KEYDOWN:
+                # 键盘移动会取消点击移动的路径和自动前往
+                if event.key in (pygame.K_w, pygame.K_s, pygame.K_a, pygame.K_d):
+                    self.move_path = []
+                    self.travel_goal = None
+                
                 # Movement controls
                 if event.key == pygame.K_w:
                     self.try_move(0, -1)
@@ -101,9 +150,15 @@ class Game:
                 # Interaction
                 elif event.key == pygame.K_e:
                     self.interact()
+                # 前往可以回报任务的NPC
+                elif event.key == pygame.K_t:
+                    self.travel_to_quest_npc()
                 # 突破境界
                 elif event.key == pygame.K_b:
                     self.attempt_breakthrough()
+                # 群战擂台中立即放入下一波怪物
+                elif event.key == pygame.K_n and self.arena and self.arena.is_active():
+                    self.next_arena_wave()
                 # 查看状态 - 切换显示/隐藏状态界面
                 elif event.key == pygame.K_c:
                     self.show_stats_screen = not self.show_stats_screen
@@ -494,12 +549,15 @@ class Game:
             else:
                 # 移动玩家
                 self.player.move(dx, dy)
+                # 大地图中载入玩家附近的区块
+                self.world.stream_chunks(self.player.x, self.player.y)
                 
                 # 检查是否踩到传送门
                 portal = self.world.check_portal(new_x, new_y)
                 if portal:
                     self.change_area(portal)
-                    area_name = self.world.area_info.get(portal, {}).get('name', portal)
+                    current_area = self.world.current_area
+                    area_name = self.world.area_info.get(current_area, {}).get('name', current_area)
                     self.log_system.add(f"你进入了{area_name}", "system")
                 
                 # 移动后检查是否有相邻的怪物
@@ -562,6 +620,8 @@ class Game:
         self.current_monster = monster
         self.state = "COMBAT"
         self.combat.start_combat(self.player, monster)
+        # 按战斗开始时的状态精确计算自动战斗的胜率
+        self.combat_odds = format_odds(monster_odds(self.player, monster))
         self.log_system.add(f"与{monster.name}战斗开始！1-普通攻击 2-特殊攻击 3-防御 A-自动战斗", "combat")
     
     def attempt_breakthrough(self):
@@ -614,6 +674,7 @@ class Game:
     def change_area(self, area_name):
         """切换游戏区域"""
         self.world.change_area(area_name)
+        self.world.stream_chunks(self.player.x, self.player.y)
         
         # 更新探索任务目标
         if self.player and self.quest_system:
@@ -623,22 +684,72 @@ class Game:
                 self.quest_system.update_explore_objectives(self.player, "cave_boss_room")
             # 可以添加更多特殊区域的判断
     
-    def update(self):
-        current_time = time.time()
+    def start_arena(self, waves):
+        """进入群战擂台，放入第一波怪物"""
+        self.change_area("arena")
+        self.player.x, self.player.y = ARENA_START
+        self.arena = ArenaMode(self.world, waves)
+        self.log_system.add("你进入了群战擂台，按N键立即迎接下一波", "system")
+        self.next_arena_wave()
+    
+    def next_arena_wave(self):
+        """放入擂台的下一波怪物"""
+        for message in self.arena.next_wave(self.player.x, self.player.y, self.clock.now()):
+            self.log_system.add(message, "combat")
+    
+    def get_status_time(self):
+        """状态效果使用的时刻（时间单位）：探索时的世界时间加上战斗中玩家出手的回合数对应的时间
         
-        # 更新玩家状态效果
-        self.player.update_status_effects()
+        对话、属性和背包等界面中世界时间不推进，状态效果也不会结算。
+        """
+        return self.world.world_time + self.combat.rounds_played * TICKS_PER_ROUND
+    
+    def update_status_effects(self):
+        """结算到时刻的状态效果，持续伤害可能击败玩家或战斗中的怪物"""
+        if self.status_system.update(self.get_status_time()):
+            if self.state == "COMBAT":
+                self.check_combat_state()
+            self.check_player_death()
+    
+    def update(self):
+        current_time = self.clock.now()
         
         # 更新鼠标点击指示器计时器
         if self.click_indicator_timer > 0:
             self.click_indicator_timer -= 1
         
         if self.state == "EXPLORATION":
-            # Only update monster movement after delay has passed
-            if current_time - self.last_monster_move_time >= self.monster_move_delay:
-                # Random monster movement or other world updates
-                self.world.update()
-                self.last_monster_move_time = current_time
+            # 自动前往时，走完一段路径后规划下一段
+            if self.travel_goal and not self.move_path:
+                self.plan_travel_leg()
+            
+            # 沿点击移动的路径前进一格
+            if self.move_path and current_time - self.last_path_step_time >= self.path_step_delay:
+                self.step_along_path()
+                self.last_path_step_time = current_time
+            
+            # 推进世界时间，就绪的怪物根据到玩家的距离场行动
+            ticks = int((current_time - self.last_world_tick_time) / self.world_tick_delay)
+            if ticks > 0:
+                if ticks > TICKS_PER_TURN:
+                    # 从其他界面返回时不补算落下的时间
+                    ticks = TICKS_PER_TURN
+                    self.last_world_tick_time = current_time
+                else:
+                    self.last_world_tick_time += ticks * self.world_tick_delay
+                # 追上玩家的怪物会发起战斗
+                tick_start = time.perf_counter()
+                monsters_acted = self.world.update(self.player.x, self.player.y, ticks)
+                if self.arena and self.arena.is_active():
+                    self.arena.stats.record_tick(time.perf_counter() - tick_start)
+                self.update_status_effects()
+                if monsters_acted and self.state == "EXPLORATION":
+                    self.check_adjacent_monsters()
+            
+            # 擂台中按时间间隔放入下一波怪物
+            if self.arena:
+                for message in self.arena.update(current_time, self.player.x, self.player.y):
+                    self.log_system.add(message, "combat")
                 
         elif self.state == "COMBAT":
             # 处理自动战斗
@@ -651,12 +762,12 @@ class Game:
             elif self.current_monster and self.current_monster.health > 0 and not self.combat.auto_combat:
                 self.combat.monster_attack(self.current_monster, self.player)
                 
-                # 更新招式冷却时间
-                if hasattr(self.player, "techniques"):
-                    self.technique_system.update_cooldowns(self.player.techniques)
-                
                 # 检查玩家是否阵亡
                 self.check_player_death()
+            
+            # 玩家出手后结算状态效果
+            if self.state == "COMBAT":
+                self.update_status_effects()
     
     def check_combat_state(self):
         """检查战斗状态，处理战斗结束等情况"""
@@ -671,7 +782,8 @@ class Game:
             self.log_system.add(f"你击败了{self.current_monster.name}，获得{exp_gained}点经验", "success")
             
             # 处理战利品
-            loot = getattr(self.current_monster, 'get_loot', lambda: [])()
+            loot_rng = self.world.make_loot_rng()
+            loot = getattr(self.current_monster, 'get_loot', lambda rng=None: [])(loot_rng)
             if loot:
                 for item in loot:
                     info = self.player.add_to_inventory(item)
@@ -685,6 +797,7 @@ class Game:
             # 更新世界中的怪物状态
             self.world.update_monster(self.current_monster)
             
+            self.status_system.clear(self.current_monster)
             self.current_monster = None
             self.state = "EXPLORATION"
         else:
@@ -698,42 +811,36 @@ class Game:
             self.log_system.add("你被击败了，生命值已耗尽！", "combat")
             self.log_system.add("你被救助回逍遥阁，恢复了一半生命值", "system")
             self.player.health = self.player.max_health // 2  # Revive with half health
+            self.status_system.clear(self.player)
+            if self.current_monster:
+                self.status_system.clear(self.current_monster)
             self.state = "EXPLORATION"
             self.current_monster = None
             # 传送回逍遥阁
             self.change_area("xiaoyao")
     
     def render(self):
+        render_start = time.perf_counter()
         self.screen.fill((0, 0, 0))  # Black background
         
         if self.state == "EXPLORATION":
             # 设置开始渲染的位置，确保玩家在视图中间
-            view_x = max(0, min(self.player.x - 15, self.world.width - 30))
-            view_y = max(0, min(self.player.y - 10, self.world.height - 20))
+            view_x, view_y = self.world.get_view_origin(self.player.x, self.player.y)
             
             # 渲染世界
             self.world.render(self.screen, self.chinese_font, view_x, view_y, self.player.x, self.player.y)
             
-            # 渲染鼠标点击位置指示器
-            if self.clicked_position and self.click_indicator_timer > 0:
-                grid_x, grid_y = self.clicked_position
-                # 转换为屏幕坐标
-                if view_x <= grid_x < view_x + 30 and view_y <= grid_y < view_y + 20:
-                    screen_x = (grid_x - view_x) * 20 + 20 // 2
-                    screen_y = (grid_y - view_y) * 20 + 20 // 2
-                    
-                    # 绘制指示器
-                    indicator_color = (255, 255, 0, min(255, self.click_indicator_timer * 25))  # 黄色，随时间淡出
-                    indicator_radius = 10
-                    
-                    # 创建一个临时的Surface来绘制半透明圆
-                    temp_surface = pygame.Surface((indicator_radius*2, indicator_radius*2), pygame.SRCALPHA)
-                    pygame.draw.circle(temp_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
-                    self.screen.blit(temp_surface, (screen_x - indicator_radius, screen_y - indicator_radius))
+            # 渲染点击移动的路径预览和鼠标点击位置指示器
+            self.render_path_preview(view_x, view_y)
+            self.render_click_indicator(view_x, view_y)
             
             # 渲染UI
             self.ui.render(self.player, self.log_system.get_recent_logs())
             
+            # 擂台中显示性能数据
+            if self.arena and self.arena.is_active():
+                self.arena.render(self.screen, self.chinese_font)
+            
             # 如果状态界面标志为True，渲染状态界面并将状态设为STATS
             if self.show_stats_screen:
                 self.state = "STATS"
@@ -741,26 +848,11 @@ class Game:
         
         elif self.state == "DIALOG":
             # 仍然在背景中渲染世界
-            view_x = max(0, min(self.player.x - 15, self.world.width - 30))
-            view_y = max(0, min(self.player.y - 10, self.world.height - 20))
+            view_x, view_y = self.world.get_view_origin(self.player.x, self.player.y)
             self.world.render(self.screen, self.chinese_font, view_x, view_y, self.player.x, self.player.y)
             
             # 渲染鼠标点击位置指示器 - 在对话模式下也显示
-            if self.clicked_position and self.click_indicator_timer > 0:
-                grid_x, grid_y = self.clicked_position
-                # 转换为屏幕坐标
-                if view_x <= grid_x < view_x + 30 and view_y <= grid_y < view_y + 20:
-                    screen_x = (grid_x - view_x) * 20 + 20 // 2
-                    screen_y = (grid_y - view_y) * 20 + 20 // 2
-                    
-                    # 绘制指示器
-                    indicator_color = (255, 255, 0, min(255, self.click_indicator_timer * 25))  # 黄色，随时间淡出
-                    indicator_radius = 10
-                    
-                    # 创建一个临时的Surface来绘制半透明圆
-                    temp_surface = pygame.Surface((indicator_radius*2, indicator_radius*2), pygame.SRCALPHA)
-                    pygame.draw.circle(temp_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
-                    self.screen.blit(temp_surface, (screen_x - indicator_radius, screen_y - indicator_radius))
+            self.render_click_indicator(view_x, view_y)
             
             # 渲染对话框
             self.dialog_system.render()
@@ -773,7 +865,7 @@ class Game:
                 
                 # 绘制玩家和怪物信息
                 player_info = f"玩家 - HP:{self.player.health}/{self.player.max_health} 内力:{self.player.qi}/{self.player.max_qi}"
-                monster_info = f"{self.current_monster.name} - HP:{self.current_monster.health}/{self.current_monster.max_health}"
+                monster_info = f"{self.current_monster.name} - HP:{self.current_monster.health}/{self.current_monster.max_health}  {self.combat_odds}"
                 
                 player_text = self.chinese_font.render(player_info, True, (255, 255, 255))
                 monster_text = self.chinese_font.render(monster_info, True, (255, 100, 100))
@@ -801,8 +893,7 @@ class Game:
         
         elif self.state == "STATS":
             # 先渲染背景世界（半透明显示）
-            view_x = max(0, min(self.player.x - 15, self.world.width - 30))
-            view_y = max(0, min(self.player.y - 10, self.world.height - 20))
+            view_x, view_y = self.world.get_view_origin(self.player.x, self.player.y)
             self.world.render(self.screen, self.chinese_font, view_x, view_y, self.player.x, self.player.y)
             
             # 然后渲染角色状态界面
@@ -814,6 +905,41 @@ class Game:
         
         # 刷新屏幕
         pygame.display.flip()
+        if self.arena and self.arena.is_active() and self.state == "EXPLORATION":
+            self.arena.stats.record_render(time.perf_counter() - render_start)
+    
+    def render_path_preview(self, view_x, view_y):
+        """用小圆点显示点击移动的剩余路径"""
+        if not self.move_path:
+            return
+        
+        preview_surface = pygame.Surface((VIEW_WIDTH * TILE_SIZE, VIEW_HEIGHT * TILE_SIZE), pygame.SRCALPHA)
+        for grid_x, grid_y in self.move_path:
+            if view_x <= grid_x < view_x + VIEW_WIDTH and view_y <= grid_y < view_y + VIEW_HEIGHT:
+                screen_x = (grid_x - view_x) * TILE_SIZE + TILE_SIZE // 2
+                screen_y = (grid_y - view_y) * TILE_SIZE + TILE_SIZE // 2
+                pygame.draw.circle(preview_surface, (255, 255, 0, 110), (screen_x, screen_y), 3)
+        self.screen.blit(preview_surface, (0, 0))
+    
+    def render_click_indicator(self, view_x, view_y):
+        """在鼠标点击的位置绘制逐渐淡出的指示器"""
+        if not self.clicked_position or self.click_indicator_timer <= 0:
+            return
+        
+        grid_x, grid_y = self.clicked_position
+        # 转换为屏幕坐标
+        if view_x <= grid_x < view_x + VIEW_WIDTH and view_y <= grid_y < view_y + VIEW_HEIGHT:
+            screen_x = (grid_x - view_x) * TILE_SIZE + TILE_SIZE // 2
+            screen_y = (grid_y - view_y) * TILE_SIZE + TILE_SIZE // 2
+            
+            # 绘制指示器
+            indicator_color = (255, 255, 0, min(255, self.click_indicator_timer * 25))  # 黄色，随时间淡出
+            indicator_radius = 10
+            
+            # 创建一个临时的Surface来绘制半透明圆
+            temp_surface = pygame.Surface((indicator_radius*2, indicator_radius*2), pygame.SRCALPHA)
+            pygame.draw.circle(temp_surface, indicator_color, (indicator_radius, indicator_radius), indicator_radius)
+            self.screen.blit(temp_surface, (screen_x - indicator_radius, screen_y - indicator_radius))
     
     def render_breakthrough_screen(self):
         """渲染突破境界的画面"""
@@ -1107,8 +1233,9 @@ class Game:
         if hasattr(self.player, "techniques") and self.player.techniques:
             for i, technique in enumerate(self.player.techniques[:3]):  # 最多显示前三个招式
                 tech_text = self.chinese_font.render(f"{technique.name}", True, (180, 180, 255))
-                cooldown = f"冷却: {technique.cooldown}" if technique.cooldown > 0 else "可用"
-                cooldown_color = (255, 100, 100) if technique.cooldown > 0 else (100, 255, 100)
+                remaining = self.player.cooldowns.remaining(technique.name)
+                cooldown = f"冷却: {remaining}" if remaining > 0 else "可用"
+                cooldown_color = (255, 100, 100) if remaining > 0 else (100, 255, 100)
                 cooldown_text = self.chinese_font.render(cooldown, True, cooldown_color)
                 
                 self.screen.blit(tech_text, (right_panel_x + 20, panel_y + 410 + i * 30 + scroll_y))
@@ -1129,7 +1256,8 @@ class Game:
             self.screen.blit(status_title, (right_panel_x, additional_info_y))
             
             for i, effect in enumerate(self.player.status_effects):
-                effect_text = self.chinese_font.render(f"{effect.name}: {effect.duration}回合", True, (180, 180, 200))
+                effect_text = self.chinese_font.render(
+                    f"{effect.name}({effect.stacks}层): {self.status_system.remaining_rounds(effect)}回合", True, (180, 180, 200))
                 self.screen.blit(effect_text, (right_panel_x + 20, additional_info_y + 30 + i * 25))
         
         # 重置裁剪区域
@@ -1177,11 +1305,10 @@ class Game:
     def handle_mouse_movement(self, pos):
         """将鼠标点击转换为玩家移动"""
         # 计算网格大小
-        grid_size = 20
+        grid_size = TILE_SIZE
         
         # 获取可见区域的起始坐标（世界坐标系）
-        view_x = max(0, min(self.player.x - 15, self.world.width - 30))
-        view_y = max(0, min(self.player.y - 10, self.world.height - 20))
+        view_x, view_y = self.world.get_view_origin(self.player.x, self.player.y)
         
         # 将屏幕坐标转换为世界坐标
         mouse_x, mouse_y = pos
@@ -1196,33 +1323,118 @@ class Game:
         self.clicked_position = (grid_x, grid_y)
         self.click_indicator_timer = 10  # 显示10帧
         
-        # 计算移动方向
-        dx = 0
-        dy = 0
+        # 点击移动会取消自动前往
+        self.travel_goal = None
         
-        # 水平方向
-        if grid_x > self.player.x:
-            dx = 1
-        elif grid_x < self.player.x:
-            dx = -1
-            
-        # 垂直方向
-        if grid_y > self.player.y:
-            dy = 1
-        elif grid_y < self.player.y:
-            dy = -1
-        
-        # 优先选择离目标更近的方向移动（先水平移动还是先垂直移动）
-        if dx != 0 and dy != 0:
-            x_distance = abs(grid_x - self.player.x)
-            y_distance = abs(grid_y - self.player.y)
-            
-            if x_distance > y_distance:
-                # 水平距离更大，优先水平移动
-                self.try_move(dx, 0)
-            else:
-                # 垂直距离更大，优先垂直移动
-                self.try_move(0, dy)
+        # 规划到点击位置的路径，之后每隔path_step_delay秒前进一格
+        start = (self.player.x, self.player.y)
+        path = self.path_cache.get_path(self.world, start, (grid_x, grid_y))
+        if path is None:
+            self.move_path = []
+            self.log_system.add("那里无法到达", "warning")
+            return
+        
+        self.move_path = path
+        self.move_goal = (grid_x, grid_y)
+        # 立即迈出第一步，点击后马上有反馈
+        self.step_along_path()
+        self.last_path_step_time = self.clock.now()
+    
+    def travel_to(self, area_name, position=None, label=None):
+        """自动前往指定区域（以及区域中的位置），必要时穿过多个传送门
+        
+        Args:
+            area_name: 目标区域
+            position: 区域中的目标坐标，为None时到达区域即可
+            label: 日志中显示的目的地名称
+        """
+        current_area = self.world.current_area
+        route = self.area_graph.get_area_route(current_area, area_name)
+        if route is None:
+            self.log_system.add(f"找不到前往{label or area_name}的路线", "warning")
+            return False
+        
+        names = [self.world.area_info.get(name, {}).get("name", name) for name in route]
+        self.log_system.add(f"前往{label or names[-1]}：{' → '.join(names)}", "system")
+        self.travel_goal = (area_name, position)
+        self.move_path = []
+        self.plan_travel_leg()
+        return True
+    
+    def travel_to_quest_npc(self):
+        """自动前往第一个已完成全部目标的任务所属的NPC处回报"""
+        for quest in self.player.active_quests:
+            if quest.completed or not all(obj.is_completed() for obj in quest.objectives):
+                continue
+            location = self.area_graph.find_npc(quest.npc_id)
+            if location is None:
+                continue
+            area_name, x, y = location
+            return self.travel_to(area_name, (x, y), f"「{quest.title}」的委托人")
+        
+        self.log_system.add("没有需要回报的任务", "info")
+        return False
+    
+    def plan_travel_leg(self):
+        """规划自动前往的下一段路径：同一区域内直接走向目标，否则走向应穿过的传送门"""
+        area_name, position = self.travel_goal
+        start = (self.player.x, self.player.y)
+        
+        if self.world.current_area == area_name:
+            if position is None or abs(position[0] - start[0]) + abs(position[1] - start[1]) <= 1:
+                self.travel_goal = None
+                self.log_system.add("已到达目的地", "system")
+                return
+            target = position
         else:
-            # 只有一个方向需要移动
-            self.try_move(dx, dy) 
\ No newline at end of file
+            def leg_steps(portal):
+                path = self.path_cache.get_path(self.world, start, portal)
+                return len(path) if path is not None else None
+            target = self.area_graph.choose_exit(self.world.portals, area_name, leg_steps)
+        
+        path = self.path_cache.get_path(self.world, start, target) if target else None
+        if not path:
+            self.travel_goal = None
+            self.log_system.add("前方无路可走，自动前往已停止", "warning")
+            return
+        self.move_path = path
+        self.move_goal = target
+    
+    def step_along_path(self):
+        """沿点击移动的路径前进一格
+        
+        下一格被NPC等挡住时重新规划一次路径；遇到怪物则直接进入战斗。
+        """
+        if not self.move_path:
+            return
+        
+        next_x, next_y = self.move_path[0]
+        dx, dy = next_x - self.player.x, next_y - self.player.y
+        if abs(dx) + abs(dy) != 1:
+            # 玩家已经不在路径上（例如切换了区域），放弃剩余路径
+            self.move_path = []
+            return
+        
+        valid, reason = self.world.is_position_valid(next_x, next_y)
+        if not valid and not self.world.get_monster_at(next_x, next_y):
+            if len(self.move_path) == 1:
+                # 终点本身被占据（例如点击了NPC），停在旁边
+                self.move_path = []
+                return
+            # 绕开当前的阻挡重新规划，阻挡通常是暂时的，所以新路径不放入缓存
+            path = find_path(lambda x, y: self.world.is_position_valid(x, y)[0],
+                             (self.player.x, self.player.y), self.move_goal)
+            if not path:
+                self.move_path = []
+                self.log_system.add(reason, "warning")
+                return
+            self.move_path = path
+            next_x, next_y = path[0]
+            dx, dy = next_x - self.player.x, next_y - self.player.y
+        
+        self.move_path.pop(0)
+        current_area = self.world.current_area
+        self.try_move(dx, dy)
+        if self.state != "EXPLORATION" or self.world.current_area != current_area:
+            # 进入战斗、对话或其他区域后停止移动
+            self.move_path = [] 
\ No newline at end of file
@@ -186,14 +186,15 @@ class QuestItem(Item):
             return f"{self.name}是任务[{related_quest.title}]需要的物品，找到相关NPC完成任务。"
         return f"{self.name}似乎是某个任务需要的物品。"
 
-def generate_random_weapon(level, quality_modifier=0):
-    """生成随机武器"""
+def generate_random_weapon(level, quality_modifier=0, rng=None):
+    """生成随机武器，rng为独立的随机数流，默认使用全局random"""
+    rng = rng or random
     weapon_types = ["剑", "刀", "枪", "锤", "拳套"]
     materials = ["铁", "钢", "青铜", "精钢", "玄铁", "寒铁"]
     prefixes = ["锋利的", "沉重的", "坚固的", "平衡的", "破旧的", "精致的"]
     
     # 根据等级和品质修饰符决定稀有度
-    rarity_chance = random.random() + quality_modifier
+    rarity_chance = rng.random() + quality_modifier
     if rarity_chance > 0.98:
         rarity = "传说"
         stat_multiplier = 2.5
@@ -208,9 +209,9 @@ def generate_random_weapon(level, quality_modifier=0):
         stat_multiplier = 1.0
     
     # 随机选择武器类型和材料
-    weapon_type = random.choice(weapon_types)
-    material = random.choice(materials)
-    prefix = random.choice(prefixes)
+    weapon_type = rng.choice(weapon_types)
+    material = rng.choice(materials)
+    prefix = rng.choice(prefixes)
     
     # 生成武器名称
     name = f"{prefix}{material}{weapon_type}"
@@ -221,9 +222,9 @@ def generate_random_weapon(level, quality_modifier=0):
     
     # 稀有度越高，可能有额外属性
     if rarity in ["稀有", "传说"]:
-        stats["speed"] = random.randint(1, 3)
+        stats["speed"] = rng.randint(1, 3)
     if rarity == "传说":
-        stats["qi_bonus"] = random.randint(5, 15)
+        stats["qi_bonus"] = rng.randint(5, 15)
     
     # 生成描述
     description = f"一件{rarity}级别的{weapon_type}，由{material}打造而成。"
@@ -233,14 +234,15 @@ def generate_random_weapon(level, quality_modifier=0):
     
     return Equipment(name, description, "武器", stats, level, rarity, int(value))
 
-def generate_random_armor(level, quality_modifier=0):
-    """生成随机护甲"""
+def generate_random_armor(level, quality_modifier=0, rng=None):
+    """生成随机护甲，rng为独立的随机数流，默认使用全局random"""
+    rng = rng or random
     armor_types = ["袍", "甲", "衣", "护具", "披风"]
     materials = ["布", "皮革", "锁子", "铁", "精钢", "玄铁"]
     prefixes = ["结实的", "轻盈的", "坚固的", "灵活的", "破旧的", "精致的"]
     
     # 根据等级和品质修饰符决定稀有度
-    rarity_chance = random.random() + quality_modifier
+    rarity_chance = rng.random() + quality_modifier
     if rarity_chance > 0.98:
         rarity = "传说"
         stat_multiplier = 2.5
@@ -255,9 +257,9 @@ def generate_random_armor(level, quality_modifier=0):
         stat_multiplier = 1.0
     
     # 随机选择护甲类型和材料
-    armor_type = random.choice(armor_types)
-    material = random.choice(materials)
-    prefix = random.choice(prefixes)
+    armor_type = rng.choice(armor_types)
+    material = rng.choice(materials)
+    prefix = rng.choice(prefixes)
     
     # 生成护甲名称
     name = f"{prefix}{material}{armor_type}"
@@ -268,9 +270,9 @@ def generate_random_armor(level, quality_modifier=0):
     
     # 稀有度越高，可能有额外属性
     if rarity in ["稀有", "传说"]:
-        stats["max_health"] = random.randint(10, 30)
+        stats["max_health"] = rng.randint(10, 30)
     if rarity == "传说":
-        stats["max_qi"] = random.randint(5, 15)
+        stats["max_qi"] = rng.randint(5, 15)
     
     # 生成描述
     description = f"一件{rarity}级别的{armor_type}，由{material}制成。"
@@ -280,8 +282,9 @@ def generate_random_armor(level, quality_modifier=0):
     
     return Equipment(name, description, "护甲", stats, level, rarity, int(value))
 
-def generate_random_consumable(level):
-    """生成随机消耗品"""
+def generate_random_consumable(level, rng=None):
+    """生成随机消耗品，rng为独立的随机数流，默认使用全局random"""
+    rng = rng or random
     consumable_types = [
         {"name": "回血丹", "effects": {"health": 20 + level * 10}},
         {"name": "气回丹", "effects": {"qi": 15 + level * 8}},
@@ -290,7 +293,7 @@ def generate_random_consumable(level):
     ]
     
     # 随机选择消耗品类型
-    consumable = random.choice(consumable_types)
+    consumable = rng.choice(consumable_types)
     
     # 根据等级决定稀有度
     if level >= 8:
@@ -318,12 +321,13 @@ def generate_random_consumable(level):
     item = Consumable(consumable["name"], description, consumable["effects"], rarity, int(value))
     
     # 随机设置堆叠数量
-    item.stack_count = random.randint(1, 3)
+    item.stack_count = rng.randint(1, 3)
     
     return item
 
-def generate_random_material(monster_type=None):
+def generate_random_material(monster_type=None, rng=None):
     """生成随机材料，可以根据怪物类型生成特定材料"""
+    rng = rng or random
     if monster_type:
         if "狼" in monster_type:
             return Material("狼皮", "一张完整的狼皮，可以用来制作护具。", f"由{monster_type}身上获得", "普通", 15)
@@ -344,32 +348,39 @@ def generate_random_material(monster_type=None):
         Material("木材", "一段结实的木材，可用于制作武器或建筑。", "森林中获取", "普通", 8)
     ]
     
-    material = random.choice(materials)
-    material.stack_count = random.randint(1, 5)
+    material = rng.choice(materials)
+    material.stack_count = rng.randint(1, 5)
     return material
 
-def generate_monster_drop(monster, player_level):
-    """根据怪物生成掉落物品"""
+def generate_monster_drop(monster, player_level, rng=None):
+    """根据怪物生成掉落物品
+    
+    Args:
+        monster: 被击败的怪物
+        player_level: 玩家境界等级
+        rng: 本次掉落使用的随机数流，默认使用全局random
+    """
+    rng = rng or random
     drops = []
-    drop_chance = random.random()
+    drop_chance = rng.random()
     
     # 必定掉落的材料
     if hasattr(monster, "name"):
-        material = generate_random_material(monster.name)
-        material.stack_count = random.randint(1, 2)
+        material = generate_random_material(monster.name, rng)
+        material.stack_count = rng.randint(1, 2)
         drops.append(material)
     
     # 概率掉落装备
     if drop_chance < 0.2:  # 20%几率掉落武器
-        weapon = generate_random_weapon(player_level, quality_modifier=-0.2)
+        weapon = generate_random_weapon(player_level, quality_modifier=-0.2, rng=rng)
         drops.append(weapon)
     elif drop_chance < 0.35:  # 15%几率掉落护甲
-        armor = generate_random_armor(player_level, quality_modifier=-0.2)
+        armor = generate_random_armor(player_level, quality_modifier=-0.2, rng=rng)
         drops.append(armor)
     
     # 概率掉落消耗品
-    if random.random() < 0.4:  # 40%几率掉落消耗品
-        consumable = generate_random_consumable(player_level)
+    if rng.random() < 0.4:  # 40%几率掉落消耗品
+        consumable = generate_random_consumable(player_level, rng)
         drops.append(consumable)
     
     return drops 
\ No newline at end of file
@@ -0,0 +1,85 @@
+import os
+import pickle
+import sys
+import threading
+
+class LayoutCache:
+    """
+    区域布局缓存，以 (生成器版本, 种子) 为键保存生成好的区域
+
+    区域以序列化后的形式保存，每次取出都会得到一份独立的副本，
+    因此游戏中对区域的修改（怪物移动、击杀等）不会影响缓存。
+    """
+    def __init__(self, entries=None):
+        self.entries = entries or {}  # (生成器版本, 种子) -> 序列化的Area
+        self.lock = threading.Lock()  # 预生成线程也会访问缓存
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, version, seed):
+        """获取缓存的区域，不存在时返回None"""
+        with self.lock:
+            data = self.entries.get((version, seed))
+            if data is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return pickle.loads(data)
+
+    def put(self, version, seed, area):
+        """缓存一个生成好的区域"""
+        data = pickle.dumps(area, protocol=pickle.HIGHEST_PROTOCOL)
+        with self.lock:
+            self.entries[(version, seed)] = data
+
+    def __len__(self):
+        return len(self.entries)
+
+    def save(self, path):
+        """将缓存保存到磁盘"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            entries = dict(self.entries)
+        with open(path, "wb") as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path):
+        """从磁盘载入缓存，文件不存在时返回空缓存"""
+        if not os.path.exists(path):
+            return cls()
+        with open(path, "rb") as f:
+            return cls(pickle.load(f))
+
+
+def precompute(world, area_names, visits, path):
+    """为指定世界种子预先生成若干次进入的区域布局并保存到磁盘
+
+    Args:
+        world: 世界对象，决定种子和地图尺寸
+        area_names: 需要预生成的区域名称列表
+        visits: 每个区域预生成的进入次数
+        path: 缓存文件路径
+    """
+    cache = LayoutCache.load(path)
+    world.set_layout_cache(cache)
+    for area_name in area_names:
+        for visit in range(visits):
+            world.build_area(area_name, world.area_seed(area_name, visit))
+    cache.save(path)
+    return cache
+
+
+if __name__ == "__main__":
+    # 用法: python layout_cache.py <世界种子> [每个区域的进入次数] [缓存文件]
+    from world import World, LAYOUT_CACHE_FILE
+
+    seed = int(sys.argv[1])
+    visits = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    path = sys.argv[3] if len(sys.argv) > 3 else LAYOUT_CACHE_FILE
+
+    world = World(40, 25, seed=seed, initial_area=None)
+    cache = precompute(world, list(world.get_area_generators()), visits, path)
+    print(f"已预生成 {len(cache)} 个区域布局，保存至 {path}")
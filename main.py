@@ -1,13 +1,19 @@
 import pygame
+import sys
 import time
 from game import Game
+from arena import parse_waves
 
 def main():
     # 初始化pygame
     pygame.init()
     
-    # 创建游戏实例
-    game = Game()
+    # 创建游戏实例，--arena[=200,500,...] 直接进入群战擂台
+    arena_waves = None
+    for arg in sys.argv[1:]:
+        if arg == "--arena" or arg.startswith("--arena="):
+            arena_waves = parse_waves(arg.partition("=")[2])
+    game = Game(arena_waves=arena_waves)
     
     # 控制帧率
     clock = pygame.time.Clock()
@@ -36,7 +42,8 @@ def main():
         # 控制帧率
         clock.tick(FPS)
     
-    # 退出pygame
+    # 关闭后台线程并退出pygame
+    game.shutdown()
     pygame.quit()
 
 if __name__ == "__main__":
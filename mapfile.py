@@ -0,0 +1,235 @@
+"""
+区域地图文件（.nvmap）
+
+文件由三部分组成：
+  1. 文件头：魔数、版本、地图尺寸、区块边长、平面数量、实体数量和各部分的偏移
+  2. 地形ID平面：每个平面按区块顺序存放，一个区块的 CHUNK_SIZE x CHUNK_SIZE 个格子连续存放，
+     因此读取一个区块只会访问连续的几页内存
+  3. 实体表：怪物、NPC和传送门，每条记录为固定长度的结构体
+
+读取时使用只读mmap映射整个文件，地形和实体表都是文件内存上的NumPy视图，不发生复制；
+只有玩家走到的区块所在的页才会被真正读入，同一台机器上的多个游戏进程共享同一份页缓存。
+"""
+
+import mmap
+import os
+import struct
+import sys
+import numpy as np
+from chunk import CHUNK_SIZE
+from crowd import MONSTER_SPEED
+from terrain import TERRAIN_IDS, grid_to_ids
+
+MAGIC = b"NVMAP\0\0\0"
+VERSION = 3
+# 魔数、版本、宽、高、区块边长、平面数量、实体数量、平面偏移、实体表偏移
+HEADER = struct.Struct("<8sIIIIIIQQ")
+
+# 实体类型
+ENTITY_MONSTER = 0
+ENTITY_NPC = 1
+ENTITY_PORTAL = 2
+
+ENTITY_DTYPE = np.dtype([
+    ("kind", "<u4"),
+    ("x", "<u4"),
+    ("y", "<u4"),
+    ("hp", "<i4"),
+    ("max_hp", "<i4"),
+    ("attack", "<i4"),
+    ("defense", "<i4"),
+    ("experience", "<i4"),
+    ("char", "<U1"),
+    ("name", "<U12"),
+    ("target", "<U16"),  # 传送门的目标区域
+    ("behavior", "<U16"),  # 怪物的AI行为类型
+    ("speed", "<i4")  # 怪物的速度
+])
+
+def _align(offset, alignment):
+    """将偏移向上对齐"""
+    return -(-offset // alignment) * alignment
+
+def _to_tiles(plane, chunk_size):
+    """将 (height, width) 的平面重排为按区块存放的 (区块行, 区块列, chunk_size, chunk_size)
+
+    地图尺寸不是区块边长的整数倍时，超出部分以墙壁填充。
+    """
+    height, width = plane.shape
+    count_y, count_x = -(-height // chunk_size), -(-width // chunk_size)
+    padded = np.full((count_y * chunk_size, count_x * chunk_size), TERRAIN_IDS["wall"], dtype=np.uint8)
+    padded[:height, :width] = plane
+    tiles = padded.reshape(count_y, chunk_size, count_x, chunk_size).swapaxes(1, 2)
+    return np.ascontiguousarray(tiles)
+
+def write_map_file(path, planes, monsters=(), npcs=(), portals=None, chunk_size=CHUNK_SIZE):
+    """写入区域地图文件
+
+    Args:
+        path: 文件路径
+        planes: 地形ID平面列表，每个平面是形状为 (height, width) 的uint8数组，第一个平面为地形
+        monsters: 怪物字典列表
+        npcs: NPC列表，只保存位置、字符和名称
+        portals: 传送门表 {(x, y): 目标区域}
+        chunk_size: 区块边长
+    """
+    height, width = planes[0].shape
+    entities = np.zeros(len(monsters) + len(npcs) + len(portals or {}), dtype=ENTITY_DTYPE)
+    i = 0
+    for monster in monsters:
+        entities[i] = (ENTITY_MONSTER, monster["x"], monster["y"], monster["hp"], monster["max_hp"],
+                       monster["attack"], monster["defense"], monster["experience"],
+                       monster["char"], monster["name"], "", monster.get("behavior", "wander"),
+                       monster.get("speed", MONSTER_SPEED))
+        i += 1
+    for npc in npcs:
+        entities[i] = (ENTITY_NPC, npc.x, npc.y, 0, 0, 0, 0, 0, npc.char, npc.name, "", "", 0)
+        i += 1
+    for (x, y), target in (portals or {}).items():
+        entities[i] = (ENTITY_PORTAL, x, y, 0, 0, 0, 0, 0, "", "", target, "", 0)
+        i += 1
+
+    # 平面按分配粒度对齐，使每个区块都落在固定的页内
+    planes_offset = _align(HEADER.size, mmap.ALLOCATIONGRANULARITY)
+    tiles = [_to_tiles(plane, chunk_size) for plane in planes]
+    entity_offset = _align(planes_offset + sum(t.nbytes for t in tiles), 8)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, VERSION, width, height, chunk_size, len(planes),
+                            len(entities), planes_offset, entity_offset))
+        f.seek(planes_offset)
+        for t in tiles:
+            f.write(t.tobytes())
+        f.seek(entity_offset)
+        f.write(entities.tobytes())
+
+
+class MapFile:
+    """
+    以mmap打开的区域地图文件
+    """
+    def __init__(self, path):
+        self.path = path
+        with open(path, "rb") as f:
+            # 映射建立后即可关闭文件，映射本身保持有效
+            self.mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, self.width, self.height, self.chunk_size, plane_count,
+         entity_count, planes_offset, entity_offset) = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} 不是有效的地图文件")
+        if self.chunk_size != CHUNK_SIZE:
+            raise ValueError(f"{path} 的区块边长为{self.chunk_size}，与当前的{CHUNK_SIZE}不一致")
+
+        self.count_x = -(-self.width // self.chunk_size)
+        self.count_y = -(-self.height // self.chunk_size)
+        shape = (plane_count, self.count_y, self.count_x, self.chunk_size, self.chunk_size)
+        # 文件内存上的视图，不复制数据
+        self.planes = np.frombuffer(self.mm, dtype=np.uint8, count=int(np.prod(shape)),
+                                    offset=planes_offset).reshape(shape)
+        self.terrain_tiles = self.planes[0]
+        self.entities = np.frombuffer(self.mm, dtype=ENTITY_DTYPE, count=entity_count,
+                                      offset=entity_offset)
+
+        # 按所在区块为怪物建立索引，载入区块时只需二分查找
+        monster_ids = np.nonzero(self.entities["kind"] == ENTITY_MONSTER)[0]
+        keys = (self.entities["y"][monster_ids] // self.chunk_size) * self.count_x + \
+               self.entities["x"][monster_ids] // self.chunk_size
+        order = np.argsort(keys, kind="stable")
+        self.monster_ids = monster_ids[order]
+        self.monster_keys = keys[order]
+
+    def get_chunk_terrain(self, cx, cy):
+        """获取一个区块的地形ID数组（文件内存上的只读视图）"""
+        return self.terrain_tiles[cy, cx]
+
+    def get_chunk_monsters(self, cx, cy):
+        """获取一个区块中的怪物，返回新的怪物字典列表"""
+        key = cy * self.count_x + cx
+        start = np.searchsorted(self.monster_keys, key, side="left")
+        end = np.searchsorted(self.monster_keys, key, side="right")
+        monsters = []
+        for record in self.entities[self.monster_ids[start:end]]:
+            monsters.append({
+                "name": str(record["name"]),
+                "char": str(record["char"]),
+                "x": int(record["x"]),
+                "y": int(record["y"]),
+                "hp": int(record["hp"]),
+                "max_hp": int(record["max_hp"]),
+                "attack": int(record["attack"]),
+                "defense": int(record["defense"]),
+                "experience": int(record["experience"]),
+                "behavior": str(record["behavior"]),
+                "speed": int(record["speed"])
+            })
+        return monsters
+
+    def get_npc_records(self):
+        """获取NPC记录列表 [(x, y, 字符, 名称)]"""
+        records = self.entities[self.entities["kind"] == ENTITY_NPC]
+        return [(int(r["x"]), int(r["y"]), str(r["char"]), str(r["name"])) for r in records]
+
+    def get_portals(self):
+        """获取传送门表 {(x, y): 目标区域}"""
+        records = self.entities[self.entities["kind"] == ENTITY_PORTAL]
+        return {(int(r["x"]), int(r["y"])): str(r["target"]) for r in records}
+
+
+class MapFileSource:
+    """
+    以地图文件为来源的区块源，供ChunkMap使用
+    """
+    def __init__(self, map_file):
+        self.map_file = map_file
+
+    def generate(self, cx, cy):
+        """返回区块的地形视图和其中的怪物"""
+        return self.map_file.get_chunk_terrain(cx, cy), self.map_file.get_chunk_monsters(cx, cy)
+
+
+def bake_area(world, area_name, path):
+    """生成一个区域并写入地图文件
+
+    普通区域直接保存整张地图；分块区域会生成全部区块后保存。
+
+    Args:
+        world: 世界对象，决定种子和区域尺寸
+        area_name: 区域名称
+        path: 地图文件路径
+    """
+    area = world.build_area(area_name, world.next_area_seed(area_name))
+    if area.chunks is None:
+        terrain = grid_to_ids(area.grid)
+        monsters = area.monsters
+    else:
+        chunks = area.chunks
+        terrain = np.empty((area.height, area.width), dtype=np.uint8)
+        count_x, count_y = chunks.chunk_count()
+        # 逐行生成区块后立即卸载，避免同时占用整张地图的区块
+        for cy in range(count_y):
+            for cx in range(count_x):
+                chunks.load_chunk(cx, cy)
+            band = chunks.get_view(0, cy * CHUNK_SIZE, area.width,
+                                   min(CHUNK_SIZE, area.height - cy * CHUNK_SIZE))
+            terrain[cy * CHUNK_SIZE:cy * CHUNK_SIZE + band.shape[0]] = band
+            for key in list(chunks.chunks):
+                chunks.unload_chunk(*key)
+        monsters = [m for saved in chunks.saved_monsters.values() for m in saved]
+    write_map_file(path, [terrain], monsters, area.npcs, area.portals)
+
+
+if __name__ == "__main__":
+    # 用法: python mapfile.py <世界种子> <区域名称> [地图文件]
+    from world import World, MAP_DIR
+
+    seed = int(sys.argv[1])
+    area_name = sys.argv[2]
+    path = sys.argv[3] if len(sys.argv) > 3 else os.path.join(MAP_DIR, f"{area_name}.nvmap")
+
+    world = World(40, 25, seed=seed, initial_area=None)
+    bake_area(world, area_name, path)
+    print(f"已将{area_name}写入 {path}")
@@ -0,0 +1,235 @@
+"""
+精确计算自动战斗的胜率和战斗长度
+
+自动战斗是一个离散的马尔可夫过程：状态为 (玩家生命, 怪物生命, 内力, 是否防御)，
+出手顺序由双方速度决定、与随机数无关。这里不抽样，而是把所有状态的概率分布按出手顺序逐步向前推进，
+每一步把相同的状态合并，分出胜负的概率累计为胜率或败率，直到剩余的概率小于给定的精度。
+规则与Combat的自动战斗、damage模块的伤害流程和simulation.simulate_fights一致，结果按 (玩家属性, 怪物属性) 缓存。
+
+用法: python odds.py [怪物类型] [境界]
+"""
+
+import sys
+import time
+from functools import lru_cache
+import numpy as np
+from combat import AUTO_MIN_QI, AUTO_FINISH_HP_RATIO, AUTO_DEFEND_HP_RATIO, AUTO_DEFEND_CHANCE, \
+    AUTO_BASIC_CHANCE, BLOCK_CHANCE, DEFEND_QI_RATIO, DEFEND_MIN_QI
+from crowd import MONSTER_SPEED
+from damage import multiplier, scale_hits, mitigate_array, element_of, realm_of, CRIT_MULTIPLIER
+from entity import ATTACK_VARIANCE
+from simulation import PlayerBuild, make_realm_player, iter_turns, pick_abilities
+from spawner import MONSTER_ARCHETYPES
+
+# 剩余的概率小于该值时停止推进
+TOLERANCE = 1e-9
+
+
+def damage_distribution(attack):
+    """怪物攻击力的取值分布，与Monster.get_attack_damage相同：int(攻击 * (1 ± ATTACK_VARIANCE))
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 可能的取值和对应的概率
+    """
+    low, high = attack * (1 - ATTACK_VARIANCE), attack * (1 + ATTACK_VARIANCE)
+    if high <= low:
+        return np.array([int(attack)]), np.array([1.0])
+    values = np.arange(int(low), int(high) + 1)
+    # 取值为k的概率是区间 [k, k+1) 与 [low, high] 重叠部分的长度占比
+    overlap = np.minimum(values + 1, high) - np.maximum(values, low)
+    keep = overlap > 0
+    return values[keep], overlap[keep] / (high - low)
+
+
+class FightOdds:
+    """
+    一场自动战斗的精确结果
+    """
+    def __init__(self, win_rate, loss_rate, expected_rounds, expected_win_rounds, expected_actions):
+        self.win_rate = win_rate  # 玩家获胜的概率
+        self.loss_rate = loss_rate  # 玩家落败的概率
+        self.expected_rounds = expected_rounds  # 分出胜负时玩家出手回合数的期望
+        self.expected_win_rounds = expected_win_rounds  # 玩家获胜时回合数的期望，不可能获胜时为None
+        self.expected_actions = expected_actions  # 分出胜负时双方行动总次数的期望
+
+    @property
+    def unresolved(self):
+        """达到行动次数上限时仍未分出胜负的概率"""
+        return max(0.0, 1.0 - self.win_rate - self.loss_rate)
+
+    def summary(self):
+        """以字典形式返回结果"""
+        return {"win_rate": self.win_rate, "loss_rate": self.loss_rate, "unresolved": self.unresolved,
+                "expected_rounds": self.expected_rounds, "expected_win_rounds": self.expected_win_rounds,
+                "expected_actions": self.expected_actions}
+
+
+def _merge(player_hp, monster_hp, qi, defending, prob):
+    """合并相同的状态，把它们的概率相加"""
+    order = np.lexsort((defending, qi, monster_hp, player_hp))
+    player_hp, monster_hp, qi, defending, prob = \
+        player_hp[order], monster_hp[order], qi[order], defending[order], prob[order]
+    starts = np.ones(len(prob), dtype=bool)
+    starts[1:] = (player_hp[1:] != player_hp[:-1]) | (monster_hp[1:] != monster_hp[:-1]) | \
+        (qi[1:] != qi[:-1]) | (defending[1:] != defending[:-1])
+    index = np.flatnonzero(starts)
+    return player_hp[index], monster_hp[index], qi[index], defending[index], np.add.reduceat(prob, index)
+
+def compute_fight_odds(build, monster_type, tolerance=TOLERANCE, max_actions=100000):
+    """按出手顺序推进状态的概率分布，计算玩家对怪物自动战斗的精确胜率和期望长度
+
+    Args:
+        build: PlayerBuild
+        monster_type: 怪物类型名称或包含hp、attack、defense、speed的怪物字典；
+            可选的health为怪物当前的生命（默认为hp），hp始终是最大生命，决定自动战斗何时收尾
+        tolerance: 剩余的概率小于该值时停止
+        max_actions: 最多推进的行动次数，与simulate_fights的上限相同
+
+    Returns:
+        FightOdds: 计算结果
+    """
+    if isinstance(monster_type, str):
+        monster_type = MONSTER_ARCHETYPES[monster_type]
+    monster_max_hp = monster_type["hp"]
+    monster_health = monster_type.get("health", monster_max_hp)
+    monster_defense = monster_type["defense"]
+    monster_element = monster_type.get("element", "neutral")
+    defend_qi = max(DEFEND_MIN_QI, build.max_qi * DEFEND_QI_RATIO)
+    finish_hp = monster_max_hp * AUTO_FINISH_HP_RATIO
+    defend_hp = build.max_health * AUTO_DEFEND_HP_RATIO
+    outgoing = multiplier(build.element, monster_element, build.realm, monster_type.get("realm"))
+    incoming = multiplier(monster_element, build.element, monster_type.get("realm"), build.realm)
+    crit, dodge = build.critical_chance, build.dodge_chance
+    attack_values, attack_probs = damage_distribution(monster_type["attack"])
+    # 怪物命中时的两种情形：未防御、防御但未格挡（伤害减半）；其余为格挡或被闪开，玩家生命不变
+    scaled_attack, _ = scale_hits(attack_values, incoming)
+    normal_damage = mitigate_array(scaled_attack, build.defense)
+    halved_damage = mitigate_array(scaled_attack // 2, build.defense)
+
+    def player_hits(damage, critical=False):
+        """玩家对怪物造成的伤害，与simulate_fights中的伤害流程相同"""
+        hits, _ = scale_hits(np.asarray(damage) * (CRIT_MULTIPLIER if critical else 1), outgoing)
+        return mitigate_array(hits, monster_defense)
+
+    # 当前仍在进行的状态，每个数组的一个元素是一个状态
+    player_hp = np.array([build.health], dtype=np.int64)
+    monster_hp = np.array([monster_health], dtype=np.int64)
+    qi = np.array([float(build.qi)])
+    defending = np.zeros(1, dtype=bool)
+    prob = np.ones(1)
+
+    win = loss = rounds_total = win_rounds_total = actions_total = 0.0
+    rounds = 0
+    turns = iter_turns(build.speed, monster_type.get("speed", MONSTER_SPEED))
+    for action in range(1, max_actions + 1):
+        if prob.sum() < tolerance:
+            break
+        if next(turns):
+            rounds += 1
+            # 每个状态展开为若干种行动，与simulate_fights的选择顺序相同
+            low_qi = qi < AUTO_MIN_QI
+            finish = ~low_qi & (monster_hp < finish_hp)
+            free = ~low_qi & ~finish
+            defend_chance = np.where(free & (player_hp < defend_hp), AUTO_DEFEND_CHANCE, 0.0)
+            special_chance = np.where(finish, 1.0, np.where(free, (1 - defend_chance) * (1 - AUTO_BASIC_CHANCE), 0.0))
+            basic_chance = 1.0 - defend_chance - special_chance
+
+            # 特殊攻击使用内力足够的技能中排在最后的一个
+            special_damage, special_cost = pick_abilities(build, qi)
+
+            # 各分支的 (怪物生命, 内力, 概率)，有暴击率时普通攻击和特殊攻击再分为暴击与否
+            branches = [(monster_hp - player_hits(build.basic[0]), qi, prob * basic_chance * (1 - crit)),
+                        (monster_hp - player_hits(special_damage), qi - special_cost, prob * special_chance * (1 - crit))]
+            if crit > 0:
+                branches += [(monster_hp - player_hits(build.basic[0], True), qi, prob * basic_chance * crit),
+                             (monster_hp - player_hits(special_damage, True), qi - special_cost,
+                              prob * special_chance * crit)]
+            branches.append((monster_hp, np.minimum(qi + defend_qi, build.max_qi), prob * defend_chance))
+            player_hp = np.tile(player_hp, len(branches))
+            monster_hp = np.concatenate([branch[0] for branch in branches])
+            qi = np.concatenate([branch[1] for branch in branches])
+            prob = np.concatenate([branch[2] for branch in branches])
+            defending = np.repeat(np.arange(len(branches)) == len(branches) - 1, len(prob) // len(branches))
+        else:
+            # 每个状态按怪物攻击力的各个取值展开，另加一个生命不变的分支（格挡或闪开）
+            outcomes = len(attack_values)
+            damage = np.where(defending[:, None], halved_damage[None, :], normal_damage[None, :])
+            hit_chance = np.where(defending, 1 - BLOCK_CHANCE, 1.0) * (1 - dodge)
+            hit_prob = hit_chance[:, None] * attack_probs[None, :]
+            unchanged = 1 - hit_chance
+            keep = unchanged > 0
+            player_hp = np.concatenate([(player_hp[:, None] - damage).ravel(), player_hp[keep]])
+            monster_hp = np.concatenate([np.repeat(monster_hp, outcomes), monster_hp[keep]])
+            qi = np.concatenate([np.repeat(qi, outcomes), qi[keep]])
+            prob = np.concatenate([(prob[:, None] * hit_prob).ravel(), prob[keep] * unchanged[keep]])
+            defending = np.concatenate([np.repeat(defending, outcomes), defending[keep]])
+
+        # 分出胜负的概率累计到结果中，其余状态合并后进入下一步
+        won = monster_hp <= 0
+        lost = ~won & (player_hp <= 0)
+        won_prob, lost_prob = prob[won].sum(), prob[lost].sum()
+        win += won_prob
+        loss += lost_prob
+        rounds_total += (won_prob + lost_prob) * rounds
+        win_rounds_total += won_prob * rounds
+        actions_total += (won_prob + lost_prob) * action
+        alive = ~won & ~lost & (prob > 0)
+        player_hp, monster_hp, qi, defending, prob = \
+            _merge(player_hp[alive], monster_hp[alive], qi[alive], defending[alive], prob[alive])
+
+    finished = win + loss
+    return FightOdds(win, loss,
+                     rounds_total / finished if finished else 0.0,
+                     win_rounds_total / win if win else None,
+                     actions_total / finished if finished else 0.0)
+
+def build_key(build):
+    """玩家属性的缓存键"""
+    return (build.health, build.max_health, build.qi, build.max_qi, build.attack, build.defense, build.speed,
+            tuple(build.basic), tuple(tuple(ability) for ability in build.abilities),
+            build.element, build.realm, build.critical_chance, build.dodge_chance)
+
+def monster_key(monster_type):
+    """怪物属性的缓存键"""
+    if isinstance(monster_type, str):
+        monster_type = MONSTER_ARCHETYPES[monster_type]
+    return (monster_type["hp"], monster_type.get("health", monster_type["hp"]),
+            monster_type["attack"], monster_type["defense"],
+            monster_type.get("speed", MONSTER_SPEED), monster_type.get("element", "neutral"), monster_type.get("realm"))
+
+@lru_cache(maxsize=1024)
+def _cached_odds(player, monster):
+    health, max_health, qi, max_qi, attack, defense, speed, basic, abilities, *combat_stats = player
+    hp, monster_health, monster_attack, monster_defense, monster_speed, element, realm = monster
+    build = PlayerBuild(health, max_health, qi, max_qi, attack, defense, speed, basic, list(abilities), *combat_stats)
+    return compute_fight_odds(build, {"hp": hp, "health": monster_health, "attack": monster_attack, "defense": monster_defense,
+                                      "speed": monster_speed, "element": element, "realm": realm})
+
+def fight_odds(build, monster_type):
+    """带缓存的compute_fight_odds，属性相同的玩家和怪物只计算一次"""
+    return _cached_odds(build_key(build), monster_key(monster_type))
+
+def monster_odds(player, monster):
+    """玩家和怪物都以当前状态战斗的胜率，用于战斗界面的提示"""
+    return fight_odds(PlayerBuild.from_player(player),
+                      {"hp": monster.max_health, "health": monster.health, "attack": monster.attack, "defense": monster.defense,
+                       "speed": monster.speed, "element": element_of(monster), "realm": realm_of(monster)})
+
+def format_odds(odds):
+    """把胜率格式化为提示文字，如"胜率 92%"；只有必胜或必败时才显示100%或0%"""
+    if odds.loss_rate < TOLERANCE:
+        return "胜率 100%"
+    if odds.win_rate < TOLERANCE:
+        return "胜率 0%"
+    return f"胜率 {min(99, max(1, round(odds.win_rate * 100)))}%"
+
+if __name__ == "__main__":
+    monster_name = sys.argv[1] if len(sys.argv) > 1 else "wolf"
+    level = int(sys.argv[2]) if len(sys.argv) > 2 else 9
+    build = PlayerBuild.from_player(make_realm_player(level))
+    start = time.perf_counter()
+    odds = compute_fight_odds(build, monster_name)
+    elapsed = time.perf_counter() - start
+    print(f"{MONSTER_ARCHETYPES[monster_name]['name']} 对 境界{level}  用时{elapsed * 1000:.1f}毫秒")
+    print(f"{format_odds(odds)}  败率{odds.loss_rate * 100:.2f}%  "
+          f"平均{odds.expected_rounds:.2f}回合  行动{odds.expected_actions:.2f}次")
@@ -0,0 +1,85 @@
+import heapq
+from collections import OrderedDict
+
+# 四个移动方向
+DIRECTIONS = [(1, 0), (-1, 0), (0, 1), (0, -1)]
+
+def find_path(is_walkable, start, goal, max_nodes=5000):
+    """使用A*算法寻找从start到goal的四方向路径
+
+    Args:
+        is_walkable: 判断格子是否可通行的函数，签名为 is_walkable(x, y)
+        start: 起点 (x, y)
+        goal: 终点 (x, y)，终点本身不要求可通行（例如点击了NPC所在的格子）
+        max_nodes: 最多展开的节点数，超出时放弃搜索，避免在大地图上卡顿
+
+    Returns:
+        list: 不含起点的路径 [(x, y), ...]；起点即终点时为空列表，找不到路径时返回None
+    """
+    if start == goal:
+        return []
+
+    goal_x, goal_y = goal
+    # 堆中的元素为 (f, g, 坐标)
+    open_heap = [(abs(start[0] - goal_x) + abs(start[1] - goal_y), 0, start)]
+    came_from = {start: None}
+    best_cost = {start: 0}
+    expanded = 0
+
+    while open_heap:
+        _, cost, current = heapq.heappop(open_heap)
+        if current == goal:
+            path = []
+            while current != start:
+                path.append(current)
+                current = came_from[current]
+            path.reverse()
+            return path
+        if cost > best_cost[current]:
+            continue  # 已经有更短的路径到达该点
+
+        expanded += 1
+        if expanded > max_nodes:
+            return None
+
+        x, y = current
+        for dx, dy in DIRECTIONS:
+            neighbor = (x + dx, y + dy)
+            if neighbor != goal and not is_walkable(*neighbor):
+                continue
+            new_cost = cost + 1
+            if new_cost < best_cost.get(neighbor, new_cost + 1):
+                best_cost[neighbor] = new_cost
+                came_from[neighbor] = current
+                estimate = new_cost + abs(neighbor[0] - goal_x) + abs(neighbor[1] - goal_y)
+                heapq.heappush(open_heap, (estimate, new_cost, neighbor))
+    return None
+
+
+class PathCache:
+    """
+    路径缓存，以 (区域, 区域种子, 起点, 终点) 为键保存地形上的路径
+
+    路径只依据地形规划，地形在区域内不会改变，因此缓存的路径一直有效；
+    NPC和怪物的阻挡在沿路径行走时处理。
+    """
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+
+    def get_path(self, world, start, goal):
+        """获取缓存的路径，没有时规划一条新路径
+
+        Returns:
+            list: 路径的副本，找不到路径时返回None
+        """
+        key = (world.current_area, world.area_seed_value, start, goal)
+        if key in self.entries:
+            self.entries.move_to_end(key)
+            path = self.entries[key]
+        else:
+            path = find_path(world.is_walkable, start, goal)
+            self.entries[key] = path
+            if len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+        return list(path) if path is not None else None
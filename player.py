@@ -1,5 +1,8 @@
 from cultivation import CultivationSystem
 from heart_method import InbornHeartMethod
+from damage import mitigate
+from cooldown import CooldownManager
+from ability import AbilityLadder, ability_damage
 
 class Player:
     def __init__(self, x, y):
@@ -21,15 +24,18 @@ class Player:
         self.attack = 10
         self.defense = 5
         self.speed = 5
+        self.critical_chance = 0  # 暴击率
+        self.dodge_chance = 0  # 闪避率
         
         # 心法
         self.inborn_heart_method = None  # 先天心法
         self.acquired_heart_methods = []  # 后天心法
         
-        # 状态效果
+        # 状态效果，由StatusEffectSystem管理并同步下面的属性
+        self.status_effects = []
         self.stunned = False  # 眩晕
-        self.bleed = 0  # 流血
-        self.poison = 0  # 中毒
+        self.bleed = 0  # 流血层数
+        self.poison = 0  # 中毒层数
         
         # Equipment and inventory
         self.weapon = "木剑"
@@ -42,7 +48,9 @@ class Player:
         
         # Abilities and techniques
         self.abilities = ["基本打击", "气力拳"]
+        self.ability_ladder = AbilityLadder(self.abilities)  # 特殊攻击按内力选择技能用的阶梯
         self.techniques = []  # 招式列表
+        self.cooldowns = CooldownManager()  # 招式冷却，每个玩家独立，按玩家行动的回合推进
         
         # Quest related
         self.active_quests = []
@@ -98,19 +106,21 @@ class Player:
             return True
         return False
     
+    def learn_ability(self, ability_name):
+        """学习技能"""
+        if ability_name not in self.abilities:
+            self.abilities.append(ability_name)
+            self.ability_ladder.rebuild(self.abilities)
+            return True
+        return False
+    
     def use_ability(self, ability_name):
-        # Return the damage and qi cost for the ability
-        if ability_name == "基本打击":
-            return self.attack, 0
-        elif ability_name == "气力拳":
-            return int(self.attack * 1.5), 10
-        elif ability_name == "旋风斩":
-            return int(self.attack * 1.2), 15
-        elif ability_name == "飞剑术":
-            return int(self.attack * 2), 20
-        elif ability_name == "龙拳":
-            return int(self.attack * 2.5), 30
-        return 0, 0
+        """技能的伤害和内力消耗"""
+        return ability_damage(ability_name, self.attack)
+    
+    def best_ability(self):
+        """当前内力足够使用的最强技能"""
+        return self.ability_ladder.best(self.qi)
     
     def restore_health(self, amount):
         self.health = min(self.health + amount, self.max_health)
@@ -118,8 +128,8 @@ class Player:
     def restore_qi(self, amount):
         self.qi = min(self.qi + amount, self.max_qi)
     
-    def take_damage(self, amount):
-        actual_damage = max(1, amount - self.defense)
+    def take_damage(self, amount, defense_ratio=1.0):
+        actual_damage = mitigate(amount, self.defense, defense_ratio)
         self.health -= actual_damage
         return actual_damage
     
@@ -225,22 +235,6 @@ class Player:
             
         return count - remaining_to_remove  # 返回实际移除的数量
     
-    def update_status_effects(self):
-        """更新状态效果"""
-        # 处理流血
-        if self.bleed > 0:
-            self.health -= self.bleed
-            self.bleed -= 1
-        
-        # 处理中毒
-        if self.poison > 0:
-            self.health -= self.poison
-            self.poison -= 1
-        
-        # 处理眩晕
-        if self.stunned:
-            self.stunned = False  # 眩晕只持续一回合
-    
     def accept_quest(self, quest):
         self.active_quests.append(quest)
     
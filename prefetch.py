@@ -0,0 +1,67 @@
+from concurrent.futures import ThreadPoolExecutor
+
+class AreaPrefetcher:
+    """
+    相邻区域预生成器，在后台线程中提前生成传送门通往的区域
+    """
+    def __init__(self, max_workers=1):
+        """初始化预生成器
+
+        Args:
+            max_workers: 后台生成线程数，默认为1个
+        """
+        self.executor = ThreadPoolExecutor(max_workers=max_workers,
+                                           thread_name_prefix="area-prefetch")
+        self.pending = {}  # (区域名称, 种子, 入口) -> Future
+
+    def prefetch(self, area_name, seed, build_area, entries=frozenset()):
+        """安排在后台生成一个区域
+
+        Args:
+            area_name: 区域名称
+            seed: 生成种子，相同的种子总是得到相同的区域
+            build_area: 生成函数，签名为 build_area(area_name, seed, entries)
+            entries: 提交时区域入口的快照，后台线程只读这份不可变的集合
+        """
+        entries = frozenset(entries)
+        key = (area_name, seed, entries)
+        if key not in self.pending:
+            self.pending[key] = self.executor.submit(build_area, area_name, seed, entries)
+
+    def prefetch_all(self, requests, build_area):
+        """安排生成一组区域，并丢弃不再需要的预生成任务
+
+        Args:
+            requests: (区域名称, 种子, 入口) 列表
+            build_area: 生成函数
+        """
+        wanted = {(area_name, seed, frozenset(entries)) for area_name, seed, entries in requests}
+        for key in list(self.pending):
+            if key not in wanted:
+                self.pending.pop(key).cancel()
+
+        for area_name, seed, entries in wanted:
+            self.prefetch(area_name, seed, build_area, entries)
+
+    def take(self, area_name, seed, entries=frozenset()):
+        """取出预生成的区域
+
+        如果区域仍在生成中则等待其完成；入口与预生成时不同的任务不会被取出。
+
+        Returns:
+            Area: 预生成的区域；没有对应的预生成任务或生成失败时返回None
+        """
+        future = self.pending.pop((area_name, seed, frozenset(entries)), None)
+        if future is None or future.cancelled():
+            return None
+        if future.exception() is not None:
+            # 交给调用方同步重新生成，错误会在那里抛出
+            return None
+        return future.result()
+
+    def shutdown(self):
+        """取消所有预生成任务并关闭后台线程"""
+        for future in self.pending.values():
+            future.cancel()
+        self.pending.clear()
+        self.executor.shutdown(wait=False)
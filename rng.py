@@ -0,0 +1,21 @@
+import hashlib
+import random
+
+def derive_seed(*parts):
+    """由世界种子和若干标识（区域名称、进入次数等）派生出一个稳定的64位种子
+
+    与内置hash()不同，派生结果不受进程和平台影响，可以用于缓存和复现。
+
+    Args:
+        parts: 参与派生的各个部分，会被转换为字符串
+
+    Returns:
+        int: 派生出的种子
+    """
+    text = ":".join(str(part) for part in parts)
+    digest = hashlib.blake2b(text.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "little")
+
+def make_rng(*parts):
+    """创建一个独立的随机数流，种子由derive_seed派生"""
+    return random.Random(derive_seed(*parts))
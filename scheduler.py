@@ -0,0 +1,119 @@
+import heapq
+
+# 行动一次消耗的能量
+ACTION_ENERGY = 100
+
+
+class EnergyScheduler:
+    """
+    按速度分配行动的能量调度器
+
+    每个行动者每个时间单位获得与速度相等的能量，能量达到ACTION_ENERGY即可行动，行动消耗能量，
+    多余的能量保留到下一次。调度器不会逐帧给所有行动者加能量，而是直接算出每个行动者
+    下一次就绪的时刻放入优先队列，取出下一个行动者和重新排程都是O(log n)。
+    同一时刻就绪的行动者按速度从快到慢、再按加入的先后行动。
+    时间是整数，没有行动者就绪时可以直接跳到下一个事件。
+    """
+    def __init__(self):
+        self.time = 0  # 当前时刻（时间单位）
+        self.heap = []  # (就绪时刻, -速度, 序号, 行动者)
+        self.entries = {}  # 行动者 -> [记录时刻的能量, 记录时刻, 速度, 序号]
+        self.counter = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def __contains__(self, actor):
+        return actor in self.entries
+
+    def add(self, actor, speed, energy=0):
+        """加入一个行动者，已存在时覆盖
+
+        Args:
+            actor: 行动者，任意可哈希的对象
+            speed: 速度，每个时间单位获得的能量；为0时永远不会行动
+            energy: 初始能量
+        """
+        self.counter += 1
+        self.entries[actor] = [energy, self.time, speed, self.counter]
+        self._push(actor)
+
+    def remove(self, actor):
+        """移除一个行动者，堆中残留的条目在取出时跳过"""
+        self.entries.pop(actor, None)
+
+    def set_speed(self, actor, speed):
+        """修改行动者的速度，已积累的能量保留"""
+        self.add(actor, speed, self.get_energy(actor))
+
+    def get_energy(self, actor):
+        """行动者在当前时刻的能量"""
+        energy, since, speed, _ = self.entries[actor]
+        return energy + speed * (self.time - since)
+
+    def ready_time(self, actor):
+        """行动者下一次就绪的时刻，速度为0时返回None"""
+        energy, since, speed, _ = self.entries[actor]
+        if energy >= ACTION_ENERGY:
+            return since
+        if speed <= 0:
+            return None
+        return since + -(-(ACTION_ENERGY - energy) // speed)
+
+    def _push(self, actor):
+        ready = self.ready_time(actor)
+        if ready is not None:
+            _, _, speed, order = self.entries[actor]
+            heapq.heappush(self.heap, (ready, -speed, order, actor))
+
+    def peek(self):
+        """获取下一个就绪的行动者及其就绪时刻 (时刻, 行动者)，没有时返回None"""
+        heap = self.heap
+        while heap:
+            ready, _, order, actor = heap[0]
+            entry = self.entries.get(actor)
+            if entry is not None and entry[3] == order:
+                return ready, actor
+            heapq.heappop(heap)  # 已移除或重新排程的行动者留下的旧条目
+        return None
+
+    def next_actor(self, until=None, cost=ACTION_ENERGY):
+        """取出下一个行动者并让它行动
+
+        时间前进到该行动者就绪的时刻，扣除本次行动的能量后重新排程。
+
+        Args:
+            until: 只取出在该时刻之前（含）就绪的行动者；为None时直接快进到下一个事件
+            cost: 本次行动消耗的能量
+
+        Returns:
+            行动者，没有就绪的行动者时返回None
+        """
+        head = self.peek()
+        if head is None or (until is not None and head[0] > until):
+            return None
+        ready, actor = head
+        heapq.heappop(self.heap)
+        self.time = max(self.time, ready)
+        energy = self.get_energy(actor)
+        entry = self.entries[actor]
+        entry[0], entry[1] = energy - cost, self.time
+        self._push(actor)
+        return actor
+
+    def advance(self, until):
+        """依次取出到时刻until为止就绪的所有行动者，然后把时间推进到until
+
+        速度快的行动者在这段时间内可能出现多次。
+
+        Returns:
+            list: 按行动顺序排列的行动者
+        """
+        actors = []
+        while True:
+            actor = self.next_actor(until)
+            if actor is None:
+                break
+            actors.append(actor)
+        self.time = max(self.time, until)
+        return actors
@@ -0,0 +1,250 @@
+"""
+向量化的蒙特卡洛战斗模拟，用于平衡境界、怪物属性和招式
+
+同时进行N场互相独立的自动战斗：每场战斗的状态保存在NumPy数组中，每一步的随机数一次性抽取，
+规则与Combat的自动战斗、Monster.get_attack_damage和damage模块的伤害流程一致。
+
+用法: python simulation.py [怪物类型] [战斗场数] [境界]
+"""
+
+import sys
+import time
+import numpy as np
+from combat import AUTO_MIN_QI, AUTO_FINISH_HP_RATIO, AUTO_DEFEND_HP_RATIO, AUTO_DEFEND_CHANCE, \
+    AUTO_BASIC_CHANCE, BLOCK_CHANCE, DEFEND_QI_RATIO, DEFEND_MIN_QI
+from crowd import MONSTER_SPEED
+from damage import multiplier, scale_hits, mitigate_array, element_of, MISS
+from entity import ATTACK_VARIANCE
+from player import Player
+from scheduler import EnergyScheduler
+from spawner import MONSTER_ARCHETYPES
+
+# 统计分布时使用的百分位数
+PERCENTILES = (10, 50, 90)
+
+
+class PlayerBuild:
+    """
+    参与模拟的玩家属性
+    """
+    def __init__(self, health, max_health, qi, max_qi, attack, defense, speed, basic, abilities,
+                 element="neutral", realm=None, critical_chance=0, dodge_chance=0):
+        """初始化玩家属性
+
+        Args:
+            health, max_health, qi, max_qi, attack, defense, speed: 与Player的同名属性相同
+            basic: 普通攻击的 (伤害, 内力消耗)
+            abilities: 特殊攻击可选的 [(伤害, 内力消耗)]，按内力消耗从低到高排列，与Player.ability_ladder相同
+            element, realm: 伤害属性和境界，决定五行和境界差倍率
+            critical_chance, dodge_chance: 与Player的同名属性相同
+        """
+        self.health = health
+        self.max_health = max_health
+        self.qi = qi
+        self.max_qi = max_qi
+        self.attack = attack
+        self.defense = defense
+        self.speed = speed
+        self.basic = basic
+        self.abilities = abilities
+        self.element = element
+        self.realm = realm
+        self.critical_chance = critical_chance
+        self.dodge_chance = dodge_chance
+
+    @classmethod
+    def from_player(cls, player):
+        """按玩家当前的属性和技能创建"""
+        return cls(player.health, player.max_health, player.qi, player.max_qi, player.attack,
+                   player.defense, player.speed, player.use_ability("基本打击"),
+                   [player.use_ability(name) for name in player.ability_ladder.names],
+                   element_of(player), player.level, player.critical_chance, player.dodge_chance)
+
+
+def pick_abilities(build, qi):
+    """按内力二分查找每场战斗特殊攻击使用的技能，内力不足以使用任何技能时为普通攻击
+
+    Returns:
+        (numpy.ndarray, numpy.ndarray): 伤害和内力消耗
+    """
+    damages = np.array([build.basic[0]] + [damage for damage, _ in build.abilities], dtype=np.int64)
+    costs = np.array([0] + [cost for _, cost in build.abilities], dtype=np.int64)
+    pick = np.searchsorted(costs, qi, side="right") - 1
+    return damages[pick], costs[pick]
+
+def make_realm_player(level=9):
+    """创建一个逐级突破到指定境界、生命和内力全满的玩家"""
+    player = Player(0, 0)
+    for realm_level in range(8, level - 1, -1):
+        player.level = realm_level
+        player.apply_realm_bonuses()
+    player.health = player.max_health
+    player.qi = player.max_qi
+    return player
+
+def iter_turns(player_speed, monster_speed):
+    """按Combat中的出手顺序依次产生每次行动的一方，玩家出手时为True"""
+    order = EnergyScheduler()
+    order.add("player", player_speed)
+    order.add("monster", monster_speed)
+    while True:
+        yield order.next_actor() == "player"
+
+
+class FightResults:
+    """
+    一批模拟战斗的结果，每个数组按战斗编号排列
+    """
+    def __init__(self, won, finished, rounds, player_hp, monster_hp, build, monster_type):
+        self.won = won  # 玩家是否获胜
+        self.finished = finished  # 是否在行动次数上限内分出胜负
+        self.rounds = rounds  # 玩家出手的回合数
+        self.player_hp = player_hp  # 战斗结束时玩家的剩余生命
+        self.monster_hp = monster_hp  # 战斗结束时怪物的剩余生命
+        self.build = build
+        self.monster_type = monster_type
+
+    def __len__(self):
+        return len(self.won)
+
+    def summary(self):
+        """统计胜率、获胜所需回合数以及双方剩余生命的分布
+
+        Returns:
+            dict: 胜率、未分胜负的场数，以及各项的均值和PERCENTILES百分位数
+        """
+        def distribution(values):
+            if not len(values):
+                return None
+            return {"mean": float(values.mean()),
+                    "percentiles": dict(zip(PERCENTILES, np.percentile(values, PERCENTILES).tolist()))}
+
+        lost = self.finished & ~self.won
+        return {
+            "fights": len(self),
+            "win_rate": float(self.won.mean()) if len(self) else 0.0,
+            "unfinished": int((~self.finished).sum()),
+            "rounds_to_kill": distribution(self.rounds[self.won]),
+            "player_hp_left": distribution(self.player_hp[self.won]),
+            "monster_hp_left": distribution(self.monster_hp[lost])
+        }
+
+
+def simulate_fights(build, monster_type, count, rng=None, max_actions=100000):
+    """模拟count场玩家对怪物的自动战斗
+
+    每一步所有进行中的战斗由同一方出手（双方速度在各场战斗中相同，出手顺序也相同），
+    分出胜负的战斗随即从数组中移除，之后的每一步只计算仍在进行的战斗。
+
+    Args:
+        build: PlayerBuild
+        monster_type: 怪物类型名称或MONSTER_ARCHETYPES中的怪物字典，可选的health为怪物当前的生命
+        count: 战斗场数
+        rng: NumPy随机数生成器，默认新建
+        max_actions: 每场战斗最多的行动次数，超过时视为未分胜负
+
+    Returns:
+        FightResults: 模拟结果
+    """
+    rng = rng if rng is not None else np.random.default_rng()
+    if isinstance(monster_type, str):
+        monster_type = MONSTER_ARCHETYPES[monster_type]
+    monster_max_hp = monster_type["hp"]
+    monster_health = monster_type.get("health", monster_max_hp)
+    monster_attack = monster_type["attack"]
+    monster_defense = monster_type["defense"]
+    monster_element = monster_type.get("element", "neutral")
+    defend_qi = max(DEFEND_MIN_QI, build.max_qi * DEFEND_QI_RATIO)
+    # 双方之间的五行和境界差倍率在整批战斗中相同
+    outgoing = multiplier(build.element, monster_element, build.realm, monster_type.get("realm"))
+    incoming = multiplier(monster_element, build.element, monster_type.get("realm"), build.realm)
+
+    # 结果数组按战斗编号保存，进行中的状态数组按ids压缩保存
+    won = np.zeros(count, dtype=bool)
+    finished = np.zeros(count, dtype=bool)
+    out_rounds = np.zeros(count, dtype=np.int64)
+    out_player_hp = np.full(count, build.health, dtype=np.int64)
+    out_monster_hp = np.full(count, monster_health, dtype=np.int64)
+
+    ids = np.arange(count)
+    player_hp = np.full(count, build.health, dtype=np.int64)
+    monster_hp = np.full(count, monster_health, dtype=np.int64)
+    qi = np.full(count, build.qi, dtype=np.float64)  # 防御恢复的内力可能不是整数
+    defending = np.zeros(count, dtype=bool)
+    rounds = np.zeros(count, dtype=np.int64)
+
+    turns = iter_turns(build.speed, monster_type.get("speed", MONSTER_SPEED))
+    for _ in range(max_actions):
+        if not len(ids):
+            break
+        n = len(ids)
+        if next(turns):
+            # 玩家出手，与Combat.update_auto_combat的选择顺序相同
+            low_qi = qi < AUTO_MIN_QI
+            finish = ~low_qi & (monster_hp < monster_max_hp * AUTO_FINISH_HP_RATIO)
+            defend = ~low_qi & ~finish & (player_hp < build.max_health * AUTO_DEFEND_HP_RATIO) & \
+                (rng.random(n) < AUTO_DEFEND_CHANCE)
+            special = finish | (~low_qi & ~finish & ~defend & (rng.random(n) >= AUTO_BASIC_CHANCE))
+
+            # 特殊攻击使用内力足够的技能中排在最后的一个，普通攻击不消耗内力
+            damage, cost = pick_abilities(build, qi)
+            damage = np.where(special, damage, build.basic[0])
+            cost = np.where(special, cost, 0)
+            qi -= cost
+            damage, outcome = scale_hits(damage, outgoing, build.critical_chance, rng=rng)
+            monster_hp -= np.where(defend | (outcome == MISS), 0, mitigate_array(damage, monster_defense))
+            qi = np.where(defend, np.minimum(qi + defend_qi, build.max_qi), qi)
+            defending = defend
+            rounds += 1
+        else:
+            # 怪物出手：防御时有一定概率格挡，未格挡时伤害减半；怪物没有暴击率
+            blocked = defending & (rng.random(n) < BLOCK_CHANCE)
+            variance = 1.0 + rng.uniform(-ATTACK_VARIANCE, ATTACK_VARIANCE, n)
+            base, outcome = scale_hits((monster_attack * variance).astype(np.int64), incoming,
+                                       dodge_chance=build.dodge_chance, rng=rng)
+            base = np.where(defending, base // 2, base)
+            player_hp -= np.where(blocked | (outcome == MISS), 0, mitigate_array(base, build.defense))
+
+        done = (player_hp <= 0) | (monster_hp <= 0)
+        if done.any():
+            done_ids = ids[done]
+            won[done_ids] = monster_hp[done] <= 0
+            finished[done_ids] = True
+            out_rounds[done_ids] = rounds[done]
+            out_player_hp[done_ids] = player_hp[done]
+            out_monster_hp[done_ids] = monster_hp[done]
+            keep = ~done
+            ids, player_hp, monster_hp = ids[keep], player_hp[keep], monster_hp[keep]
+            qi, defending, rounds = qi[keep], defending[keep], rounds[keep]
+
+    # 超过行动次数上限仍未分出胜负的战斗
+    out_rounds[ids] = rounds
+    out_player_hp[ids] = player_hp
+    out_monster_hp[ids] = monster_hp
+    return FightResults(won, finished, out_rounds, out_player_hp, out_monster_hp, build, monster_type)
+
+def format_summary(summary):
+    """把统计结果格式化为多行文字"""
+    def describe(distribution):
+        if distribution is None:
+            return "--"
+        p10, p50, p90 = (distribution["percentiles"][p] for p in PERCENTILES)
+        return f"平均{distribution['mean']:.1f}  P10={p10:.0f} P50={p50:.0f} P90={p90:.0f}"
+
+    return "\n".join([
+        f"战斗{summary['fights']}场  胜率{summary['win_rate'] * 100:.1f}%  未分胜负{summary['unfinished']}场",
+        f"获胜回合数: {describe(summary['rounds_to_kill'])}",
+        f"获胜时玩家剩余生命: {describe(summary['player_hp_left'])}",
+        f"落败时怪物剩余生命: {describe(summary['monster_hp_left'])}"
+    ])
+
+if __name__ == "__main__":
+    monster_name = sys.argv[1] if len(sys.argv) > 1 else "wolf"
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000000
+    level = int(sys.argv[3]) if len(sys.argv) > 3 else 9
+    build = PlayerBuild.from_player(make_realm_player(level))
+    start = time.perf_counter()
+    results = simulate_fights(build, monster_name, count, np.random.default_rng(0))
+    elapsed = time.perf_counter() - start
+    print(f"{MONSTER_ARCHETYPES[monster_name]['name']} 对 境界{level}  用时{elapsed:.2f}秒")
+    print(format_summary(results.summary()))
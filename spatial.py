@@ -0,0 +1,82 @@
+# 空间索引的网格边长（格）
+CELL_SIZE = 8
+
+
+class SpatialIndex:
+    """
+    怪物空间索引
+
+    按网格分桶保存怪物，并记录每个格子上的怪物，
+    可以快速找出玩家附近的怪物以及判断格子是否被占据，而不必遍历整个区域的怪物列表。
+    """
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self.buckets = {}  # (网格x, 网格y) -> {id(怪物): 怪物}，保持插入顺序
+        self.occupancy = {}  # (x, y) -> 怪物
+
+    def cell_of(self, x, y):
+        """坐标所在的网格"""
+        return x // self.cell_size, y // self.cell_size
+
+    def clear(self):
+        """清空索引"""
+        self.buckets.clear()
+        self.occupancy.clear()
+
+    def rebuild(self, monsters):
+        """根据怪物列表重建索引"""
+        self.clear()
+        for monster in monsters:
+            self.add(monster)
+
+    def add(self, monster):
+        """加入一只怪物"""
+        x, y = monster["x"], monster["y"]
+        self.buckets.setdefault(self.cell_of(x, y), {})[id(monster)] = monster
+        self.occupancy[(x, y)] = monster
+
+    def remove(self, monster):
+        """移除一只怪物"""
+        x, y = monster["x"], monster["y"]
+        cell = self.cell_of(x, y)
+        bucket = self.buckets.get(cell)
+        if bucket is not None:
+            bucket.pop(id(monster), None)
+            if not bucket:
+                del self.buckets[cell]
+        if self.occupancy.get((x, y)) is monster:
+            del self.occupancy[(x, y)]
+
+    def move(self, monster, new_x, new_y):
+        """移动一只怪物并更新索引"""
+        old_cell = self.cell_of(monster["x"], monster["y"])
+        new_cell = self.cell_of(new_x, new_y)
+        if self.occupancy.get((monster["x"], monster["y"])) is monster:
+            del self.occupancy[(monster["x"], monster["y"])]
+        if old_cell != new_cell:
+            bucket = self.buckets[old_cell]
+            del bucket[id(monster)]
+            if not bucket:
+                del self.buckets[old_cell]
+            self.buckets.setdefault(new_cell, {})[id(monster)] = monster
+        monster["x"], monster["y"] = new_x, new_y
+        self.occupancy[(new_x, new_y)] = monster
+
+    def get_at(self, x, y):
+        """获取格子上的怪物，没有时返回None"""
+        return self.occupancy.get((x, y))
+
+    def query(self, x, y, radius):
+        """获取与(x, y)的切比雪夫距离不超过radius的怪物，按网格顺序返回"""
+        min_cx, min_cy = self.cell_of(x - radius, y - radius)
+        max_cx, max_cy = self.cell_of(x + radius, y + radius)
+        result = []
+        for cy in range(min_cy, max_cy + 1):
+            for cx in range(min_cx, max_cx + 1):
+                bucket = self.buckets.get((cx, cy))
+                if not bucket:
+                    continue
+                for monster in bucket.values():
+                    if abs(monster["x"] - x) <= radius and abs(monster["y"] - y) <= radius:
+                        result.append(monster)
+        return result
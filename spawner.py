@@ -0,0 +1,175 @@
+import heapq
+from crowd import MONSTER_SPEED
+
+# 怪物类型
+MONSTER_ARCHETYPES = {
+    "wolf": {"name": "灰狼", "char": "w", "hp": 30, "attack": 10, "defense": 3, "experience": 20,
+             "behavior": "chase", "speed": 8},
+    "bandit": {"name": "山贼", "char": "b", "hp": 50, "attack": 12, "defense": 5, "experience": 25,
+               "behavior": "keep_distance", "speed": 5},
+    "boar": {"name": "野猪", "char": "p", "hp": 40, "attack": 8, "defense": 7, "experience": 30,
+             "behavior": "wander", "speed": 4},
+    "tiger": {"name": "猛虎", "char": "t", "hp": 70, "attack": 15, "defense": 8, "experience": 40,
+              "speed": 7},
+    "master": {"name": "武林高手", "char": "m", "hp": 100, "attack": 20, "defense": 10, "experience": 60,
+               "speed": 6},
+    "imp": {"name": "洞窟妖兽", "char": "d", "hp": 80, "attack": 18, "defense": 12, "experience": 50,
+            "behavior": "chase", "speed": 5},
+    "cave_lord": {"name": "洞窟之主", "char": "D", "hp": 200, "attack": 25, "defense": 15, "experience": 100,
+                  "speed": 6}
+}
+
+# 各区域的刷怪点：怪物类型、数量上限、刷新间隔（时间单位）、允许的地形，
+# 以及可选的刷新范围 (x0, y0, x1, y1)（包含边界，省略时为整个区域）
+AREA_SPAWNERS = {
+    "forest": [
+        {"archetype": "wolf", "cap": 3, "interval": 1200, "terrains": ["floor", "grass"]},
+        {"archetype": "boar", "cap": 2, "interval": 1600, "terrains": ["floor", "grass"]}
+    ],
+    "mountain": [
+        {"archetype": "tiger", "cap": 3, "interval": 1600, "terrains": ["floor", "grass", "path"]}
+    ],
+    "cave": [
+        {"archetype": "imp", "cap": 4, "interval": 1200, "terrains": ["floor"]}
+    ]
+}
+
+
+def fill_monster(monster, monster_type, x, y):
+    """按怪物类型填写怪物字典，返回该字典"""
+    monster.clear()
+    monster["name"] = monster_type["name"]
+    monster["char"] = monster_type["char"]
+    monster["x"] = x
+    monster["y"] = y
+    monster["hp"] = monster_type["hp"]
+    monster["max_hp"] = monster_type["hp"]
+    monster["attack"] = monster_type["attack"]
+    monster["defense"] = monster_type["defense"]
+    monster["experience"] = monster_type["experience"]
+    monster["speed"] = monster_type.get("speed", MONSTER_SPEED)
+    if "behavior" in monster_type:
+        monster["behavior"] = monster_type["behavior"]
+    return monster
+
+def make_monster(monster_type, x, y):
+    """根据怪物类型创建位于(x, y)的怪物字典"""
+    return fill_monster({}, monster_type, x, y)
+
+
+class MonsterPool:
+    """
+    怪物记录池，回收被击败的怪物字典，刷新怪物时重新填写后使用
+    """
+    def __init__(self, max_size=256):
+        self.max_size = max_size
+        self.records = []
+
+    def acquire(self, monster_type, x, y):
+        """取出一条记录并按怪物类型填写，池为空时新建"""
+        monster = self.records.pop() if self.records else {}
+        return fill_monster(monster, monster_type, x, y)
+
+    def release(self, monster):
+        """回收一条不再使用的记录"""
+        if len(self.records) < self.max_size:
+            self.records.append(monster)
+
+
+class Spawner:
+    """
+    刷怪点，在所属区域中维持不超过cap只由它刷新的怪物
+    """
+    def __init__(self, spawner_id, area, archetype, cap, interval, terrains, region=None):
+        self.id = spawner_id
+        self.area = area
+        self.archetype = archetype
+        self.cap = cap
+        self.interval = interval  # 刷新间隔（时间单位）
+        self.terrains = terrains
+        self.region = tuple(region) if region else None
+        self.alive = 0  # 当前存活的由它刷新的怪物数量
+        self.armed = False  # 计时器是否在堆中
+
+
+class SpawnerSystem:
+    """
+    刷怪系统，所有区域的刷怪点共用一个计时器堆
+
+    只有数量未满的刷怪点在堆中等待，每次更新只需查看堆顶，计时器到期的刷怪点才会刷新怪物，
+    没有计时器到期时的开销与刷怪点数量无关。不在当前区域的刷怪点到期后被挂起，
+    直到玩家再次进入该区域才重新计时。
+    """
+    def __init__(self, definitions=AREA_SPAWNERS, pool=None):
+        """初始化刷怪系统
+
+        Args:
+            definitions: {区域名称: [刷怪点定义]}
+            pool: 怪物记录池
+        """
+        self.spawners = []
+        self.by_area = {}  # 区域 -> [刷怪点]
+        for area, entries in definitions.items():
+            for entry in entries:
+                spawner = Spawner(len(self.spawners), area, **entry)
+                self.spawners.append(spawner)
+                self.by_area.setdefault(area, []).append(spawner)
+        self.pool = pool or MonsterPool()
+        self.heap = []  # (到期时刻, 刷怪点编号)
+        self.parked = {}  # 区域 -> [挂起的刷怪点]
+        self.spawned = 0  # 累计刷新的怪物数量
+
+    def arm(self, spawner, now):
+        """让刷怪点在一个刷新间隔之后到期"""
+        spawner.armed = True
+        heapq.heappush(self.heap, (now + spawner.interval, spawner.id))
+
+    def activate(self, area, now):
+        """进入区域时调用：区域重新生成后没有由刷怪点刷新的怪物，所有刷怪点重新开始计时"""
+        parked = self.parked.pop(area, [])
+        for spawner in self.by_area.get(area, []):
+            spawner.alive = 0
+            if spawner in parked or not spawner.armed:
+                self.arm(spawner, now)
+
+    def update(self, world, player=None):
+        """处理到期的计时器
+
+        Args:
+            world: 世界对象，提供当前区域、世界时间和放置怪物的方法
+            player: 玩家坐标 (x, y)，怪物不会刷新在玩家所在的格子
+        """
+        now = world.world_time
+        while self.heap and self.heap[0][0] <= now:
+            _, spawner_id = heapq.heappop(self.heap)
+            spawner = self.spawners[spawner_id]
+            if spawner.area != world.current_area:
+                self.parked.setdefault(spawner.area, []).append(spawner)
+                continue
+            if spawner.alive < spawner.cap and self.spawn(spawner, world, player):
+                spawner.alive += 1
+            if spawner.alive < spawner.cap:
+                self.arm(spawner, now)
+            else:
+                spawner.armed = False
+
+    def spawn(self, spawner, world, player=None):
+        """在空闲格子中刷新一只怪物，没有空闲格子时返回False"""
+        cells = world.spawn_cells(1, spawner.terrains, spawner.region, player)
+        if not cells:
+            return False
+        monster = self.pool.acquire(MONSTER_ARCHETYPES[spawner.archetype], *cells[0])
+        monster["spawner"] = spawner.id
+        world.add_monster(monster)
+        self.spawned += 1
+        return True
+
+    def on_monster_removed(self, monster, now):
+        """怪物被击败后调用，由刷怪点刷新的怪物会让刷怪点重新计时，记录回收到池中"""
+        spawner_id = monster.get("spawner")
+        if spawner_id is not None:
+            spawner = self.spawners[spawner_id]
+            spawner.alive = max(0, spawner.alive - 1)
+            if not spawner.armed:
+                self.arm(spawner, now)
+        self.pool.release(monster)
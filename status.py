@@ -0,0 +1,157 @@
+import heapq
+from crowd import MONSTER_SPEED
+from scheduler import ACTION_ENERGY
+
+# 一回合的时间单位数，与速度为MONSTER_SPEED的单位行动一次所需的时间相同
+TICKS_PER_ROUND = ACTION_ENERGY // MONSTER_SPEED
+
+# 状态效果的类型：名称、最大层数、持续回合数、每隔几回合结算一次（None为不结算）、每层每次结算的伤害，
+# 以及在目标上同步的属性（有伤害的效果同步层数，其余同步是否生效）
+STATUS_TYPES = {
+    "poison": {"name": "中毒", "max_stacks": 5, "rounds": 10, "interval": 1, "damage": 3, "attribute": "poison"},
+    "bleed": {"name": "流血", "max_stacks": 3, "rounds": 5, "interval": 1, "damage": 5, "attribute": "bleed"},
+    "stun": {"name": "眩晕", "max_stacks": 1, "rounds": 1, "interval": None, "damage": 0, "attribute": "stunned"}
+}
+
+
+class StatusEffect:
+    """
+    作用在玩家或怪物身上的一个状态效果
+    """
+    def __init__(self, kind, target, stacks, damage, expires, next_tick, source=None):
+        definition = STATUS_TYPES[kind]
+        self.kind = kind
+        self.name = definition["name"]
+        self.target = target
+        self.stacks = stacks  # 当前层数
+        self.damage = damage  # 每层每次结算的伤害
+        self.expires = expires  # 到期时刻（时间单位）
+        self.next_tick = next_tick  # 下次结算的时刻，不结算的效果为None
+        self.source = source  # 施加者
+        self.active = True
+
+
+class StatusEffectSystem:
+    """
+    状态效果系统，玩家和怪物身上的所有效果共用一个按时刻排列的最小堆
+
+    堆中保存每个效果下次结算和到期的时刻，更新时只处理堆顶已到时刻的条目，
+    没有效果结算或到期时更新的开销与效果数量无关。效果刷新或移除后，堆中的旧条目在取出时跳过。
+    """
+    def __init__(self, time=0):
+        self.time = time  # 当前时刻（时间单位）
+        self.heap = []  # (时刻, 是否为到期条目, 序号, 效果)，同一时刻先结算再到期
+        self.counter = 0
+
+    def _push(self, when, effect, expiry):
+        self.counter += 1
+        heapq.heappush(self.heap, (when, expiry, self.counter, effect))
+
+    def get(self, target, kind):
+        """目标身上某种类型的效果，没有时返回None"""
+        for effect in getattr(target, "status_effects", ()):
+            if effect.kind == kind:
+                return effect
+        return None
+
+    def apply(self, target, kind, stacks=1, damage=None, source=None):
+        """对目标施加效果：已有同类效果时叠加层数（不超过上限）并刷新持续时间
+
+        Args:
+            target: 玩家或怪物
+            kind: STATUS_TYPES中的效果类型
+            stacks: 增加的层数
+            damage: 每层每次结算的伤害，默认使用效果类型的伤害
+            source: 施加者
+
+        Returns:
+            StatusEffect: 目标身上的效果
+        """
+        definition = STATUS_TYPES[kind]
+        expires = self.time + definition["rounds"] * TICKS_PER_ROUND
+        effect = self.get(target, kind)
+        if effect is None:
+            interval = definition["interval"]
+            next_tick = None if interval is None else self.time + interval * TICKS_PER_ROUND
+            effect = StatusEffect(kind, target, min(stacks, definition["max_stacks"]),
+                                  definition["damage"] if damage is None else damage, expires, next_tick, source)
+            if not hasattr(target, "status_effects"):
+                target.status_effects = []
+            target.status_effects.append(effect)
+            if next_tick is not None:
+                self._push(next_tick, effect, False)
+        else:
+            effect.stacks = min(effect.stacks + stacks, definition["max_stacks"])
+            if damage is not None:
+                effect.damage = max(effect.damage, damage)
+            effect.source = source or effect.source
+            effect.expires = expires
+            interval = definition["interval"]
+            if effect.next_tick is None and interval is not None:
+                # 已经结算完最后一次的效果重新开始结算
+                effect.next_tick = self.time + interval * TICKS_PER_ROUND
+                self._push(effect.next_tick, effect, False)
+        self._push(expires, effect, True)
+        self._sync(target, kind)
+        return effect
+
+    def remove(self, target, kind):
+        """移除目标身上某种类型的效果"""
+        effect = self.get(target, kind)
+        if effect is not None:
+            self._expire(effect)
+
+    def clear(self, target):
+        """移除目标身上的所有效果，如战斗结束或目标被击败时"""
+        for effect in list(getattr(target, "status_effects", ())):
+            self._expire(effect)
+
+    def _expire(self, effect):
+        effect.active = False
+        effect.target.status_effects.remove(effect)
+        self._sync(effect.target, effect.kind)
+
+    def _sync(self, target, kind):
+        """把效果同步到目标的属性上（如poison为中毒层数、stunned为是否眩晕）"""
+        definition = STATUS_TYPES[kind]
+        effect = self.get(target, kind)
+        if definition["damage"]:
+            setattr(target, definition["attribute"], effect.stacks if effect else 0)
+        else:
+            setattr(target, definition["attribute"], effect is not None)
+
+    def update(self, now):
+        """推进到时刻now，结算和移除到时刻的效果
+
+        持续伤害不可闪避、不受防御减免，直接扣除目标的生命。
+
+        Returns:
+            int: 处理的结算和到期次数
+        """
+        self.time = max(self.time, now)
+        heap = self.heap
+        processed = 0
+        while heap and heap[0][0] <= self.time:
+            when, expiry, _, effect = heapq.heappop(heap)
+            if not effect.active:
+                continue  # 已移除的效果留下的旧条目
+            if expiry:
+                if when == effect.expires:
+                    self._expire(effect)
+                    processed += 1
+                continue
+            if when != effect.next_tick:
+                continue
+            effect.target.health -= effect.damage * effect.stacks
+            processed += 1
+            next_tick = when + STATUS_TYPES[effect.kind]["interval"] * TICKS_PER_ROUND
+            if next_tick <= effect.expires:
+                effect.next_tick = next_tick
+                self._push(next_tick, effect, False)
+            else:
+                effect.next_tick = None
+        return processed
+
+    def remaining_rounds(self, effect):
+        """效果剩余的回合数（向上取整）"""
+        return max(0, -(-(effect.expires - self.time) // TICKS_PER_ROUND))
@@ -1,86 +1,103 @@
 import random
+from bisect import bisect_left
+from damage import scale_hit, MISS, CRIT
+from cooldown import cooldowns_of
+
+
+def heart_method_names(player):
+    """玩家学会的所有心法（先天和后天）的名称"""
+    names = {heart_method.name for heart_method in getattr(player, "acquired_heart_methods", ())}
+    inborn = getattr(player, "inborn_heart_method", None)
+    if inborn is not None:
+        names.add(inborn.name)
+    return frozenset(names)
+
+def eligibility_key(player):
+    """招式资格索引的键：(境界, 心法名称集合)"""
+    return player.level, heart_method_names(player)
+
 
 class Technique:
     """
     武学招式基类
     """
+    defense_ratio = 0.5  # 招式只受目标一半防御的减免
+    
     def __init__(self, name, description, damage_base, qi_cost, cooldown=0, requirements=None):
         self.name = name  # 招式名称
         self.description = description  # 招式描述
         self.damage_base = damage_base  # 基础伤害
         self.qi_cost = qi_cost  # 内力消耗
-        self.cooldown = cooldown  # 冷却时间（回合数）
-        self.current_cooldown = 0  # 当前冷却状态
+        self.cooldown = cooldown  # 冷却时间（回合数），冷却状态记录在使用者的cooldowns中
         self.requirements = requirements or {}  # 使用要求（境界、心法、属性等）
+        # 境界和心法要求只在突破或学会心法时变化，由TechniqueSystem预先建立索引；其余属性要求每次使用时检查
+        self.required_level = self.requirements.get("level")  # 数字越小境界越高
+        self.required_heart_method = self.requirements.get("heart_method")
+        self.attribute_requirements = {attr: value for attr, value in self.requirements.items()
+                                       if attr not in ("level", "heart_method")}
     
-    def can_use(self, player):
-        """检查是否能够使用该招式"""
+    def meets_requirements(self, player):
+        """检查境界和心法要求"""
+        if self.required_level is not None and player.level > self.required_level:
+            return False
+        if self.required_heart_method is not None and \
+                self.required_heart_method not in heart_method_names(player):
+            return False
+        return True
+    
+    def is_ready(self, player):
+        """检查冷却、内力和属性要求，境界和心法要求由meets_requirements检查"""
         # 检查冷却
-        if self.current_cooldown > 0:
+        if not cooldowns_of(player).is_ready(self.name):
             return False
         
         # 检查内力
         if player.qi < self.qi_cost:
             return False
         
-        # 检查要求
-        for attr, value in self.requirements.items():
-            if attr == "level":
-                # 境界要求，数字越小境界越高
-                if player.level > value:
-                    return False
-            elif attr == "heart_method":
-                # 心法要求
-                if not hasattr(player, "heart_method") or player.heart_method.name != value:
-                    return False
-            elif hasattr(player, attr):
-                # 属性要求
-                player_value = getattr(player, attr)
-                if player_value < value:
-                    return False
+        # 检查属性要求
+        for attr, value in self.attribute_requirements.items():
+            if getattr(player, attr, value) < value:
+                return False
         
         return True
     
-    def use(self, user, target):
-        """使用招式"""
+    def can_use(self, player):
+        """检查是否能够使用该招式"""
+        return self.is_ready(player) and self.meets_requirements(player)
+    
+    def use(self, user, target, status=None):
+        """使用招式，status为施加流血、眩晕等效果的StatusEffectSystem"""
         if not self.can_use(user):
             return 0, "不能使用该招式"
         
         # 消耗内力
         user.qi -= self.qi_cost
         
-        # 计算伤害
-        damage = self.calculate_damage(user, target)
-        
-        # 应用伤害
-        actual_damage = target.take_damage(damage)
-        
         # 设置冷却
-        self.current_cooldown = self.cooldown
+        cooldowns_of(user).start(self.name, self.cooldown)
+        
+        # 计算伤害：命中、暴击、五行和境界差，再由目标按防御减免
+        damage, outcome = scale_hit(self.calculate_damage(user, target), user, target)
+        if outcome == MISS:
+            return 0, "未命中"
+        actual_damage = target.take_damage(damage, self.defense_ratio)
         
         # 应用额外效果
-        effect_description = self.apply_effects(user, target)
+        effect_description = self.apply_effects(user, target, status)
+        if outcome == CRIT:
+            effect_description = ", ".join(part for part in ("暴击", effect_description) if part)
         
         return actual_damage, effect_description
     
     def calculate_damage(self, user, target):
-        """计算伤害"""
+        """计算防御减免前的基础伤害"""
         # 基础伤害 + 用户攻击力 * 攻击系数
-        base_damage = self.damage_base + user.attack
-        
-        # 考虑目标防御
-        damage = max(1, base_damage - target.defense // 2)
-        
-        return damage
+        return self.damage_base + user.attack
     
-    def apply_effects(self, user, target):
+    def apply_effects(self, user, target, status=None):
         """应用额外效果，由子类实现"""
         return ""
-    
-    def update_cooldown(self):
-        """更新冷却时间"""
-        if self.current_cooldown > 0:
-            self.current_cooldown -= 1
 
 
 class BasicTechnique(Technique):
@@ -98,7 +115,7 @@ class BasicTechnique(Technique):
     
     def calculate_damage(self, user, target):
         # 普通攻击只考虑基础攻击力
-        return max(1, user.attack - target.defense // 2)
+        return user.attack
 
 
 class MartialArtTechnique(Technique):
@@ -110,23 +127,21 @@ class MartialArtTechnique(Technique):
         super().__init__(name, description, damage_base, qi_cost, cooldown, requirements)
         self.effects = effects or {}  # 额外效果
     
-    def apply_effects(self, user, target):
-        """应用额外效果"""
+    def apply_effects(self, user, target, status=None):
+        """应用额外效果，眩晕和流血需要status（StatusEffectSystem）"""
         effect_description = []
         
         for effect_type, value in self.effects.items():
             if effect_type == "stun":
                 # 眩晕效果
-                if random.random() < value:
-                    target.stunned = True
+                if status and random.random() < value:
+                    status.apply(target, "stun", source=user)
                     effect_description.append("目标被眩晕")
             elif effect_type == "bleed":
-                # 流血效果
-                if random.random() < value[0]:
-                    if not hasattr(target, "bleed"):
-                        target.bleed = 0
-                    target.bleed += value[1]
-                    effect_description.append(f"目标受到{value[1]}点流血伤害")
+                # 流血效果：每回合受到value[1]点伤害
+                if status and random.random() < value[0]:
+                    status.apply(target, "bleed", damage=value[1], source=user)
+                    effect_description.append(f"目标每回合受到{value[1]}点流血伤害")
             elif effect_type == "qi_damage":
                 # 内力伤害
                 if hasattr(target, "qi"):
@@ -152,7 +167,39 @@ class TechniqueSystem:
     """
     def __init__(self):
         self.basic_techniques = [BasicTechnique()]
-        self.martial_art_techniques = self._initialize_martial_arts()
+        self.martial_art_techniques = []
+        # 要求表：心法名称（无心法要求为None） -> 按境界要求从低到高排列的 [(境界要求, 序号, 招式)]
+        self.requirement_table = {}
+        # 资格索引：(境界, 心法名称集合) -> 满足境界和心法要求的招式，按招式的加入顺序排列
+        self.eligibility = {}
+        for technique in self._initialize_martial_arts():
+            self.add_technique(technique)
+    
+    def add_technique(self, technique):
+        """加入一个武学招式（如随机生成的招式），并使已建立的资格索引失效"""
+        bucket = self.requirement_table.setdefault(technique.required_heart_method, [])
+        # 没有境界要求的招式排在最前，任何境界都满足
+        required_level = 9 if technique.required_level is None else technique.required_level
+        bucket.insert(bisect_left(bucket, (required_level, len(self.martial_art_techniques))),
+                      (required_level, len(self.martial_art_techniques), technique))
+        self.martial_art_techniques.append(technique)
+        self.eligibility.clear()
+    
+    def eligible_techniques(self, player):
+        """满足境界和心法要求的武学招式，同一境界和心法组合只计算一次"""
+        key = eligibility_key(player)
+        techniques = self.eligibility.get(key)
+        if techniques is None:
+            level, names = key
+            matched = []
+            for name in (None, *names):
+                bucket = self.requirement_table.get(name, ())
+                # 境界要求不低于玩家当前level的招式（level越小境界越高）
+                start = bisect_left(bucket, (level, -1))
+                matched.extend(bucket[start:])
+            techniques = [technique for _, _, technique in sorted(matched, key=lambda entry: entry[1])]
+            self.eligibility[key] = techniques
+        return techniques
     
     def _initialize_martial_arts(self):
         """初始化所有武学招式"""
@@ -251,14 +298,10 @@ class TechniqueSystem:
         # 基础招式总是可用的
         available.extend(self.basic_techniques)
         
-        # 检查每个武学招式是否可用
-        for technique in self.martial_art_techniques:
-            if technique.can_use(player):
+        # 境界和心法要求由资格索引给出，只需检查冷却、内力和属性
+        for technique in self.eligible_techniques(player):
+            if technique.is_ready(player):
                 available.append(technique)
         
         return available
-    
-    def update_cooldowns(self, techniques):
-        """更新所有招式的冷却时间"""
-        for technique in techniques:
-            technique.update_cooldown() 
\ No newline at end of file
+ 
\ No newline at end of file
@@ -0,0 +1,96 @@
+import numpy as np
+
+# 武侠世界特色地形元素
+TERRAIN_CHARS = {
+    "floor": ".",       # 地面
+    "wall": "#",        # 墙壁
+    "tree": "T",        # 树
+    "water": "~",       # 水
+    "mountain": "^",    # 山
+    "portal": "O",      # 传送门
+    "flower": "*",      # 花/花园
+    "bamboo": ":",      # 竹林
+    "waterfall": "W",   # 瀑布
+    "pavilion": "P",    # 亭台
+    "teahouse": "C",    # 茶室
+    "stream": "~",      # 小溪
+    "bridge": "=",      # 石桥
+    "statue": "S",      # 雕像
+    "stairs": ">",      # 石阶
+    "rock": "r",        # 怪石
+    "grass": ",",       # 草地
+    "path": ".",        # 小路
+    "door": "+",        # 门
+    "stairs_up": "<",   # 上楼梯
+    "stairs_down": ">"  # 下楼梯
+}
+
+# 武侠世界特色地形颜色
+TERRAIN_COLORS = {
+    "floor": (60, 60, 60),       # 地面
+    "wall": (120, 120, 120),     # 墙壁
+    "tree": (0, 150, 0),         # 树
+    "water": (0, 100, 255),      # 水
+    "mountain": (150, 75, 0),    # 山
+    "portal": (255, 255, 0),     # 传送门
+    "flower": (255, 100, 255),   # 花/花园
+    "bamboo": (100, 200, 0),     # 竹林
+    "waterfall": (120, 200, 255),# 瀑布
+    "pavilion": (180, 130, 70),  # 亭台
+    "teahouse": (160, 120, 60),  # 茶室
+    "stream": (100, 150, 255),   # 小溪
+    "bridge": (150, 150, 150),   # 石桥
+    "statue": (200, 200, 200),   # 雕像
+    "stairs": (170, 170, 170),   # 石阶
+    "rock": (140, 140, 140),     # 怪石
+    "grass": (100, 180, 100),    # 草地
+    "path": (190, 170, 130),     # 小路
+    "door": (150, 75, 0),        # 门
+    "stairs_up": (200, 200, 0),  # 上楼梯
+    "stairs_down": (200, 200, 0) # 下楼梯
+}
+
+# 定义哪些地形是可通行的
+WALKABLE_TERRAIN = {
+    "floor": True,
+    "path": True,
+    "grass": True,
+    "flower": True,
+    "bridge": True,
+    "portal": True,
+    "stairs": True,
+    "door": True,
+    "stairs_up": True,
+    "stairs_down": True
+}
+
+# 地形ID，按TERRAIN_CHARS中的顺序编号，用于NumPy地图数组
+TERRAIN_TYPES = list(TERRAIN_CHARS)
+TERRAIN_IDS = {name: i for i, name in enumerate(TERRAIN_TYPES)}
+
+# 地形ID -> 显示字符
+TERRAIN_CHAR_TABLE = np.array([TERRAIN_CHARS[name] for name in TERRAIN_TYPES])
+# 地形ID -> 是否可通行
+WALKABLE_TABLE = np.array([WALKABLE_TERRAIN.get(name, False) for name in TERRAIN_TYPES])
+
+# 显示字符 -> 地形ID，多个地形共用同一字符时取第一个（与World.is_position_valid一致）
+CHAR_TO_TERRAIN_ID = {}
+for _name in TERRAIN_TYPES:
+    CHAR_TO_TERRAIN_ID.setdefault(TERRAIN_CHARS[_name], TERRAIN_IDS[_name])
+
+# 显示字符 -> 是否可通行，未知字符视为可通行（与World.is_position_valid一致）
+WALKABLE_CHARS = {char: bool(WALKABLE_TABLE[terrain_id]) for char, terrain_id in CHAR_TO_TERRAIN_ID.items()}
+
+# 按字符编码查表，用于批量把字符地图转换为地形ID
+_CODE_TO_TERRAIN_ID = np.zeros(max(ord(c) for c in CHAR_TO_TERRAIN_ID) + 1, dtype=np.uint8)
+for _char, _terrain_id in CHAR_TO_TERRAIN_ID.items():
+    _CODE_TO_TERRAIN_ID[ord(_char)] = _terrain_id
+
+def ids_to_grid(terrain):
+    """将地形ID数组转换为World使用的字符地图（二维列表）"""
+    return TERRAIN_CHAR_TABLE[terrain].tolist()
+
+def grid_to_ids(grid):
+    """将字符地图转换为地形ID数组（uint8）"""
+    codes = np.array(grid, dtype="<U1").view(np.uint32)
+    return _CODE_TO_TERRAIN_ID[codes]
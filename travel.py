@@ -0,0 +1,171 @@
+import heapq
+from pathfinding import find_path
+from world import World, canonical_area_name
+
+# 计算区域内传送门之间距离时，单次寻路最多展开的节点数
+TABLE_MAX_NODES = 20000
+
+
+class AreaGraph:
+    """
+    区域图，由各区域的传送门构成
+
+    玩家穿过传送门时保持坐标不变，因此经由传送门q进入区域B后，玩家位于B中的坐标q。
+    图的节点是这样的“入口状态” (区域, 坐标)，从入口到本区域各传送门的步数构成区域内的
+    传送门距离表；在此基础上预先计算所有区域之间的路线以及每个入口状态通往各区域的下一跳，
+    查询路线时只需查表。
+
+    距离表基于每个区域第一次进入时的布局计算，实际行走时每一段仍会按当前布局重新寻路。
+    """
+    def __init__(self):
+        self.portals = {}  # 区域 -> {(x, y): 目标区域}
+        self.npc_locations = {}  # NPC字符 -> (区域, x, y)
+        self.portal_distances = {}  # 区域 -> {入口坐标: {传送门坐标: 步数}}
+        self.next_hops = {}  # 目标区域 -> {(区域, 入口坐标): (总步数, 应走的传送门坐标)}
+        self.area_distances = {}  # (起点区域, 终点区域) -> 步数
+        self.area_next = {}  # (起点区域, 终点区域) -> 路线上的下一个区域
+
+    @classmethod
+    def from_world(cls, world):
+        """根据世界中所有可生成区域的传送门建立区域图"""
+        graph = cls()
+        probe = World(*world.area_size, seed=world.seed, initial_area=None,
+                      generator_backend=world.generator_backend)
+        probe.map_files = world.map_files
+        probe.layout_cache = world.layout_cache
+
+        area_names = list(world.get_area_generators())
+        layouts = {}
+        for area_name in area_names:
+            area = world.build_area(area_name, world.area_seed(area_name, 0))
+            layouts[area_name] = area
+            graph.portals[area_name] = {position: canonical_area_name(target)
+                                        for position, target in area.portals.items()}
+            for npc in area.npcs:
+                graph.npc_locations.setdefault(npc.char, (area_name, npc.x, npc.y))
+
+        # 每个区域的入口：其他区域中通往它的传送门的坐标
+        entries = {area_name: set() for area_name in area_names}
+        for portals in graph.portals.values():
+            for position, target in portals.items():
+                if target in entries:
+                    entries[target].add(position)
+
+        for area_name, area in layouts.items():
+            probe.load_area(area)
+            table = {}
+            for entry in entries[area_name]:
+                table[entry] = {}
+                for portal in area.portals:
+                    path = find_path(probe.is_walkable, entry, portal, max_nodes=TABLE_MAX_NODES)
+                    if path is not None:
+                        table[entry][portal] = len(path)
+            graph.portal_distances[area_name] = table
+
+        graph.compute_routes()
+        return graph
+
+    def compute_routes(self):
+        """预先计算每个入口状态通往各区域的下一跳，以及区域之间的全源最短路线"""
+        # 入口状态之间的边：(区域, 入口) --走到传送门q--> (q的目标区域, q)
+        reverse_edges = {}
+        for area_name, table in self.portal_distances.items():
+            for entry, distances in table.items():
+                for portal, steps in distances.items():
+                    target = self.portals[area_name][portal]
+                    reverse_edges.setdefault((target, portal), []).append(
+                        ((area_name, entry), steps, portal))
+
+        # 对每个目标区域在反向图上做多源Dijkstra
+        states = [(area_name, entry) for area_name, table in self.portal_distances.items()
+                  for entry in table]
+        for goal in self.portals:
+            best = {}
+            heap = []
+            for state in states:
+                if state[0] == goal:
+                    best[state] = (0, None)
+                    heap.append((0, state))
+            heapq.heapify(heap)
+            while heap:
+                cost, state = heapq.heappop(heap)
+                if cost > best[state][0]:
+                    continue
+                for previous, steps, portal in reverse_edges.get(state, []):
+                    new_cost = cost + steps
+                    if previous not in best or new_cost < best[previous][0]:
+                        best[previous] = (new_cost, portal)
+                        heapq.heappush(heap, (new_cost, previous))
+            self.next_hops[goal] = best
+
+        # 区域之间的全源最短路线（Floyd-Warshall），边权为从该区域任一入口走到传送门的最短步数
+        areas = list(self.portals)
+        infinity = float("inf")
+        for a in areas:
+            for b in areas:
+                self.area_distances[(a, b)] = 0 if a == b else infinity
+                self.area_next[(a, b)] = b if a == b else None
+        for area_name, portals in self.portals.items():
+            for portal, target in portals.items():
+                if target not in self.portals:
+                    continue
+                steps = [distances[portal] for distances in self.portal_distances[area_name].values()
+                         if portal in distances]
+                weight = min(steps) if steps else 0
+                if weight < self.area_distances[(area_name, target)]:
+                    self.area_distances[(area_name, target)] = weight
+                    self.area_next[(area_name, target)] = target
+        for k in areas:
+            for a in areas:
+                through = self.area_distances[(a, k)]
+                if through == infinity:
+                    continue
+                for b in areas:
+                    cost = through + self.area_distances[(k, b)]
+                    if cost < self.area_distances[(a, b)]:
+                        self.area_distances[(a, b)] = cost
+                        self.area_next[(a, b)] = self.area_next[(a, k)]
+
+    def get_area_route(self, start, goal):
+        """获取两个区域之间经过的区域列表，无法到达时返回None"""
+        if self.area_next.get((start, goal)) is None:
+            return None
+        route = [start]
+        while route[-1] != goal:
+            route.append(self.area_next[(route[-1], goal)])
+        return route
+
+    def choose_exit(self, portals, goal, leg_steps):
+        """在当前区域中选择通往目标区域应走的传送门
+
+        Args:
+            portals: 当前区域的传送门表
+            goal: 目标区域
+            leg_steps: 计算从玩家当前位置走到传送门所需步数的函数，无法到达时返回None
+
+        Returns:
+            tuple: 传送门坐标，没有可行路线时返回None
+        """
+        routes = self.next_hops.get(goal, {})
+        best, best_cost = None, None
+        for portal, target in portals.items():
+            target = canonical_area_name(target)
+            if target == goal:
+                remaining = 0
+            elif (target, portal) in routes:
+                remaining = routes[(target, portal)][0]
+            else:
+                # 不在距离表中的传送门（例如布局变化后），退回到区域级别的估计
+                remaining = self.area_distances.get((target, goal), float("inf"))
+            if remaining == float("inf"):
+                continue
+            steps = leg_steps(portal)
+            if steps is None:
+                continue
+            if best_cost is None or steps + remaining < best_cost:
+                best, best_cost = portal, steps + remaining
+        return best
+
+    def find_npc(self, npc_char):
+        """查找NPC所在的区域和坐标，返回 (区域, x, y)，未找到时返回None"""
+        return self.npc_locations.get(npc_char)
@@ -1,86 +1,210 @@
+import os
 import random
+from functools import partial
+import numpy as np
 import pygame
 from entity import NPC, Monster, Item
 from util import get_font
+from rng import derive_seed, make_rng
+from terrain import TERRAIN_CHARS, TERRAIN_COLORS, WALKABLE_TERRAIN, WALKABLE_CHARS, WALKABLE_TABLE, \
+    ids_to_grid, grid_to_ids
+from chunk import ChunkMap, WildernessSource
+from mapfile import MapFile, MapFileSource
+from flowfield import DistanceField
+from spatial import SpatialIndex
+from crowd import MonsterArrays, wander_step, WANDER_MOVE_CHANCE, MONSTER_SPEED
+from scheduler import EnergyScheduler, ACTION_ENERGY
+from freecells import FreeCellIndex, terrain_ids_for
+from connectivity import connect_points, find_disconnected, reachable_mask
+from spawner import SpawnerSystem, MONSTER_ARCHETYPES, make_monster
+import worldgen
+
+# 各区域生成后端的版本，修改生成算法后需要更新，使旧的布局缓存失效
+GENERATOR_VERSIONS = {
+    "legacy": "legacy-4",  # 逐格生成的initialize_*方法
+    "numpy": "numpy-4"     # worldgen模块中的向量化生成
+}
+# 默认的区域生成后端
+DEFAULT_GENERATOR_BACKEND = "numpy"
+# 预生成区域布局的缓存文件
+LAYOUT_CACHE_FILE = os.path.join("assets", "layouts.pkl")
+# 预先制作或生成的区域地图文件目录，文件名为 <区域名称>.nvmap
+MAP_DIR = os.path.join("assets", "maps")
+
+# 视口大小（格）和每格的像素大小
+VIEW_WIDTH = 30
+VIEW_HEIGHT = 20
+TILE_SIZE = 20
+
+# 怪物AI：察觉玩家后每次更新的行动概率、生命低于该比例时逃跑、保持距离型怪物的理想距离
+CHASE_MOVE_CHANCE = 0.6
+FLEE_HP_RATIO = 0.3
+KEEP_DISTANCE_RANGE = 4
+
+# 怪物AI的细节层次：玩家附近的怪物每次都更新，中距离的怪物每隔几次更新一次，更远的怪物休眠
+AI_FULL_RADIUS = 12
+AI_REDUCED_RADIUS = 24
+AI_REDUCED_INTERVAL = 4
+
+# 随机放置怪物时与地图边缘保持的距离（格）
+SPAWN_MARGIN = 5
+
+# 速度为MONSTER_SPEED的怪物行动一次所需的时间单位数
+TICKS_PER_TURN = ACTION_ENERGY // MONSTER_SPEED
+
+# 生成的区域中关键点（传送门、入口、NPC和怪物）不连通时打通最少的格子；
+# 需要打通的格子超过MAX_CARVED_CELLS时说明布局被严重分割，换一个种子重新生成，最多MAX_REROLLS次
+MAX_CARVED_CELLS = 12
+MAX_REROLLS = 3
+# 打通格子时替换成的地形字符：水面架桥，其余变为地面
+CARVE_CHARS = {TERRAIN_CHARS["water"]: TERRAIN_CHARS["bridge"]}
+
+# 荒野大地图的尺寸（格），按区块流式加载
+WILDERNESS_SIZE = (2048, 2048)
+
+# 群战擂台的尺寸（格）、玩家进入的位置，以及回逍遥阁的传送门（落在逍遥阁的初始位置）
+ARENA_SIZE = (160, 100)
+ARENA_START = (80, 50)
+ARENA_EXIT = (20, 12)
+
+# 区域别名，传送门中使用的旧名称指向实际的区域
+AREA_ALIASES = {
+    "xiaoyao_pavilion": "xiaoyao"
+}
+
+def canonical_area_name(area_name):
+    """将区域别名转换为实际的区域名称"""
+    return AREA_ALIASES.get(area_name, area_name)
+
+def find_map_files(directory=MAP_DIR):
+    """查找目录中的区域地图文件，返回 {区域名称: 文件路径}"""
+    if not os.path.isdir(directory):
+        return {}
+    return {os.path.splitext(name)[0]: os.path.join(directory, name)
+            for name in os.listdir(directory) if name.endswith(".nvmap")}
+
+
+class Area:
+    """
+    区域数据，包含一张生成好的地图及其上的NPC、怪物和传送门
+    """
+    def __init__(self, name, width, height, grid, npcs, monsters, items, portals, seed=None,
+                 chunks=None):
+        self.name = name
+        self.width = width
+        self.height = height
+        self.grid = grid  # 小区域的完整地图；分块区域为None
+        self.chunks = chunks  # 分块区域的ChunkMap
+        self.npcs = npcs
+        self.monsters = monsters
+        self.items = items
+        self.portals = portals  # 传送门 {(x, y): 目标区域}
+        self.seed = seed  # 生成该区域所用的种子
+        self.rerolls = 0  # 生成时因关键点不连通而重新生成的次数
+        self.carved = 0  # 生成时为连通关键点而打通的格子数量
+    
+    def get_key_points(self, entries=()):
+        """必须互相连通的关键点：传送门、玩家的入口、NPC和怪物的位置，第一个点所在的区域为主区域"""
+        points = list(self.portals) + list(entries)
+        points.extend((npc.x, npc.y) for npc in self.npcs)
+        points.extend((monster["x"], monster["y"]) for monster in self.monsters)
+        return [(x, y) for x, y in points if 0 <= x < self.width and 0 <= y < self.height]
+    
+    def is_connected(self, entries=()):
+        """所有关键点是否互相连通，分块区域不检查"""
+        if self.grid is None:
+            return True
+        walkable = WALKABLE_TABLE[grid_to_ids(self.grid)]
+        return not find_disconnected(walkable, self.get_key_points(entries))
+    
+    def connect_key_points(self, entries=(), max_cells=None):
+        """检查关键点的连通性，不连通时在地图上打通最少的格子
+        
+        Args:
+            entries: 玩家从其他区域进入时的落脚点
+            max_cells: 最多打通的格子数量，为None时不限制
+        
+        Returns:
+            list: 被打通的格子坐标；需要打通的格子超过max_cells或无法连通时返回None，地图不做修改
+        """
+        if self.grid is None:
+            return []
+        walkable = WALKABLE_TABLE[grid_to_ids(self.grid)]
+        carved = connect_points(walkable, self.get_key_points(entries))
+        if carved is None or (max_cells is not None and len(carved) > max_cells):
+            return None
+        for x, y in carved:
+            char = self.grid[y][x]
+            self.grid[y][x] = CARVE_CHARS.get(char, TERRAIN_CHARS["floor"])
+        return carved
+
 
 class World:
-    def __init__(self, width, height):
+    def __init__(self, width, height, seed=None, initial_area="xiaoyao",
+                 generator_backend=DEFAULT_GENERATOR_BACKEND):
         self.width = width
         self.height = height
+        # 普通区域的地图尺寸，分块区域可以更大
+        self.area_size = (width, height)
+        self.chunks = None  # 当前区域为分块区域时的ChunkMap
         self.npcs = []
         self.monsters = []
         self.items = []
         self.portals = {}  # 传送门
         
-        # 当前区域
-        self.current_area = "xiaoyao"
-        
-        # 武侠世界特色地形元素
-        self.terrain_chars = {
-            "floor": ".",       # 地面
-            "wall": "#",        # 墙壁
-            "tree": "T",        # 树
-            "water": "~",       # 水
-            "mountain": "^",    # 山
-            "portal": "O",      # 传送门
-            "flower": "*",      # 花/花园
-            "bamboo": ":",      # 竹林
-            "waterfall": "W",   # 瀑布
-            "pavilion": "P",    # 亭台
-            "teahouse": "C",    # 茶室
-            "stream": "~",      # 小溪
-            "bridge": "=",      # 石桥
-            "statue": "S",      # 雕像
-            "stairs": ">",      # 石阶
-            "rock": "r",        # 怪石
-            "grass": ",",       # 草地
-            "path": ".",        # 小路
-            "door": "+",        # 门
-            "stairs_up": "<",   # 上楼梯
-            "stairs_down": ">"  # 下楼梯
-        }
+        # 世界种子，同一种子下各区域的生成结果一致
+        self.seed = seed if seed is not None else random.randrange(2 ** 32)
+        # 区域生成专用的随机数生成器，不使用全局random以保证可复现
+        self.rng = random.Random(self.seed)
+        # 各区域的进入次数，每次进入都会生成新的布局
+        self.area_visits = {}
+        # 各区域的入口：已载入区域中通往它的传送门坐标，玩家穿过传送门后落在相同的坐标上
+        self.area_entries = {}  # 区域 -> frozenset((x, y))
+        # 已载入区域的生成统计：区域数量、重新生成次数和打通的格子数量
+        self.generation_stats = {"areas": 0, "rerolls": 0, "carved": 0}
+        # 相邻区域预生成器
+        self.prefetcher = None
+        # 区域布局缓存
+        self.layout_cache = None
+        # 区域生成后端："numpy"使用向量化生成，"legacy"使用逐格生成
+        self.generator_backend = generator_backend
+        # 区域地图文件，存在地图文件的区域直接从文件载入而不是生成（区域生成器实例由build_area设置）
+        self.map_files = find_map_files() if initial_area else {}
+        
+        # 当前区域的种子，以及由它派生的怪物AI和战利品随机数流
+        self.area_seed_value = None
+        self.ai_rng = random.Random(self.seed)
+        self.loot_rolls = 0
+        # 所有怪物共享的到玩家的距离场
+        self.distance_field = DistanceField()
+        # 怪物空间索引，以及AI更新计数（本次更新中全速、降频和休眠的怪物数量）
+        self.spatial_index = SpatialIndex()
+        # 怪物坐标数组、批量游荡使用的随机数流，以及缓存的可通行数组 (左上角坐标, bool数组)
+        self.monster_arrays = MonsterArrays()
+        self.ai_np_rng = np.random.default_rng(self.seed)
+        self.walkable_mask = None
+        # 空闲格子索引，用于放置怪物：放置范围 -> FreeCellIndex
+        self.free_cells = {}
+        # 当前区域中已确认互相连通的关键点（载入区域时设置），之后刷新的怪物只放在与它们连通的格子上
+        self.key_points = []
+        # 世界时间（时间单位），以及由计时器堆驱动的刷怪系统
+        self.world_time = 0
+        self.spawners = SpawnerSystem()
+        # 按速度分组的怪物行动调度器
+        self.turn_scheduler = EnergyScheduler()
+        self.ai_tick = 0
+        self.ai_stats = {"active": 0, "reduced": 0, "dormant": 0, "updated": 0}
         
-        # 武侠世界特色地形颜色
-        self.terrain_colors = {
-            "floor": (60, 60, 60),       # 地面
-            "wall": (120, 120, 120),     # 墙壁
-            "tree": (0, 150, 0),         # 树
-            "water": (0, 100, 255),      # 水
-            "mountain": (150, 75, 0),    # 山
-            "portal": (255, 255, 0),     # 传送门
-            "flower": (255, 100, 255),   # 花/花园
-            "bamboo": (100, 200, 0),     # 竹林
-            "waterfall": (120, 200, 255),# 瀑布
-            "pavilion": (180, 130, 70),  # 亭台
-            "teahouse": (160, 120, 60),  # 茶室
-            "stream": (100, 150, 255),   # 小溪
-            "bridge": (150, 150, 150),   # 石桥
-            "statue": (200, 200, 200),   # 雕像
-            "stairs": (170, 170, 170),   # 石阶
-            "rock": (140, 140, 140),     # 怪石
-            "grass": (100, 180, 100),    # 草地
-            "path": (190, 170, 130),     # 小路
-            "door": (150, 75, 0),        # 门
-            "stairs_up": (200, 200, 0),  # 上楼梯
-            "stairs_down": (200, 200, 0) # 下楼梯
-        }
+        # 当前区域
+        self.current_area = initial_area
         
-        # 定义哪些地形是可通行的
-        self.walkable_terrain = {
-            "floor": True,
-            "path": True,
-            "grass": True,
-            "flower": True,
-            "bridge": True,
-            "portal": True,
-            "stairs": True,
-            "door": True,
-            "stairs_up": True,
-            "stairs_down": True
-        }
+        # 地形元素、颜色与可通行性（定义见terrain模块）
+        self.terrain_chars = TERRAIN_CHARS
+        self.terrain_colors = TERRAIN_COLORS
+        self.walkable_terrain = WALKABLE_TERRAIN
         
         # 现在初始化grid（在terrain_chars定义之后）
-        self.grid = [[self.terrain_chars["floor"] for _ in range(width)] for _ in range(height)]
+        self.grid = [[self.terrain_chars["floor"]] * width for _ in range(height)]
         
         # 区域信息
         self.area_info = {
@@ -88,14 +212,14 @@ class World:
             "forest": {"name": "幽暗森林", "type": "dangerous"},
             "mountain": {"name": "太华山", "type": "dangerous"},
             "village": {"name": "平安村", "type": "peaceful"},
-            "cave": {"name": "秘境洞窟", "type": "dungeon"}
+            "cave": {"name": "秘境洞窟", "type": "dungeon"},
+            "wilderness": {"name": "荒野", "type": "dangerous"},
+            "arena": {"name": "群战擂台", "type": "dangerous"}
         }
         
-        # 初始化各区域
-        self.initialize_xiaoyao()
-        
-        # 设置当前区域为逍遥阁
-        self.current_area = "xiaoyao"
+        # 初始化起始区域（区域生成器实例不需要）
+        if initial_area:
+            self.change_area(initial_area)
         
     def is_position_valid(self, x, y):
         """检查坐标是否有效，返回(是否有效, 原因)元组"""
@@ -104,7 +228,7 @@ class World:
             return False, "你不能离开当前区域"
         
         # 获取当前位置的地形
-        terrain = self.grid[y][x]
+        terrain = self.get_terrain(x, y)
         
         # 检查地形是否可通行
         terrain_type = None
@@ -147,12 +271,37 @@ class World:
             if npc.x == x and npc.y == y:
                 return False, f"那里站着{npc.char}"
         
-        for monster in self.monsters:
-            if monster["x"] == x and monster["y"] == y:
-                return False, f"那里有{monster['name']}"
+        monster = self.spatial_index.get_at(x, y)
+        if monster:
+            return False, f"那里有{monster['name']}"
         
         return True, "可以通行"
     
+    def is_walkable(self, x, y):
+        """只根据地形判断坐标是否可通行，不考虑NPC和怪物，用于寻路"""
+        if x < 0 or x >= self.width or y < 0 or y >= self.height:
+            return False
+        return WALKABLE_CHARS.get(self.get_terrain(x, y), True)
+    
+    def get_terrain(self, x, y):
+        """获取指定位置的地形字符，分块区域中未载入的区块视为墙壁，不会在查询时载入"""
+        if self.chunks is not None:
+            return self.chunks.get_char(x, y)
+        return self.grid[y][x]
+    
+    def get_view_origin(self, player_x, player_y):
+        """计算以玩家为中心的视口左上角坐标（世界坐标系）"""
+        view_x = max(0, min(player_x - VIEW_WIDTH // 2, self.width - VIEW_WIDTH))
+        view_y = max(0, min(player_y - VIEW_HEIGHT // 2, self.height - VIEW_HEIGHT))
+        return view_x, view_y
+    
+    def stream_chunks(self, player_x, player_y):
+        """分块区域中，载入玩家附近的区块并卸载远处的区块"""
+        if self.chunks is not None and self.chunks.stream(player_x, player_y):
+            # 区块载入或卸载会增减怪物并改变已载入的地形
+            self.rebuild_monster_index()
+            self.walkable_mask = None
+    
     def get_npc_at(self, x, y):
         for npc in self.npcs:
             if npc.x == x and npc.y == y:
@@ -160,23 +309,24 @@ class World:
         return None
     
     def get_monster_at(self, x, y):
-        for monster in self.monsters:
-            if monster["x"] == x and monster["y"] == y:
-                # 将怪物字典转换为Monster对象
-                monster_obj = Monster(
-                    monster["x"], 
-                    monster["y"], 
-                    monster["char"],
-                    monster["name"]
-                )
-                # 复制属性
-                monster_obj.health = monster["hp"]
-                monster_obj.max_health = monster["max_hp"]
-                monster_obj.attack = monster["attack"]
-                monster_obj.defense = monster["defense"]
-                # 添加怪物索引，用于后续更新
-                monster_obj.index = self.monsters.index(monster)
-                return monster_obj
+        monster = self.spatial_index.get_at(x, y)
+        if monster:
+            # 将怪物字典转换为Monster对象
+            monster_obj = Monster(
+                monster["x"], 
+                monster["y"], 
+                monster["char"],
+                monster["name"]
+            )
+            # 复制属性
+            monster_obj.health = monster["hp"]
+            monster_obj.max_health = monster["max_hp"]
+            monster_obj.attack = monster["attack"]
+            monster_obj.defense = monster["defense"]
+            monster_obj.speed = monster.get("speed", MONSTER_SPEED)
+            # 记录对应的怪物字典，战斗后直接更新，不需要在怪物列表中查找
+            monster_obj.record = monster
+            return monster_obj
         return None
     
     def check_portal(self, x, y):
@@ -185,26 +335,331 @@ class World:
             return self.portals[(x, y)]
         return None
     
-    def update(self):
-        # Move monsters randomly - reduce movement probability from 30% to 10%
-        for monster in self.monsters:
-            if random.random() < 0.1:  # 降低移动概率，从0.3改为0.1
-                dx = random.choice([-1, 0, 1])
-                dy = random.choice([-1, 0, 1])
-                new_x, new_y = monster["x"] + dx, monster["y"] + dy
-                if self.is_position_valid(new_x, new_y):
-                    monster["x"], monster["y"] = new_x, new_y
+    def update(self, player_x=None, player_y=None, ticks=TICKS_PER_TURN):
+        """推进世界时间并更新怪物AI
+        
+        怪物按速度分组，由能量调度器排程：速度快的组行动得更频繁，同一时刻就绪的组按速度从快到慢行动，
+        同一组的怪物一起批量行动。
+        
+        Args:
+            player_x, player_y: 玩家坐标；提供时怪物会根据距离场追击、逃跑或保持距离
+            ticks: 推进的时间单位数，默认为速度MONSTER_SPEED的怪物行动一次所需的时间
+        
+        Returns:
+            bool: 是否有怪物行动
+        """
+        self.world_time += ticks
+        self.spawners.update(self, None if player_x is None or player_y is None else (player_x, player_y))
+        
+        groups = self.turn_scheduler.advance(self.turn_scheduler.time + ticks)
+        if not groups:
+            # 没有怪物行动，统计中的各级数量保持最新，本次更新的数量为0
+            self.ai_stats = self.count_ai_tiers(player_x, player_y)
+            return False
+        
+        if player_x is None or player_y is None:
+            # 不知道玩家位置时所有怪物都按游荡处理
+            updated = 0
+            for speed in groups:
+                self.ai_tick += 1
+                slots = self.monster_arrays.get_speed_slots(speed)
+                self.wander_monsters(slots)
+                updated += len(slots)
+            self.ai_stats = {"active": len(self.monster_arrays), "reduced": 0, "dormant": 0,
+                             "updated": updated}
+            self.drop_empty_speed_groups(groups)
+            return True
+        
+        player = (player_x, player_y)
+        self.distance_field.update(self, player)
+        
+        # 通过空间索引只取出玩家附近的怪物，远处的怪物处于休眠状态，不会被遍历
+        nearby = self.spatial_index.query(player_x, player_y, AI_REDUCED_RADIUS)
+        active = reduced = updated = 0
+        tiers = {}  # 速度 -> [(怪物, 是否全速更新)]
+        for monster in nearby:
+            distance = max(abs(monster["x"] - player_x), abs(monster["y"] - player_y))
+            full = distance <= AI_FULL_RADIUS
+            if full:
+                active += 1
+            else:
+                reduced += 1
+            tiers.setdefault(monster.get("speed", MONSTER_SPEED), []).append((monster, full))
+        
+        for speed in groups:
+            self.ai_tick += 1
+            wanderers = []
+            for i, (monster, full) in enumerate(tiers.get(speed, ())):
+                # 中距离的怪物轮流更新，每次只有约1/AI_REDUCED_INTERVAL的怪物行动
+                if not full and (self.ai_tick + i) % AI_REDUCED_INTERVAL:
+                    continue
+                updated += 1
+                if self.is_reacting(monster, player):
+                    self.update_monster_ai(monster, player)
+                else:
+                    wanderers.append(monster)
+            # 游荡的怪物在察觉玩家的怪物行动之后统一批量移动
+            self.wander_monsters(self.monster_arrays.get_slots(wanderers), player)
+        
+        self.ai_stats = {"active": active, "reduced": reduced,
+                         "dormant": len(self.monsters) - len(nearby), "updated": updated}
+        self.drop_empty_speed_groups(groups)
+        return True
+    
+    def count_ai_tiers(self, player_x=None, player_y=None):
+        """统计全速、降频和休眠的怪物数量，用于没有怪物行动的更新"""
+        if player_x is None or player_y is None:
+            return {"active": len(self.monster_arrays), "reduced": 0, "dormant": 0, "updated": 0}
+        nearby = self.spatial_index.query(player_x, player_y, AI_REDUCED_RADIUS)
+        active = sum(1 for monster in nearby
+                     if max(abs(monster["x"] - player_x), abs(monster["y"] - player_y)) <= AI_FULL_RADIUS)
+        return {"active": active, "reduced": len(nearby) - active,
+                "dormant": len(self.monsters) - len(nearby), "updated": 0}
+    
+    def schedule_speed_group(self, speed):
+        """确保某一速度的怪物组已在调度器中"""
+        if speed not in self.turn_scheduler:
+            self.turn_scheduler.add(speed, speed)
+    
+    def drop_empty_speed_groups(self, groups):
+        """从调度器中移除已经没有怪物的速度组"""
+        for speed in groups:
+            if speed not in self.monster_arrays.speed_counts:
+                self.turn_scheduler.remove(speed)
+    
+    def wander_monsters(self, slots, player=None):
+        """批量移动一组游荡的怪物
+        
+        Args:
+            slots: 怪物在monster_arrays中的槽位数组
+            player: 玩家坐标，怪物不会走到玩家所在的格子
+        """
+        if len(slots) == 0:
+            return
+        origin, blocked = self.get_blocked_mask(player)
+        xs, ys = self.monster_arrays.positions()
+        movers, new_xs, new_ys = wander_step(xs, ys, slots, blocked, origin, self.ai_np_rng)
+        entries = self.monster_arrays.entries
+        moves = list(zip(movers.tolist(), new_xs.tolist(), new_ys.tolist()))
+        for free_cells in self.free_cells.values():
+            # 先释放所有原来的格子再占用新格子，与move_monster一样逐格维护，放置怪物时不必重建索引
+            for slot, _, _ in moves:
+                free_cells.release(int(xs[slot]), int(ys[slot]))
+            for _, x, y in moves:
+                free_cells.occupy(x, y)
+        for slot, x, y in moves:
+            self.spatial_index.move(entries[slot], x, y)
+        xs[movers] = new_xs
+        ys[movers] = new_ys
+    
+    def get_free_cells(self, region=None):
+        """获取当前区域中某一放置范围的空闲格子索引，索引失效时按当前的地形和占用重建
+        
+        Args:
+            region: 放置范围 (x0, y0, x1, y1)，包含边界；为None时为与地图边缘保持SPAWN_MARGIN的范围
+        
+        Returns:
+            FreeCellIndex: 空闲格子索引，分块区域没有索引，返回None（由spawn_cells在已载入的区块中选取）
+        """
+        if self.grid is None:
+            return None
+        if region is None:
+            region = (SPAWN_MARGIN, SPAWN_MARGIN, self.width - SPAWN_MARGIN, self.height - SPAWN_MARGIN)
+        free_cells = self.free_cells.get(region)
+        if free_cells is None:
+            terrain = grid_to_ids(self.grid)
+            # 与关键点不连通的格子不放置怪物
+            blocked = ~reachable_mask(WALKABLE_TABLE[terrain], self.key_points)
+            xs, ys = self.monster_arrays.positions()
+            blocked[ys, xs] = True
+            for npc in self.npcs:
+                blocked[npc.y, npc.x] = True
+            free_cells = self.free_cells[region] = FreeCellIndex(terrain, blocked, region)
+        return free_cells
+    
+    def spawn_cells(self, count, terrains, region=None, avoid=None):
+        """从空闲格子中随机选取count个用于放置怪物，选中的格子随即标记为占用
+        
+        Args:
+            count: 需要的格子数量，空闲格子足够时一定能选满
+            terrains: 允许的地形名称列表
+            region: 放置范围，见get_free_cells
+            avoid: 不放置怪物的格子 (x, y)，通常是玩家的位置
+        
+        Returns:
+            list: 格子坐标列表
+        """
+        terrain_ids = terrain_ids_for(terrains)
+        free_cells = self.get_free_cells(region)
+        if free_cells is None:
+            return self.sample_loaded_cells(count, terrain_ids, region, avoid)
+        # 玩家所在的格子不在占用记录中，选取期间临时标记为占用
+        hold = avoid is not None and free_cells.is_free(*avoid)
+        if hold:
+            free_cells.occupy(*avoid)
+        cells = []
+        for _ in range(count):
+            cell = free_cells.take(self.rng, terrain_ids)
+            if cell is None:
+                break
+            cells.append(cell)
+        if hold:
+            free_cells.release(*avoid)
+        return cells
+    
+    def sample_loaded_cells(self, count, terrain_ids, region=None, avoid=None):
+        """分块区域没有空闲格子索引，直接在已载入的区块中选取空闲格子
+        
+        每次都要扫描已载入的地形，只适合刷怪点这样低频的放置。
+        
+        Returns:
+            list: 格子坐标列表
+        """
+        if self.chunks is None:
+            return []
+        origin, blocked = self.get_blocked_mask(avoid)
+        allowed = ~blocked & np.isin(self.chunks.get_loaded_view()[1], terrain_ids)
+        if region is not None:
+            x0, y0, x1, y1 = region
+            height, width = allowed.shape
+            xs = np.arange(origin[0], origin[0] + width)[None, :]
+            ys = np.arange(origin[1], origin[1] + height)[:, None]
+            allowed &= (xs >= x0) & (xs <= x1) & (ys >= y0) & (ys <= y1)
+        cells = np.flatnonzero(allowed)
+        width = allowed.shape[1]
+        picks = self.rng.sample(range(len(cells)), min(count, len(cells)))
+        return [(origin[0] + int(cells[i]) % width, origin[1] + int(cells[i]) // width) for i in picks]
+    
+    def get_walkable_mask(self):
+        """获取当前区域的可通行数组，返回 (左上角世界坐标, bool数组)
+        
+        普通区域覆盖整张地图；分块区域只覆盖已载入的区块，未载入的部分视为不可通行。
+        地形不变时直接使用缓存。
+        """
+        if self.walkable_mask is None:
+            if self.chunks is not None:
+                origin, terrain = self.chunks.get_loaded_view()
+            else:
+                origin, terrain = (0, 0), grid_to_ids(self.grid)
+            self.walkable_mask = (origin, WALKABLE_TABLE[terrain])
+        return self.walkable_mask
+    
+    def get_blocked_mask(self, player=None):
+        """获取怪物不可进入的格子：不可通行的地形，以及怪物、NPC和玩家所在的格子
+        
+        Returns:
+            tuple: (左上角世界坐标, bool数组)
+        """
+        origin, walkable = self.get_walkable_mask()
+        blocked = ~walkable
+        height, width = blocked.shape
+        xs, ys = self.monster_arrays.positions()
+        local_x, local_y = xs - origin[0], ys - origin[1]
+        inside = (local_x >= 0) & (local_x < width) & (local_y >= 0) & (local_y < height)
+        blocked[local_y[inside], local_x[inside]] = True
+        others = [(npc.x, npc.y) for npc in self.npcs]
+        if player:
+            others.append(player)
+        for x, y in others:
+            if 0 <= x - origin[0] < width and 0 <= y - origin[1] < height:
+                blocked[y - origin[1], x - origin[0]] = True
+        return origin, blocked
+    
+    def rebuild_monster_index(self):
+        """根据怪物列表重建空间索引和坐标数组，空闲格子索引在下次使用时重建"""
+        self.spatial_index.rebuild(self.monsters)
+        self.monster_arrays.rebuild(self.monsters)
+        self.free_cells = {}
+        for speed in self.monster_arrays.speed_counts:
+            self.schedule_speed_group(speed)
+    
+    def add_monster(self, monster):
+        """向当前区域加入一只怪物"""
+        self.monsters.append(monster)
+        self.spatial_index.add(monster)
+        self.monster_arrays.add(monster)
+        self.schedule_speed_group(monster.get("speed", MONSTER_SPEED))
+        for free_cells in self.free_cells.values():
+            free_cells.occupy(monster["x"], monster["y"])
+    
+    def move_monster(self, monster, x, y):
+        """移动一只怪物"""
+        for free_cells in self.free_cells.values():
+            free_cells.release(monster["x"], monster["y"])
+            free_cells.occupy(x, y)
+        self.spatial_index.move(monster, x, y)
+        self.monster_arrays.move(monster, x, y)
+    
+    def remove_monster(self, monster):
+        """从当前区域移除一只被击败的怪物，怪物记录交给刷怪系统回收"""
+        for free_cells in self.free_cells.values():
+            free_cells.release(monster["x"], monster["y"])
+        self.spatial_index.remove(monster)
+        self.monster_arrays.remove(monster)
+        self.spawners.on_monster_removed(monster, self.world_time)
+        for i, other in enumerate(self.monsters):
+            if other is monster:
+                self.monsters.pop(i)
+                break
+    
+    def can_monster_enter(self, x, y, player=None):
+        """检查怪物能否移动到指定位置"""
+        if (x, y) == player:
+            return False
+        # 分块区域中，怪物不会走进尚未载入的区块
+        if self.chunks is not None and not self.chunks.is_loaded(x, y):
+            return False
+        return self.is_position_valid(x, y)[0]
+    
+    def is_reacting(self, monster, player=None):
+        """怪物是否察觉了玩家，察觉玩家的怪物根据距离场行动，其余的怪物随机游荡"""
+        return bool(player) and monster.get("behavior", "wander") != "wander" and \
+            self.distance_field.get(monster["x"], monster["y"]) is not None
+    
+    def update_monster_ai(self, monster, player=None):
+        """根据怪物的行为类型移动一只怪物
+        
+        行为类型（怪物字典中的behavior）：
+            chase: 察觉玩家后追击
+            keep_distance: 察觉玩家后与玩家保持一定距离
+            wander或未设置: 随机游荡
+        察觉玩家的怪物生命过低时会逃跑。
+        """
+        behavior = monster.get("behavior", "wander")
+        x, y = monster["x"], monster["y"]
+        
+        if self.is_reacting(monster, player):
+            if self.ai_rng.random() >= CHASE_MOVE_CHANCE:
+                return
+            can_enter = lambda nx, ny: self.can_monster_enter(nx, ny, player)
+            if monster["hp"] < monster["max_hp"] * FLEE_HP_RATIO:
+                step = self.distance_field.step_away(x, y, can_enter)
+            elif behavior == "keep_distance":
+                step = self.distance_field.step_to_range(x, y, KEEP_DISTANCE_RANGE, can_enter)
+            else:
+                step = self.distance_field.step_toward(x, y, can_enter)
+            if step:
+                self.move_monster(monster, *step)
+            return
+        
+        # 随机游荡（World.update中游荡的怪物由wander_monsters批量移动）
+        if self.ai_rng.random() < WANDER_MOVE_CHANCE:
+            dx = self.ai_rng.choice([-1, 0, 1])
+            dy = self.ai_rng.choice([-1, 0, 1])
+            new_x, new_y = x + dx, y + dy
+            if self.can_monster_enter(new_x, new_y, player):
+                self.move_monster(monster, new_x, new_y)
     
     def render(self, screen, font, start_x, start_y, player_x, player_y):
         """渲染游戏世界"""
-        grid_size = 20  # 每个网格单元格的像素大小
+        grid_size = TILE_SIZE  # 每个网格单元格的像素大小
         
         # 加载ASCII字体用于特殊字符
         ascii_font = get_font(is_ascii=True, size=24)
         
         # 确定可见区域的尺寸
-        visible_width = min(30, self.width - start_x)
-        visible_height = min(20, self.height - start_y)
+        visible_width = min(VIEW_WIDTH, self.width - start_x)
+        visible_height = min(VIEW_HEIGHT, self.height - start_y)
         
         # 渲染地图元素
         for y in range(visible_height):
@@ -218,7 +673,7 @@ class World:
                     screen_y = y * grid_size + grid_size // 2
                     
                     # 获取当前位置的地形
-                    terrain = self.grid[world_y][world_x]
+                    terrain = self.get_terrain(world_x, world_y)
                     
                     # 绘制地形
                     char_color = self.terrain_colors.get("floor", (100, 100, 100))  # 默认颜色
@@ -252,8 +707,9 @@ class World:
                 text = render_font.render(npc.char, True, (0, 255, 255))  # NPC使用青色
                 screen.blit(text, (screen_x - text.get_width() // 2, screen_y - text.get_height() // 2))
         
-        # 绘制怪物
-        for monster in self.monsters:
+        # 绘制怪物，只从空间索引中取出视口附近的怪物
+        view_radius = max(visible_width, visible_height)
+        for monster in self.spatial_index.query(start_x, start_y, view_radius):
             if start_x <= monster["x"] < start_x + visible_width and start_y <= monster["y"] < start_y + visible_height:
                 screen_x = (monster["x"] - start_x) * grid_size + grid_size // 2
                 screen_y = (monster["y"] - start_y) * grid_size + grid_size // 2
@@ -296,6 +752,7 @@ class World:
         # 清空NPC和怪物
         self.npcs = []
         self.monsters = []
+        self.rebuild_monster_index()
         
         # 绘制逍遥阁的外墙
         for x in range(self.width):
@@ -373,7 +830,7 @@ class World:
         
         for x in range(16, 24):
             for y in range(9, 13):
-                if random.random() < 0.6:
+                if self.rng.random() < 0.6:
                     self.grid[y][x] = self.terrain_chars["flower"]
         
         # 添加一个中央亭台
@@ -382,7 +839,7 @@ class World:
         # 添加竹林 - 右上角
         for x in range(30, 38):
             for y in range(2, 6):
-                if random.random() < 0.7:
+                if self.rng.random() < 0.7:
                     self.grid[y][x] = self.terrain_chars["bamboo"]
         
         # 添加小溪和石桥 - 下方区域
@@ -404,14 +861,14 @@ class World:
         
         # 添加山石
         for _ in range(8):
-            x = random.randint(1, 9)
-            y = random.randint(1, 6)
+            x = self.rng.randint(1, 9)
+            y = self.rng.randint(1, 6)
             self.grid[y][x] = self.terrain_chars["rock"]
         
         # 添加草地
         for x in range(1, self.width-1):
             for y in range(1, self.height-1):
-                if self.grid[y][x] == self.terrain_chars["floor"] and random.random() < 0.1:
+                if self.grid[y][x] == self.terrain_chars["floor"] and self.rng.random() < 0.1:
                     self.grid[y][x] = self.terrain_chars["grass"]
         
         # 添加雕像 - 大厅中央
@@ -430,6 +887,7 @@ class World:
         # 清空NPC和怪物
         self.npcs = []
         self.monsters = []
+        self.rebuild_monster_index()
         
         # 外围围墙
         for x in range(self.width):
@@ -441,30 +899,30 @@ class World:
         
         # 添加一些树木
         for _ in range(60):
-            x = random.randint(1, self.width-2)
-            y = random.randint(1, self.height-2)
+            x = self.rng.randint(1, self.width-2)
+            y = self.rng.randint(1, self.height-2)
             self.grid[y][x] = self.terrain_chars["tree"]
         
         # 添加一些水域
         for _ in range(20):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
-            size = random.randint(1, 3)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
+            size = self.rng.randint(1, 3)
             for dx in range(-size, size+1):
                 for dy in range(-size, size+1):
                     if 0 < x+dx < self.width-1 and 0 < y+dy < self.height-1:
-                        if random.random() < 0.7:
+                        if self.rng.random() < 0.7:
                             self.grid[y+dy][x+dx] = self.terrain_chars["water"]
         
         # 添加一些山脉
         for _ in range(10):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
-            size = random.randint(1, 2)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
+            size = self.rng.randint(1, 2)
             for dx in range(-size, size+1):
                 for dy in range(-size, size+1):
                     if 0 < x+dx < self.width-1 and 0 < y+dy < self.height-1:
-                        if random.random() < 0.8:
+                        if self.rng.random() < 0.8:
                             self.grid[y+dy][x+dx] = self.terrain_chars["mountain"]
         
         # 添加小溪
@@ -497,7 +955,7 @@ class World:
         # 添加草地
         for x in range(1, self.width-1):
             for y in range(1, self.height-1):
-                if self.grid[y][x] == self.terrain_chars["floor"] and random.random() < 0.2:
+                if self.grid[y][x] == self.terrain_chars["floor"] and self.rng.random() < 0.2:
                     self.grid[y][x] = self.terrain_chars["grass"]
         
         # 添加小路
@@ -525,6 +983,7 @@ class World:
         # 清空NPC和怪物
         self.npcs = []
         self.monsters = []
+        self.rebuild_monster_index()
         
         # 创建基本地形 - 减少山脉和石头的比例
         for y in range(self.height):
@@ -532,7 +991,7 @@ class World:
                 if y == 0 or y == self.height-1 or x == 0 or x == self.width-1:
                     self.grid[y][x] = self.terrain_chars["wall"]  # 边界
                 else:
-                    rand = random.random()
+                    rand = self.rng.random()
                     if rand < 0.2:  # 减少山的比例从35%到20%
                         self.grid[y][x] = self.terrain_chars["mountain"]  # 山
                     elif rand < 0.25:  # 减少石头的比例从15%到5%
@@ -563,7 +1022,7 @@ class World:
         # 添加一些竹林 - 减少数量
         for y in range(3, 8):
             for x in range(25, 30):
-                if random.random() < 0.5:  # 降低生成概率
+                if self.rng.random() < 0.5:  # 降低生成概率
                     self.grid[y][x] = self.terrain_chars["bamboo"]
         
         # 添加山顶茶室
@@ -642,6 +1101,7 @@ class World:
         # 清空NPC和怪物
         self.npcs = []
         self.monsters = []
+        self.rebuild_monster_index()
         
         # 创建基本地形
         for y in range(self.height):
@@ -682,7 +1142,7 @@ class World:
         # 添加花园
         for y in range(8, 12):
             for x in range(32, 36):
-                if random.random() < 0.7:
+                if self.rng.random() < 0.7:
                     self.grid[y][x] = self.terrain_chars["flower"]
         
         # 添加小溪和桥
@@ -696,8 +1156,8 @@ class World:
         
         # 添加一些草地
         for _ in range(50):
-            x = random.randint(1, self.width-2)
-            y = random.randint(1, self.height-2)
+            x = self.rng.randint(1, self.width-2)
+            y = self.rng.randint(1, self.height-2)
             if self.grid[y][x] == self.terrain_chars["floor"]:
                 self.grid[y][x] = self.terrain_chars["grass"]
         
@@ -720,6 +1180,7 @@ class World:
         # 清空NPC和怪物
         self.npcs = []
         self.monsters = []
+        self.rebuild_monster_index()
         
         # 创建基本地形 - 减少墙壁生成概率，从30%降至20%
         for y in range(self.height):
@@ -727,7 +1188,7 @@ class World:
                 if y == 0 or y == self.height-1 or x == 0 or x == self.width-1:
                     self.grid[y][x] = self.terrain_chars["wall"]  # 边界
                 else:
-                    if random.random() < 0.2:  # 降低墙壁概率
+                    if self.rng.random() < 0.2:  # 降低墙壁概率
                         self.grid[y][x] = self.terrain_chars["wall"]  # 洞窟内部的墙壁
         
         # 创建主通道网络 - 确保地牢连通性
@@ -744,12 +1205,12 @@ class World:
         # 添加一些分支通道以增加探索性
         for _ in range(10):
             # 选择随机起点(从主通道上的点)
-            start_y = random.choice(range(3, self.height-3, 5))
-            start_x = random.randint(1, self.width-2)
+            start_y = self.rng.choice(range(3, self.height-3, 5))
+            start_x = self.rng.randint(1, self.width-2)
             
             # 随机方向和长度的通道
-            direction = random.choice(["up", "down", "left", "right"])
-            length = random.randint(3, 7)
+            direction = self.rng.choice(["up", "down", "left", "right"])
+            length = self.rng.randint(3, 7)
             
             if direction == "up":
                 for i in range(1, length+1):
@@ -793,34 +1254,34 @@ class World:
         for y in range(boss_room_y + boss_room_height, self.height - 5):
             self.grid[y][path_x] = self.terrain_chars["floor"]
             # 在路径两侧添加一些随机地板，增加宽度
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.grid[y][path_x-1] = self.terrain_chars["floor"]
-            if random.random() < 0.5:
+            if self.rng.random() < 0.5:
                 self.grid[y][path_x+1] = self.terrain_chars["floor"]
         
         # 添加一些怪石
         for _ in range(15):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
             if self.grid[y][x] == self.terrain_chars["floor"]:
                 self.grid[y][x] = self.terrain_chars["rock"]
         
         # 添加一些水池
         for _ in range(3):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
             if self.grid[y][x] == self.terrain_chars["floor"]:
                 for dx in range(-1, 2):
                     for dy in range(-1, 2):
                         nx, ny = x + dx, y + dy
                         if 0 <= nx < self.width and 0 <= ny < self.height:
-                            if self.grid[ny][nx] == self.terrain_chars["floor"] and random.random() < 0.8:
+                            if self.grid[ny][nx] == self.terrain_chars["floor"] and self.rng.random() < 0.8:
                                 self.grid[ny][nx] = self.terrain_chars["water"]
         
         # 添加一些珍贵的草药（用花来表示）
         for _ in range(8):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
             if self.grid[y][x] == self.terrain_chars["floor"]:
                 self.grid[y][x] = self.terrain_chars["flower"]
         
@@ -838,8 +1299,8 @@ class World:
         
         # 添加一些特殊的雕像
         for _ in range(3):
-            x = random.randint(5, self.width-5)
-            y = random.randint(5, self.height-5)
+            x = self.rng.randint(5, self.width-5)
+            y = self.rng.randint(5, self.height-5)
             if self.grid[y][x] == self.terrain_chars["floor"]:
                 self.grid[y][x] = self.terrain_chars["statue"]
         
@@ -861,117 +1322,141 @@ class World:
         # 添加一些怪物，确保它们在可通行的区域
         self.add_cave_monsters()
     
+    def load_generated_terrain(self, generate):
+        """使用worldgen中的向量化生成函数生成当前区域的地形
+        
+        Args:
+            generate: 生成函数，签名为 generate(width, height, rng)，返回 (地形ID数组, 传送门表)
+        """
+        # NumPy随机数生成器的种子取自区域的随机数流，保证同一种子的结果一致
+        rng = np.random.default_rng(self.rng.getrandbits(64))
+        terrain, portals = generate(self.width, self.height, rng)
+        self.grid = ids_to_grid(terrain)
+        self.portals = portals
+        self.npcs = []
+        self.monsters = []
+        self.rebuild_monster_index()
+    
+    def initialize_wilderness(self):
+        """初始化荒野区域
+        
+        荒野是按区块流式加载的大地图，这里只创建ChunkMap，
+        区块在玩家靠近时才生成。
+        """
+        self.width, self.height = WILDERNESS_SIZE
+        self.grid = None
+        self.npcs = []
+        
+        # 从逍遥阁进入时落在(20, 2)，回程传送门就在旁边
+        self.portals = {(20, 1): "xiaoyao"}
+        source = WildernessSource(self.rng.getrandbits(64), self.width, self.height,
+                                  self.portals, safe_zone=(15, 1, 25, 6))
+        self.chunks = ChunkMap(self.width, self.height, source)
+        self.monsters = self.chunks.monsters
+    
+    def initialize_arena(self):
+        """初始化群战擂台
+        
+        擂台是一片只散布少量怪石的开阔场地，生成时没有怪物，怪物由spawn_wave按波次放入。
+        """
+        self.width, self.height = ARENA_SIZE
+        floor = self.terrain_chars["floor"]
+        wall = self.terrain_chars["wall"]
+        self.grid = [[floor] * self.width for _ in range(self.height)]
+        for x in range(self.width):
+            self.grid[0][x] = wall
+            self.grid[self.height - 1][x] = wall
+        for y in range(self.height):
+            self.grid[y][0] = wall
+            self.grid[y][self.width - 1] = wall
+        
+        # 怪石作为掩体，玩家进入位置和出口附近保持空旷
+        start_x, start_y = ARENA_START
+        exit_x, exit_y = ARENA_EXIT
+        for _ in range(self.width * self.height // 100):
+            x = self.rng.randrange(2, self.width - 2)
+            y = self.rng.randrange(2, self.height - 2)
+            if max(abs(x - start_x), abs(y - start_y)) > 3 and max(abs(x - exit_x), abs(y - exit_y)) > 2:
+                self.grid[y][x] = self.terrain_chars["rock"]
+        
+        self.grid[exit_y][exit_x] = self.terrain_chars["portal"]
+        self.portals = {ARENA_EXIT: "xiaoyao"}
+        self.npcs = []
+        self.monsters = []
+        self.rebuild_monster_index()
+    
+    def spawn_wave(self, count, archetypes, avoid=None):
+        """向当前区域的空闲地面一次放入count只怪物
+        
+        Args:
+            count: 怪物数量，空闲格子不足时放满为止
+            archetypes: 怪物类型名称列表（见MONSTER_ARCHETYPES），每只怪物从中随机选取
+            avoid: 不放置怪物的格子 (x, y)，通常是玩家的位置
+        
+        Returns:
+            int: 实际放入的怪物数量
+        """
+        cells = self.spawn_cells(count, ["floor"], avoid=avoid)
+        for x, y in cells:
+            monster_type = MONSTER_ARCHETYPES[self.rng.choice(archetypes)]
+            self.add_monster(self.spawners.pool.acquire(monster_type, x, y))
+        return len(cells)
+    
+    def initialize_from_map_file(self, path):
+        """从地图文件载入区域
+        
+        地图文件以mmap映射，区块地形是文件内存上的视图，
+        切换区域只需打开文件，区块在玩家靠近时才被读入。
+        """
+        map_file = MapFile(path)
+        self.width, self.height = map_file.width, map_file.height
+        self.grid = None
+        self.npcs = [NPC(x, y, char, name) for x, y, char, name in map_file.get_npc_records()]
+        self.portals = map_file.get_portals()
+        self.chunks = ChunkMap(self.width, self.height, MapFileSource(map_file))
+        self.monsters = self.chunks.monsters
+    
+    def initialize_forest_np(self):
+        """使用向量化生成初始化幽暗森林区域"""
+        self.load_generated_terrain(worldgen.generate_forest)
+        self.add_forest_monsters()
+    
+    def initialize_mountain_np(self):
+        """使用向量化生成初始化太华山区域"""
+        self.load_generated_terrain(worldgen.generate_mountain)
+        self.add_mountain_monsters()
+    
+    def initialize_village_np(self):
+        """使用向量化生成初始化平安村区域"""
+        self.load_generated_terrain(worldgen.generate_village)
+        self.add_village_npcs()
+    
+    def initialize_cave_np(self):
+        """使用向量化生成初始化秘境洞窟区域"""
+        self.load_generated_terrain(worldgen.generate_cave)
+        self.add_cave_monsters()
+    
     def add_forest_monsters(self):
         """添加森林里的怪物"""
-        monsters_types = [
-            {"name": "灰狼", "char": "w", "hp": 30, "attack": 10, "defense": 3, "experience": 20},
-            {"name": "山贼", "char": "b", "hp": 50, "attack": 12, "defense": 5, "experience": 25},
-            {"name": "野猪", "char": "p", "hp": 40, "attack": 8, "defense": 7, "experience": 30}
-        ]
-        
-        # 添加5只随机怪物
-        for _ in range(5):
-            # 尝试最多20次找到可通行位置
-            for attempt in range(20):
-                x = random.randint(5, self.width-5)
-                y = random.randint(5, self.height-5)
-                
-                # 检查位置是否可通行（森林接受地面或草地）
-                valid_terrains = [self.terrain_chars["floor"], self.terrain_chars["grass"]]
-                if self.grid[y][x] in valid_terrains and self.is_position_valid(x, y)[0]:
-                    # 随机选择一种怪物
-                    monster_type = random.choice(monsters_types)
-                    monster = {
-                        "name": monster_type["name"],
-                        "char": monster_type["char"],
-                        "x": x,
-                        "y": y,
-                        "hp": monster_type["hp"],
-                        "max_hp": monster_type["hp"],
-                        "attack": monster_type["attack"],
-                        "defense": monster_type["defense"],
-                        "experience": monster_type["experience"]
-                    }
-                    self.monsters.append(monster)
-                    break  # 成功创建，退出尝试循环
+        monsters_types = [MONSTER_ARCHETYPES["wolf"], MONSTER_ARCHETYPES["bandit"], MONSTER_ARCHETYPES["boar"]]
+        
+        # 添加5只随机怪物（森林接受地面或草地）
+        for x, y in self.spawn_cells(5, ["floor", "grass"]):
+            # 随机选择一种怪物
+            monster_type = self.rng.choice(monsters_types)
+            self.add_monster(make_monster(monster_type, x, y))
     
     def add_mountain_monsters(self):
         """添加太华山区域的怪物"""
-        # 添加8只猛虎
-        for _ in range(8):
-            # 尝试最多20次找到可通行位置
-            for attempt in range(20):
-                x = random.randint(5, self.width-5)
-                y = random.randint(5, self.height-5)
-                
-                # 检查位置是否可通行（山区接受草地和小路）
-                valid_terrains = [self.terrain_chars["floor"], self.terrain_chars["grass"], self.terrain_chars["path"]]
-                if self.grid[y][x] in valid_terrains and self.is_position_valid(x, y)[0]:
-                    monster = {
-                        "name": "猛虎",
-                        "char": "t",
-                        "x": x,
-                        "y": y,
-                        "hp": 70,
-                        "max_hp": 70,
-                        "attack": 15,
-                        "defense": 8,
-                        "experience": 40  # 添加经验值奖励
-                    }
-                    self.monsters.append(monster)
-                    break  # 成功创建，退出尝试循环
-        
-        # 添加3只武林高手
-        for _ in range(3):
-            # 尝试最多20次找到可通行位置
-            for attempt in range(20):
-                x = random.randint(5, self.width-5)
-                y = random.randint(5, self.height-5)
-                
-                # 检查位置是否可通行
-                valid_terrains = [self.terrain_chars["floor"], self.terrain_chars["grass"], self.terrain_chars["path"]]
-                if self.grid[y][x] in valid_terrains and self.is_position_valid(x, y)[0]:
-                    monster = {
-                        "name": "武林高手",
-                        "char": "m",
-                        "x": x,
-                        "y": y,
-                        "hp": 100,
-                        "max_hp": 100,
-                        "attack": 20,
-                        "defense": 10,
-                        "experience": 60  # 添加经验值奖励
-                    }
-                    self.monsters.append(monster)
-                    break  # 成功创建，退出尝试循环
+        # 添加8只猛虎和3只武林高手（山区接受地面、草地和小路）
+        for x, y in self.spawn_cells(8, ["floor", "grass", "path"]):
+            self.add_monster(make_monster(MONSTER_ARCHETYPES["tiger"], x, y))
+        for x, y in self.spawn_cells(3, ["floor", "grass", "path"]):
+            self.add_monster(make_monster(MONSTER_ARCHETYPES["master"], x, y))
     
     def add_cave_monsters(self):
         """添加秘境洞窟的怪物"""
-        # 在洞窟随机区域添加10个小妖
-        for _ in range(10):
-            # 尝试最多20次找到可通行位置
-            for attempt in range(20):
-                x = random.randint(5, self.width-5)
-                y = random.randint(5, self.height-5)
-                
-                # 检查位置是否可通行且是地面
-                if (self.grid[y][x] == self.terrain_chars["floor"] and 
-                    self.is_position_valid(x, y)[0]):
-                    monster = {
-                        "name": "洞窟妖兽",
-                        "char": "d",
-                        "x": x,
-                        "y": y,
-                        "hp": 80,
-                        "max_hp": 80,
-                        "attack": 18,
-                        "defense": 12,
-                        "experience": 50  # 添加经验值奖励
-                    }
-                    self.monsters.append(monster)
-                    break  # 成功创建，退出尝试循环
-        
-        # 在洞窟深处添加BOSS
+        # 在洞窟深处添加BOSS，先于小妖放置，保证BOSS的位置不会被占据
         # 确定BOSS房间位置
         boss_room_center_x = self.width // 4
         boss_room_center_y = self.height // 4
@@ -980,18 +1465,11 @@ class World:
         if (self.grid[boss_room_center_y][boss_room_center_x] == self.terrain_chars["floor"] and 
             self.is_position_valid(boss_room_center_x, boss_room_center_y)[0]):
             # 添加BOSS
-            boss = {
-                "name": "洞窟之主",
-                "char": "D",
-                "x": boss_room_center_x,
-                "y": boss_room_center_y,
-                "hp": 200,
-                "max_hp": 200,
-                "attack": 25,
-                "defense": 15,
-                "experience": 100  # 添加经验值奖励
-            }
-            self.monsters.append(boss)
+            self.add_monster(make_monster(MONSTER_ARCHETYPES["cave_lord"], boss_room_center_x, boss_room_center_y))
+        
+        # 在洞窟随机区域的地面上添加10个小妖，察觉玩家后会追击
+        for x, y in self.spawn_cells(10, ["floor"]):
+            self.add_monster(make_monster(MONSTER_ARCHETYPES["imp"], x, y))
     
     def add_village_npcs(self):
         """添加村庄NPC"""
@@ -1062,30 +1540,202 @@ class World:
         self.npcs.append(innkeeper)
     
     def change_area(self, area_name):
-        """切换到不同的区域"""
+        """切换到不同的区域
+        
+        优先使用预生成器准备好的区域，传送时只需替换区域数据。
+        """
+        area_name = canonical_area_name(area_name)
         self.current_area = area_name
         
-        if area_name == "xiaoyao" or area_name == "xiaoyao_pavilion":
-            self.initialize_xiaoyao()
-        elif area_name == "forest" or area_name == "wilderness":
-            self.initialize_forest()
-        elif area_name == "mountain":
-            self.initialize_mountain()
-        elif area_name == "village":
-            self.initialize_village()
-        elif area_name == "cave":
-            self.initialize_cave()
-        # 其他区域的生成方法可以在未来添加 
+        if area_name not in self.get_area_generators():
+            # 其他区域的生成方法可以在未来添加
+            return
+        
+        seed = self.next_area_seed(area_name)
+        self.area_visits[area_name] = self.area_visits.get(area_name, 0) + 1
+        
+        area = None
+        if self.prefetcher:
+            area = self.prefetcher.take(area_name, seed, self.area_entries.get(area_name, frozenset()))
+        if area is None:
+            area = self.build_area(area_name, seed)
+        self.load_area(area)
+        
+        # 为新的相邻区域安排预生成
+        self.prefetch_neighbors()
+    
+    def get_area_generators(self):
+        """获取区域名称到生成方法的映射，有地图文件的区域从文件载入"""
+        generators = self.get_procedural_generators()
+        for area_name, path in self.map_files.items():
+            generators[area_name] = partial(self.initialize_from_map_file, path)
+        return generators
+    
+    def get_procedural_generators(self):
+        """获取区域名称到程序化生成方法的映射"""
+        if self.generator_backend == "numpy":
+            return {
+                "xiaoyao": self.initialize_xiaoyao,
+                "forest": self.initialize_forest_np,
+                "mountain": self.initialize_mountain_np,
+                "village": self.initialize_village_np,
+                "cave": self.initialize_cave_np,
+                "wilderness": self.initialize_wilderness,
+                "arena": self.initialize_arena
+            }
+        return {
+            "xiaoyao": self.initialize_xiaoyao,
+            "forest": self.initialize_forest,
+            "mountain": self.initialize_mountain,
+            "village": self.initialize_village,
+            "cave": self.initialize_cave,
+            "wilderness": self.initialize_wilderness,
+            "arena": self.initialize_arena
+        }
+    
+    def area_seed(self, area_name, visit):
+        """由世界种子、区域名称和进入次数派生区域的生成种子"""
+        return derive_seed(self.seed, canonical_area_name(area_name), visit)
+    
+    def next_area_seed(self, area_name):
+        """获取区域下一次进入时使用的生成种子"""
+        area_name = canonical_area_name(area_name)
+        return self.area_seed(area_name, self.area_visits.get(area_name, 0))
+    
+    def make_loot_rng(self):
+        """为一次战利品掷骰创建独立的随机数流
+        
+        随机数流由当前区域的种子和本区域内的掷骰次数派生，
+        同一种子下相同的击杀顺序总是得到相同的战利品。
+        """
+        rng = make_rng(self.area_seed_value, "loot", self.loot_rolls)
+        self.loot_rolls += 1
+        return rng
+    
+    def set_layout_cache(self, layout_cache):
+        """设置区域布局缓存"""
+        self.layout_cache = layout_cache
+    
+    def build_area(self, area_name, seed, entries=None):
+        """生成一个区域并返回Area对象
+        
+        生成在独立的World实例上进行，不会修改当前世界状态，
+        因此可以在工作线程中调用；相同的种子总是得到相同的区域。
+        工作线程中调用时应传入提交时的入口快照，不读取会被主线程修改的area_entries。
+        
+        Args:
+            area_name: 区域名称
+            seed: 生成种子
+            entries: 区域入口坐标集合，默认为当前记录的入口
+        
+        Returns:
+            Area: 生成好的区域
+        """
+        area_name = canonical_area_name(area_name)
+        version = GENERATOR_VERSIONS[self.generator_backend]
+        if entries is None:
+            entries = self.area_entries.get(area_name, frozenset())
+        if self.layout_cache is not None:
+            area = self.layout_cache.get(version, seed)
+            # 缓存的布局生成时可能还不知道现在的入口，需要重新检查连通性
+            if area is not None and area.name == area_name and \
+               (area.width, area.height) == self.area_size and area.is_connected(entries):
+                return area
+        
+        for rerolls in range(MAX_REROLLS + 1):
+            builder = World(*self.area_size, seed=self.seed, initial_area=None,
+                            generator_backend=self.generator_backend)
+            builder.map_files = self.map_files
+            builder.current_area = area_name
+            builder.rng.seed(seed if rerolls == 0 else derive_seed(seed, "reroll", rerolls))
+            builder.get_area_generators()[area_name]()
+            area = builder.export_area(seed)
+            # 最后一次生成时不限制打通的格子数量
+            carved = area.connect_key_points(entries, MAX_CARVED_CELLS if rerolls < MAX_REROLLS else None)
+            if carved is not None:
+                break
+        area.rerolls = rerolls
+        area.carved = len(carved or [])
+        
+        # 分块区域的区块按需生成，不需要缓存；尺寸与普通区域不同的区域（擂台）读取时不会命中，也不缓存
+        if self.layout_cache is not None and area.chunks is None and \
+           (area.width, area.height) == self.area_size:
+            self.layout_cache.put(version, seed, area)
+        return area
+    
+    def export_area(self, seed=None):
+        """将当前区域数据导出为Area对象"""
+        return Area(self.current_area, self.width, self.height, self.grid,
+                    self.npcs, self.monsters, self.items, self.portals, seed, self.chunks)
+    
+    def load_area(self, area):
+        """载入一个生成好的区域，替换当前的区域数据"""
+        self.current_area = area.name
+        self.width = area.width
+        self.height = area.height
+        self.grid = area.grid
+        self.npcs = area.npcs
+        self.monsters = area.monsters
+        self.items = area.items
+        self.portals = area.portals
+        self.chunks = area.chunks
+        self.key_points = area.get_key_points(self.area_entries.get(area.name, ()))
+        self.turn_scheduler = EnergyScheduler()
+        self.rebuild_monster_index()
+        self.walkable_mask = None
+        
+        # 每个区域的怪物AI和战利品使用各自的随机数流
+        self.area_seed_value = area.seed
+        self.ai_rng = make_rng(area.seed, "ai")
+        self.ai_np_rng = np.random.default_rng(derive_seed(area.seed, "ai-batch"))
+        self.spawners.activate(area.name, self.world_time)
+        self.loot_rolls = 0
+        
+        # 记录相邻区域的入口，生成这些区域时保证入口与传送门连通
+        for position, target in area.portals.items():
+            target = canonical_area_name(target)
+            entries = self.area_entries.get(target, frozenset())
+            if position not in entries:
+                self.area_entries[target] = entries | {position}
+        self.generation_stats["areas"] += 1
+        self.generation_stats["rerolls"] += area.rerolls
+        self.generation_stats["carved"] += area.carved
+    
+    def set_prefetcher(self, prefetcher):
+        """设置相邻区域预生成器，并立即为当前区域的相邻区域安排预生成"""
+        self.prefetcher = prefetcher
+        self.prefetch_neighbors()
+    
+    def close_prefetcher(self):
+        """关闭相邻区域预生成器及其后台线程，退出游戏时调用"""
+        if self.prefetcher:
+            self.prefetcher.shutdown()
+            self.prefetcher = None
+    
+    def prefetch_neighbors(self):
+        """根据传送门表在后台预生成相邻区域"""
+        if not self.prefetcher:
+            return
+        
+        targets = []
+        for target in self.portals.values():
+            target = canonical_area_name(target)
+            if target in self.get_area_generators():
+                targets.append((target, self.next_area_seed(target),
+                                self.area_entries.get(target, frozenset())))
+        self.prefetcher.prefetch_all(targets, self.build_area)
 
     def update_monster(self, monster):
         """更新怪物状态，在战斗后调用"""
-        if hasattr(monster, 'index') and 0 <= monster.index < len(self.monsters):
+        record = getattr(monster, "record", None)
+        # 怪物仍在当前区域中（MonsterArrays中有它的槽位）时才更新
+        if record is not None and id(record) in self.monster_arrays.slots:
             if monster.health <= 0:
-                # 怪物被击败，从列表中移除
-                self.monsters.pop(monster.index)
+                # 怪物被击败，从列表和空间索引中移除
+                self.remove_monster(record)
             else:
                 # 更新怪物状态
-                self.monsters[monster.index]["hp"] = monster.health 
+                record["hp"] = monster.health
 
 class NPC:
     def __init__(self, x, y, char, name, dialogs=None):
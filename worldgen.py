@@ -0,0 +1,302 @@
+"""
+NumPy向量化的区域地形生成
+
+与World中逐格生成的initialize_*方法等价：在40x25的地图上生成相同风格的地形，
+但以整张数组为单位操作（随机掩码、广播的簇状图章、整行整列的通道填充），
+地图尺寸放大后地形要素的数量按面积等比增加。
+
+每个生成函数返回 (地形ID数组, 传送门表)，地形ID数组的形状为 (height, width)。
+"""
+
+import numpy as np
+from terrain import TERRAIN_IDS
+
+FLOOR = TERRAIN_IDS["floor"]
+WALL = TERRAIN_IDS["wall"]
+TREE = TERRAIN_IDS["tree"]
+WATER = TERRAIN_IDS["water"]
+MOUNTAIN = TERRAIN_IDS["mountain"]
+PORTAL = TERRAIN_IDS["portal"]
+FLOWER = TERRAIN_IDS["flower"]
+BAMBOO = TERRAIN_IDS["bamboo"]
+WATERFALL = TERRAIN_IDS["waterfall"]
+PAVILION = TERRAIN_IDS["pavilion"]
+TEAHOUSE = TERRAIN_IDS["teahouse"]
+STREAM = TERRAIN_IDS["stream"]
+BRIDGE = TERRAIN_IDS["bridge"]
+STATUE = TERRAIN_IDS["statue"]
+STAIRS = TERRAIN_IDS["stairs"]
+ROCK = TERRAIN_IDS["rock"]
+GRASS = TERRAIN_IDS["grass"]
+PATH = TERRAIN_IDS["path"]
+STAIRS_UP = TERRAIN_IDS["stairs_up"]
+STAIRS_DOWN = TERRAIN_IDS["stairs_down"]
+
+# 原始生成器设计时的地图尺寸，要素数量和固定位置以此为基准缩放
+BASE_WIDTH = 40
+BASE_HEIGHT = 25
+
+def _scaled_count(count, width, height):
+    """按地图面积缩放要素数量"""
+    return max(1, round(count * width * height / (BASE_WIDTH * BASE_HEIGHT)))
+
+def _sx(x, width):
+    """按地图宽度缩放一个基准x坐标"""
+    return x * width // BASE_WIDTH
+
+def _sy(y, height):
+    """按地图高度缩放一个基准y坐标"""
+    return y * height // BASE_HEIGHT
+
+def _walled(width, height):
+    """创建四周为墙、内部为地面的地形数组"""
+    terrain = np.full((height, width), FLOOR, dtype=np.uint8)
+    terrain[0, :] = WALL
+    terrain[-1, :] = WALL
+    terrain[:, 0] = WALL
+    terrain[:, -1] = WALL
+    return terrain
+
+def _random_points(rng, count, low_x, high_x, low_y, high_y):
+    """在闭区间内随机取点，返回 (xs, ys)"""
+    xs = rng.integers(low_x, high_x + 1, count)
+    ys = rng.integers(low_y, high_y + 1, count)
+    return xs, ys
+
+def _replace_at(terrain, xs, ys, source, value):
+    """将指定坐标中为source地形的格子替换为value"""
+    mask = terrain[ys, xs] == source
+    terrain[ys[mask], xs[mask]] = value
+
+def _stamp_clusters(terrain, rng, xs, ys, sizes, fill_chance, value):
+    """以广播方式一次性盖下多个方形簇
+
+    每个簇以 (x, y) 为中心、半径为size，簇内每格以fill_chance的概率被填充，
+    只会修改地图内部（不含边界）的格子。
+    """
+    height, width = terrain.shape
+    max_size = int(sizes.max()) if len(sizes) else 0
+    offsets = np.arange(-max_size, max_size + 1)
+    dx = offsets[None, :, None]
+    dy = offsets[None, None, :]
+    radius = sizes[:, None, None]
+
+    x, y = np.broadcast_arrays(xs[:, None, None] + dx, ys[:, None, None] + dy)
+    mask = (np.abs(dx) <= radius) & (np.abs(dy) <= radius)
+    mask &= (x > 0) & (x < width - 1) & (y > 0) & (y < height - 1)
+    mask &= rng.random(x.shape) < fill_chance
+    terrain[y[mask], x[mask]] = value
+
+def generate_forest(width, height, rng):
+    """生成幽暗森林的地形"""
+    terrain = _walled(width, height)
+
+    # 树木
+    xs, ys = _random_points(rng, _scaled_count(60, width, height), 1, width - 2, 1, height - 2)
+    terrain[ys, xs] = TREE
+
+    # 水域和山脉
+    count = _scaled_count(20, width, height)
+    xs, ys = _random_points(rng, count, 5, width - 5, 5, height - 5)
+    _stamp_clusters(terrain, rng, xs, ys, rng.integers(1, 4, count), 0.7, WATER)
+
+    count = _scaled_count(10, width, height)
+    xs, ys = _random_points(rng, count, 5, width - 5, 5, height - 5)
+    _stamp_clusters(terrain, rng, xs, ys, rng.integers(1, 3, count), 0.8, MOUNTAIN)
+
+    # 小溪和石桥
+    stream_y = _sy(12, height)
+    terrain[stream_y, 5:width - 5] = STREAM
+    terrain[stream_y, [_sx(15, width), _sx(25, width)]] = BRIDGE
+
+    # 瀑布
+    terrain[5:stream_y, _sx(30, width)] = WATERFALL
+
+    # 隐秘小亭，清理周围的树木和山脉
+    pavilion_x, pavilion_y = _sx(33, width), _sy(7, height)
+    terrain[pavilion_y, pavilion_x] = PAVILION
+    around = terrain[pavilion_y - 1:pavilion_y + 2, pavilion_x - 1:pavilion_x + 2]
+    around[(around == TREE) | (around == MOUNTAIN)] = FLOOR
+
+    # 草地
+    interior = terrain[1:-1, 1:-1]
+    interior[(interior == FLOOR) & (rng.random(interior.shape) < 0.2)] = GRASS
+
+    # 小路
+    terrain[stream_y - 3, 1:stream_y] = PATH
+
+    # 传送门
+    portals = {
+        (width - 2, stream_y - 3): "xiaoyao",
+        (width // 2, height - 2): "village"
+    }
+    for x, y in portals:
+        terrain[y, x] = PORTAL
+    return terrain, portals
+
+def generate_mountain(width, height, rng):
+    """生成太华山的地形"""
+    terrain = _walled(width, height)
+
+    # 基本地形：20%山、5%怪石、15%草地
+    interior = terrain[1:-1, 1:-1]
+    roll = rng.random(interior.shape)
+    interior[roll < 0.4] = GRASS
+    interior[roll < 0.25] = ROCK
+    interior[roll < 0.2] = MOUNTAIN
+
+    # 主通道网络
+    terrain[5:height - 5:6, 1:width - 1] = PATH
+    terrain[1:height - 1, 5:width - 5:8] = PATH
+
+    # 连接山顶和山脚的主路与石阶
+    main_x = _sx(15, width)
+    terrain[1:height - 1, main_x] = PATH
+    terrain[5:10:2, main_x] = STAIRS
+
+    # 竹林
+    bamboo_x = _sx(25, width)
+    grove = terrain[3:8, bamboo_x:bamboo_x + 5]
+    grove[rng.random(grove.shape) < 0.5] = BAMBOO
+
+    # 山顶茶室，周围清理为地面并围一圈小路
+    top = terrain[0:5, main_x - 2:main_x + 3]
+    top[:] = PATH
+    top[1:-1, 1:-1] = FLOOR
+
+    # 瀑布，两侧保持可通行
+    waterfall_x = _sx(25, width)
+    terrain[8:15, waterfall_x] = WATERFALL
+    terrain[8:15, [waterfall_x - 1, waterfall_x + 1]] = FLOOR
+
+    # 小溪、两岸小路和桥梁
+    stream_y = _sy(15, height)
+    stream_x0, stream_x1 = _sx(25, width), _sx(35, width)
+    terrain[stream_y, stream_x0:stream_x1] = STREAM
+    terrain[[stream_y - 1, stream_y + 1], stream_x0:stream_x1] = PATH
+    terrain[stream_y, [_sx(28, width), _sx(32, width)]] = BRIDGE
+
+    # 出口附近保持可通行
+    terrain[height - 1, main_x] = PORTAL
+    terrain[height - 4:height - 1, main_x - 2:main_x + 3] = PATH
+    terrain[1:4, main_x - 2:main_x + 3] = PATH
+
+    # 再次确保主路完全连通
+    column = terrain[1:height - 1, main_x]
+    column[(column == WALL) | (column == MOUNTAIN) | (column == ROCK)] = PATH
+
+    portals = {
+        (main_x, height - 1): "xiaoyao",
+        (main_x, 1): "cave"
+    }
+    return terrain, portals
+
+def generate_village(width, height, rng):
+    """生成平安村的地形"""
+    terrain = _walled(width, height)
+    stream_y = height - 5
+
+    # 房屋：一次性盖下所有房屋的外墙
+    house_xs = np.arange(5, width - 6, 7)
+    house_ys = np.arange(5, stream_y - 4, 10)
+    ring = np.ones((5, 5), dtype=bool)
+    ring[1:-1, 1:-1] = False
+    ring_y, ring_x = np.nonzero(ring)
+    ys = house_ys[:, None, None] + ring_y[None, None, :]
+    xs = house_xs[None, :, None] + ring_x[None, None, :]
+    ys, xs = np.broadcast_arrays(ys, xs)
+    terrain[ys, xs] = WALL
+
+    # 村庄中央的广场和雕像
+    terrain[_sy(10, height):_sy(15, height), _sx(15, width):_sx(25, width)] = PATH
+    terrain[_sy(12, height), width // 2] = STATUE
+
+    # 茶馆和花园
+    terrain[7, _sx(30, width)] = TEAHOUSE
+    garden_x = _sx(32, width)
+    garden = terrain[8:12, garden_x:garden_x + 4]
+    garden[rng.random(garden.shape) < 0.7] = FLOWER
+
+    # 小溪和桥
+    terrain[stream_y, 1:width - 1] = STREAM
+    terrain[stream_y, [width // 4, width // 2, width * 3 // 4]] = BRIDGE
+
+    # 草地
+    xs, ys = _random_points(rng, _scaled_count(50, width, height), 1, width - 2, 1, height - 2)
+    _replace_at(terrain, xs, ys, FLOOR, GRASS)
+
+    portals = {(width // 2, 1): "forest"}
+    for x, y in portals:
+        terrain[y, x] = PORTAL
+    return terrain, portals
+
+def generate_cave(width, height, rng):
+    """生成秘境洞窟的地形"""
+    terrain = _walled(width, height)
+
+    # 洞窟内部20%为墙壁
+    interior = terrain[1:-1, 1:-1]
+    interior[rng.random(interior.shape) < 0.2] = WALL
+
+    # 主通道网络
+    corridor_rows = np.arange(3, height - 3, 5)
+    terrain[corridor_rows, 1:width - 1] = FLOOR
+    terrain[1:height - 1, 3:width - 3:5] = FLOOR
+
+    # 分支通道：随机起点、方向和长度，一次性开凿
+    count = _scaled_count(10, width, height)
+    start_y = rng.choice(corridor_rows, count)
+    start_x = rng.integers(1, width - 1, count)
+    directions = np.array([(0, -1), (0, 1), (-1, 0), (1, 0)])[rng.integers(0, 4, count)]
+    lengths = rng.integers(3, 8, count)
+    steps = np.arange(1, 8)
+    xs = start_x[:, None] + directions[:, 0, None] * steps
+    ys = start_y[:, None] + directions[:, 1, None] * steps
+    mask = (steps <= lengths[:, None]) & (xs >= 0) & (xs < width) & (ys >= 0) & (ys < height)
+    terrain[ys[mask], xs[mask]] = FLOOR
+
+    # BOSS房间、入口和通往房间的路径
+    room_x, room_y, room_size = width // 2 - 3, 5, 6
+    terrain[room_y:room_y + room_size, room_x:room_x + room_size] = WALL
+    terrain[room_y + 1:room_y + room_size - 1, room_x + 1:room_x + room_size - 1] = FLOOR
+    path_x = room_x + room_size // 2
+    terrain[room_y + room_size - 1:height - 5, path_x] = FLOOR
+    path_rows = np.arange(room_y + room_size, height - 5)
+    for side in (-1, 1):
+        widen = path_rows[rng.random(len(path_rows)) < 0.5]
+        terrain[widen, path_x + side] = FLOOR
+
+    # 怪石
+    xs, ys = _random_points(rng, _scaled_count(15, width, height), 5, width - 5, 5, height - 5)
+    _replace_at(terrain, xs, ys, FLOOR, ROCK)
+
+    # 水池：中心为地面时，周围3x3的地面以80%的概率变为水
+    xs, ys = _random_points(rng, _scaled_count(3, width, height), 5, width - 5, 5, height - 5)
+    keep = terrain[ys, xs] == FLOOR
+    xs, ys = xs[keep], ys[keep]
+    offsets = np.arange(-1, 2)
+    pond_x, pond_y = np.broadcast_arrays(xs[:, None, None] + offsets[None, :, None],
+                                         ys[:, None, None] + offsets[None, None, :])
+    mask = (terrain[pond_y, pond_x] == FLOOR) & (rng.random(pond_x.shape) < 0.8)
+    terrain[pond_y[mask], pond_x[mask]] = WATER
+
+    # 珍贵的草药（用花来表示）
+    xs, ys = _random_points(rng, _scaled_count(8, width, height), 5, width - 5, 5, height - 5)
+    _replace_at(terrain, xs, ys, FLOOR, FLOWER)
+
+    # 楼梯周围的通道
+    terrain[9:12, 9:12] = FLOOR
+    terrain[14:17, 14:17] = FLOOR
+
+    # 特殊的雕像
+    xs, ys = _random_points(rng, _scaled_count(3, width, height), 5, width - 5, 5, height - 5)
+    _replace_at(terrain, xs, ys, FLOOR, STATUE)
+
+    # 通往太华山的传送门，周围的墙壁清理为地面
+    portal_x, portal_y = 5, height - 2
+    terrain[portal_y, portal_x] = PORTAL
+    around = terrain[portal_y - 1:portal_y + 2, portal_x - 1:portal_x + 2]
+    around[around == WALL] = FLOOR
+
+    portals = {(portal_x, portal_y): "mountain"}
+    return terrain, portals